@@ -3,68 +3,87 @@ Simplified ADLS Handler with better error handling
 """
 import logging
 import json
+import os
+import random
+import tempfile
+import threading
+import time
 import uuid
 from datetime import datetime
 import io
 
-try:
-    from azure.storage.filedatalake import DataLakeServiceClient
-    from azure.core.credentials import AzureNamedKeyCredential
-    AZURE_IMPORTS_OK = True
-except ImportError as e:
-    logging.error(f"Failed to import Azure libraries: {e}")
-    AZURE_IMPORTS_OK = False
+from metrics import metrics
+from profiling import profiler
+from storage_backends import (MatchConditions, ResourceExistsError, ResourceModifiedError, ResourceNotFoundError,
+                              ResourceNotModifiedError)
 
-try:
-    from config import Config
-    CONFIG_IMPORT_OK = True
-except Exception as e:
-    logging.error(f"Failed to import Config: {e}")
-    CONFIG_IMPORT_OK = False
+import client_registry
+
+
+def create_filesystem_client(config):
+    """Create the file system client for the configured storage backend"""
+    if config.STORAGE_BACKEND != 'adls':
+        from storage_backends import create_storage_backend
+        return create_storage_backend(config)
+    
+    # Imported here: the SDK takes a few hundred ms to load and the local backends never need it
+    try:
+        from azure.storage.filedatalake import DataLakeServiceClient
+        from azure.core.credentials import AzureNamedKeyCredential
+    except ImportError as e:
+        logging.error(f"Failed to import Azure libraries: {e}")
+        raise ImportError("Azure libraries not available. Please install azure-storage-file-datalake")
+    
+    # Create credentials
+    credential = AzureNamedKeyCredential(
+        config.ADLS_ACCOUNT_NAME, 
+        config.ADLS_ACCOUNT_KEY
+    )
+    
+    # Initialize ADLS client
+    service_client = DataLakeServiceClient(
+        account_url=config.adls_account_url,
+        credential=credential
+    )
+    
+    return service_client.get_file_system_client(
+        file_system=config.ADLS_FILESYSTEM_NAME
+    )
 
 class ADLSHandler:
-    def __init__(self):
-        if not AZURE_IMPORTS_OK:
-            raise ImportError("Azure libraries not available. Please install azure-storage-file-datalake")
-        
-        if not CONFIG_IMPORT_OK:
-            raise ImportError("Config module not available. Please check your config.py and .env files")
-        
+    def __init__(self, filesystem_client=None, config=None):
         try:
-            self.config = Config()
-            
-            # Create credentials
-            credential = AzureNamedKeyCredential(
-                self.config.ADLS_ACCOUNT_NAME, 
-                self.config.ADLS_ACCOUNT_KEY
-            )
-            
-            # Initialize ADLS client
-            self.service_client = DataLakeServiceClient(
-                account_url=self.config.adls_account_url,
-                credential=credential
-            )
-            
+            # Config and the storage client are shared process-wide unless injected
+            self.config = config or client_registry.get_config()
             self.filesystem_name = self.config.ADLS_FILESYSTEM_NAME
-            self.filesystem_client = self.service_client.get_file_system_client(
-                file_system=self.filesystem_name
-            )
-            
-            # Initialize directory structure
-            self._initialize_directories()
-            
+            # Set by enable_index_batching() for bulk ingestion
+            self.index_writer = None
+            # (index_data, etag, fetched_at) of the last search index read or written by this handler
+            self._index_cache = None
+            self._index_cache_lock = threading.Lock()
+            
+            # Use an injected client (e.g. a local stand-in) or the shared one
+            if filesystem_client is None:
+                filesystem_client = client_registry.get_filesystem_client()
+            self.filesystem_client = filesystem_client
+            
+            # Initialize directory structure (once per client, not per handler)
+            client_registry.bootstrap_storage(self.filesystem_client, self.config, self._initialize_directories)
+            
+        except ImportError:
+            raise
         except Exception as e:
             logging.error(f"Failed to initialize ADLS Handler: {str(e)}")
             raise Exception(f"ADLS configuration error: {str(e)}")
     
     def _initialize_directories(self):
-        """Initialize the directory structure in ADLS"""
+        """Initialize the directory structure in ADLS; returns False if it could not be confirmed"""
         try:
             # Create filesystem if it doesn't exist
             try:
                 self.filesystem_client.create_file_system()
                 logging.info(f"Created filesystem: {self.filesystem_name}")
-            except Exception:
+            except ResourceExistsError:
                 logging.info(f"Filesystem {self.filesystem_name} already exists")
             
             # Create directories
@@ -78,11 +97,14 @@ class ADLSHandler:
                 try:
                     self.filesystem_client.create_directory(directory)
                     logging.info(f"Created directory: {directory}")
-                except Exception:
+                except ResourceExistsError:
                     logging.info(f"Directory {directory} already exists")
+            return True
                     
         except Exception as e:
+            # Not remembered as done, so the next handler tries again
             logging.error(f"Error initializing directories: {str(e)}")
+            return False
     
     def test_connection(self):
         """Test the ADLS connection"""
@@ -102,45 +124,70 @@ class ADLSHandler:
             )
             
             pdf_files = []
-            paths = directory_client.get_paths()
-            
-            for path in paths:
-                if path.name.lower().endswith('.pdf') and not path.is_directory:
-                    # Get file properties
-                    file_client = self.filesystem_client.get_file_client(path.name)
-                    properties = file_client.get_file_properties()
-                    
-                    pdf_files.append({
-                        'name': path.name.split('/')[-1],  # Get just filename
-                        'full_path': path.name,
-                        'size': properties.size,
-                        'last_modified': properties.last_modified
-                    })
+            with metrics.timer('adls_operation_seconds', operation='list_pdf_files'):
+                paths = directory_client.get_paths()
+                
+                for path in paths:
+                    if path.name.lower().endswith('.pdf') and not path.is_directory:
+                        # The listing already carries size, timestamp and ETag; no per-file request
+                        pdf_files.append({
+                            'name': path.name.split('/')[-1],  # Get just filename
+                            'full_path': path.name,
+                            'size': path.content_length,
+                            'last_modified': path.last_modified,
+                            'etag': path.etag
+                        })
             
             return pdf_files
             
         except Exception as e:
+            metrics.inc('adls_errors_total', operation='list_pdf_files')
             logging.error(f"Error listing PDF files: {str(e)}")
             return []
     
     def upload_pdf(self, file_name, file_content):
-        """Upload PDF file to ADLS"""
+        """Upload PDF file to ADLS from bytes, a binary file object or a local file path.
+        
+        File objects and paths are streamed in TRANSFER_CHUNK_SIZE blocks with up
+        to TRANSFER_MAX_CONCURRENCY parallel requests instead of being read into memory.
+        """
+        source = None
         try:
             file_path = f"{self.config.PDF_DIRECTORY}/{file_name}"
             file_client = self.filesystem_client.get_file_client(file_path)
             
+            if isinstance(file_content, (str, os.PathLike)):
+                source = file_content = open(file_content, 'rb')
+            
+            if hasattr(file_content, 'read'):
+                # Upload from the current position to the end of the stream
+                start = file_content.tell()
+                length = file_content.seek(0, os.SEEK_END) - start
+                file_content.seek(start)
+            else:
+                length = len(file_content)
+            
             # Upload file
-            file_client.upload_data(
-                file_content, 
-                overwrite=True
-            )
+            with metrics.timer('adls_operation_seconds', operation='upload_pdf'):
+                file_client.upload_data(
+                    file_content, 
+                    overwrite=True,
+                    length=length,
+                    chunk_size=self.config.TRANSFER_CHUNK_SIZE,
+                    max_concurrency=self.config.TRANSFER_MAX_CONCURRENCY
+                )
+            metrics.inc('adls_bytes_total', length, direction='upload')
             
             logging.info(f"Uploaded PDF: {file_name}")
             return True
             
         except Exception as e:
+            metrics.inc('adls_errors_total', operation='upload_pdf')
             logging.error(f"Error uploading PDF {file_name}: {str(e)}")
             return False
+        finally:
+            if source is not None:
+                source.close()
     
     def download_pdf(self, file_name):
         """Download PDF file from ADLS"""
@@ -149,10 +196,42 @@ class ADLSHandler:
             file_client = self.filesystem_client.get_file_client(file_path)
             
             # Download file
-            download_stream = file_client.download_file()
-            return download_stream.readall()
+            with metrics.timer('adls_operation_seconds', operation='download_pdf'):
+                download_stream = file_client.download_file(max_concurrency=self.config.TRANSFER_MAX_CONCURRENCY)
+                content = download_stream.readall()
+            metrics.inc('adls_bytes_total', len(content), direction='download')
+            return content
+            
+        except Exception as e:
+            metrics.inc('adls_errors_total', operation='download_pdf')
+            logging.error(f"Error downloading PDF {file_name}: {str(e)}")
+            return None
+    
+    def open_pdf_stream(self, file_name):
+        """Download a PDF into a seekable temporary file and return it positioned at the start.
+        
+        Files up to TRANSFER_SPOOL_MAX_BYTES stay in memory, larger ones spill to disk.
+        The caller owns the returned file and should close it.
+        """
+        stream = None
+        try:
+            file_path = f"{self.config.PDF_DIRECTORY}/{file_name}"
+            file_client = self.filesystem_client.get_file_client(file_path)
+            stream = tempfile.SpooledTemporaryFile(max_size=self.config.TRANSFER_SPOOL_MAX_BYTES)
+            
+            # Ranged, parallel download written straight into the spool
+            with metrics.timer('adls_operation_seconds', operation='download_pdf'):
+                download_stream = file_client.download_file(max_concurrency=self.config.TRANSFER_MAX_CONCURRENCY)
+                size = download_stream.readinto(stream)
+            metrics.inc('adls_bytes_total', size, direction='download')
+            
+            stream.seek(0)
+            return stream
             
         except Exception as e:
+            if stream is not None:
+                stream.close()
+            metrics.inc('adls_errors_total', operation='download_pdf')
             logging.error(f"Error downloading PDF {file_name}: {str(e)}")
             return None
     
@@ -178,10 +257,11 @@ class ADLSHandler:
             json_data = json.dumps(data, indent=2, default=str)
             
             # Upload JSON data
-            file_client.upload_data(
-                json_data, 
-                overwrite=True
-            )
+            with metrics.timer('adls_operation_seconds', operation='save_extracted_json'):
+                file_client.upload_data(
+                    json_data, 
+                    overwrite=True
+                )
             
             # Also create/update an index file for searching
             self._update_search_index(e_file_id, personal_info, file_name)
@@ -190,22 +270,114 @@ class ADLSHandler:
             return True
             
         except Exception as e:
+            metrics.inc('adls_errors_total', operation='save_extracted_data')
             logging.error(f"Error saving extracted data for {file_name}: {str(e)}")
             return False
     
-    def _update_search_index(self, e_file_id, personal_info, file_name):
-        """Update search index for quick lookups"""
+    @property
+    def search_index_path(self):
+        return f"{self.config.METADATA_DIRECTORY}/search_index.json"
+    
+    def _load_search_index(self):
+        """Download the search index; returns (index_data, etag), with etag None if it does not exist yet"""
+        file_client = self.filesystem_client.get_file_client(self.search_index_path)
         try:
-            index_path = f"{self.config.METADATA_DIRECTORY}/search_index.json"
-            file_client = self.filesystem_client.get_file_client(index_path)
-            
-            # Load existing index
-            try:
+            with metrics.timer('adls_operation_seconds', operation='index_download'):
                 download_stream = file_client.download_file()
-                existing_data = json.loads(download_stream.readall().decode('utf-8'))
-            except:
-                existing_data = {'records': []}
+                index_data = json.loads(download_stream.readall().decode('utf-8'))
+        except ResourceNotFoundError:
+            return {'records': []}, None
+        return index_data, download_stream.properties.etag
+    
+    def _read_search_index(self):
+        """Search index for lookups: the cached copy, revalidated with a conditional GET once it is
+        older than SEARCH_INDEX_CACHE_SECONDS (the whole index is only transferred when it changed)"""
+        with self._index_cache_lock:
+            cached = self._index_cache
+        if cached and time.monotonic() - cached[2] < self.config.SEARCH_INDEX_CACHE_SECONDS:
+            metrics.inc('search_index_cache_total', outcome='hit')
+            return cached[0]
+        
+        file_client = self.filesystem_client.get_file_client(self.search_index_path)
+        try:
+            with metrics.timer('adls_operation_seconds', operation='index_download'):
+                if cached and cached[1]:
+                    download_stream = file_client.download_file(etag=cached[1], match_condition=MatchConditions.IfModified)
+                else:
+                    download_stream = file_client.download_file()
+                index_data = json.loads(download_stream.readall().decode('utf-8'))
+            etag, outcome = download_stream.properties.etag, 'miss'
+        except ResourceNotModifiedError:
+            index_data, etag, outcome = cached[0], cached[1], 'revalidated'
+        except ResourceNotFoundError:
+            index_data, etag, outcome = {'records': []}, None, 'miss'
+        
+        self._cache_search_index(index_data, etag)
+        metrics.inc('search_index_cache_total', outcome=outcome)
+        return index_data
+    
+    def _cache_search_index(self, index_data, etag):
+        with self._index_cache_lock:
+            self._index_cache = (index_data, etag, time.monotonic())
+    
+    def _modify_search_index(self, mutator):
+        """Apply mutator(index_data) and write the index back with an If-Match on its ETag.
+        
+        If another writer got there first the index is re-read and the mutator
+        re-applied to the fresh copy, so concurrent updates merge instead of
+        overwriting each other.
+        """
+        file_client = self.filesystem_client.get_file_client(self.search_index_path)
+        attempts = self.config.INDEX_WRITE_RETRIES
+        
+        for attempt in range(attempts):
+            index_data, etag = self._load_search_index()
+            mutator(index_data)
+            json_data = json.dumps(index_data, indent=2, default=str)
             
+            try:
+                with metrics.timer('adls_operation_seconds', operation='index_upload'):
+                    if etag is None:
+                        # First writer creates the index; a concurrent creator makes this fail
+                        response = file_client.upload_data(json_data, overwrite=False)
+                    else:
+                        response = file_client.upload_data(json_data, overwrite=True, etag=etag,
+                                                           match_condition=MatchConditions.IfNotModified)
+                metrics.set_gauge('search_index_records', len(index_data['records']))
+                # Our own write is the newest copy; later lookups revalidate against its ETag
+                self._cache_search_index(index_data, (response or {}).get('etag'))
+                return index_data
+            except (ResourceModifiedError, ResourceExistsError):
+                metrics.inc('search_index_conflicts_total')
+                logging.info(f"Search index changed concurrently, retrying ({attempt + 1}/{attempts})")
+                backoff = self.config.INDEX_RETRY_BACKOFF_MS / 1000.0 * (2 ** min(attempt, 6))
+                time.sleep(random.uniform(0, backoff))
+        
+        raise RuntimeError(f"Search index update still conflicting after {attempts} attempts")
+    
+    def enable_index_batching(self, max_records=None, max_delay=None, journal_dir=None):
+        """Buffer index updates and write them in merged batches (call close_index_batching when done)"""
+        if self.index_writer is None:
+            from index_writer import BufferedIndexWriter
+            self.index_writer = BufferedIndexWriter(
+                self,
+                max_records=max_records or self.config.INDEX_BATCH_SIZE,
+                max_delay=max_delay if max_delay is not None else self.config.INDEX_FLUSH_SECONDS,
+                journal_dir=journal_dir or self.config.INDEX_JOURNAL_DIR,
+                journal_name=self.filesystem_name
+            )
+        return self.index_writer
+    
+    def close_index_batching(self):
+        """Flush buffered index updates and go back to writing them immediately"""
+        if self.index_writer is not None:
+            self.index_writer.close()
+            self.index_writer = None
+    
+    @profiler.profiled('adls.update_search_index')
+    def _update_search_index(self, e_file_id, personal_info, file_name):
+        """Update search index for quick lookups"""
+        try:
             # Create new record
             record = {
                 'e_file_id': e_file_id,
@@ -222,20 +394,22 @@ class ADLSHandler:
                 'created_date': datetime.now().isoformat()
             }
             
-            # Remove any existing record with same e_file_id
-            existing_data['records'] = [
-                r for r in existing_data['records'] 
-                if r.get('e_file_id') != e_file_id
-            ]
+            if self.index_writer is not None:
+                self.index_writer.add(record)
+                return
             
-            # Add new record
-            existing_data['records'].append(record)
+            def add_record(index_data):
+                # Remove any existing record with same e_file_id, then add the new one
+                index_data['records'] = [
+                    r for r in index_data.get('records', [])
+                    if r.get('e_file_id') != e_file_id
+                ]
+                index_data['records'].append(record)
             
-            # Save updated index
-            json_data = json.dumps(existing_data, indent=2, default=str)
-            file_client.upload_data(json_data, overwrite=True)
+            self._modify_search_index(add_record)
             
         except Exception as e:
+            metrics.inc('adls_errors_total', operation='update_search_index')
             logging.error(f"Error updating search index: {str(e)}")
     
     def get_extracted_data(self, e_file_id):
@@ -244,8 +418,9 @@ class ADLSHandler:
             file_path = f"{self.config.EXTRACTED_DATA_DIRECTORY}/{e_file_id}.json"
             file_client = self.filesystem_client.get_file_client(file_path)
             
-            download_stream = file_client.download_file()
-            data = json.loads(download_stream.readall().decode('utf-8'))
+            with metrics.timer('adls_operation_seconds', operation='get_extracted_data'):
+                download_stream = file_client.download_file()
+                data = json.loads(download_stream.readall().decode('utf-8'))
             
             return data
             
@@ -253,14 +428,11 @@ class ADLSHandler:
             logging.error(f"Error getting extracted data for {e_file_id}: {str(e)}")
             return None
     
+    @profiler.profiled('adls.search_by_email')
     def search_by_email(self, email):
         """Search records by email"""
         try:
-            index_path = f"{self.config.METADATA_DIRECTORY}/search_index.json"
-            file_client = self.filesystem_client.get_file_client(index_path)
-            
-            download_stream = file_client.download_file()
-            index_data = json.loads(download_stream.readall().decode('utf-8'))
+            index_data = self._read_search_index()
             
             # Search for matching emails
             results = []
@@ -274,14 +446,11 @@ class ADLSHandler:
             logging.error(f"Error searching by email {email}: {str(e)}")
             return []
     
+    @profiler.profiled('adls.search_by_name')
     def search_by_name(self, name):
         """Search records by name"""
         try:
-            index_path = f"{self.config.METADATA_DIRECTORY}/search_index.json"
-            file_client = self.filesystem_client.get_file_client(index_path)
-            
-            download_stream = file_client.download_file()
-            index_data = json.loads(download_stream.readall().decode('utf-8'))
+            index_data = self._read_search_index()
             
             # Search for matching names
             results = []
@@ -303,18 +472,15 @@ class ADLSHandler:
             logging.error(f"Error searching by name {name}: {str(e)}")
             return []
     
+    @profiler.profiled('adls.get_all_records')
     def get_all_records(self, limit=100):
         """Get all records from search index"""
         try:
-            index_path = f"{self.config.METADATA_DIRECTORY}/search_index.json"
-            file_client = self.filesystem_client.get_file_client(index_path)
-            
-            download_stream = file_client.download_file()
-            index_data = json.loads(download_stream.readall().decode('utf-8'))
+            index_data = self._read_search_index()
             
             # Sort by created_date descending and limit
-            records = index_data.get('records', [])
-            records.sort(key=lambda x: x.get('created_date', ''), reverse=True)
+            # sorted() rather than sort(): the index may be the cached copy other lookups share
+            records = sorted(index_data.get('records', []), key=lambda x: x.get('created_date', ''), reverse=True)
             
             return records[:limit]
             
@@ -350,6 +516,7 @@ class ADLSHandler:
             logging.error(f"Error updating extracted data for {e_file_id}: {str(e)}")
             return False
     
+    @profiler.profiled('adls.delete_record')
     def delete_record(self, e_file_id):
         """Delete a record and its associated data"""
         try:
@@ -359,21 +526,16 @@ class ADLSHandler:
             data_file_client.delete_file()
             
             # Update search index to remove the record
-            index_path = f"{self.config.METADATA_DIRECTORY}/search_index.json"
-            file_client = self.filesystem_client.get_file_client(index_path)
+            if self.index_writer is not None:
+                self.index_writer.discard(e_file_id)
             
-            download_stream = file_client.download_file()
-            index_data = json.loads(download_stream.readall().decode('utf-8'))
+            def remove_record(index_data):
+                index_data['records'] = [
+                    r for r in index_data.get('records', [])
+                    if r.get('e_file_id') != e_file_id
+                ]
             
-            # Remove record from index
-            index_data['records'] = [
-                r for r in index_data['records'] 
-                if r.get('e_file_id') != e_file_id
-            ]
-            
-            # Save updated index
-            json_data = json.dumps(index_data, indent=2, default=str)
-            file_client.upload_data(json_data, overwrite=True)
+            self._modify_search_index(remove_record)
             
             return True
             
@@ -0,0 +1,231 @@
+"""
+Rate-limit-aware scheduling for Document Intelligence analyses.
+
+Every analysis goes through one AnalysisScheduler per handler, which
+- caps new analyze requests with a token bucket (requests per second),
+- caps the number of analyses in flight (submitted but not yet finished),
+- backs off on 429 responses, honoring Retry-After for all callers, and
+  halves the request rate, recovering it gradually as requests succeed,
+- picks the poller's polling interval from recently observed analysis times,
+  so short documents are not polled too slowly and long ones not too often.
+
+The client should be built with SchedulerRetryPolicy: the SDK's default
+policy would retry throttled analyze requests itself, so the scheduler would
+never see the 429s it paces on.
+"""
+import logging
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+from azure.core.exceptions import HttpResponseError
+from azure.core.pipeline.policies import RetryPolicy
+
+from metrics import metrics
+
+
+def _retry_after_seconds(error):
+    """Seconds to wait from a throttled response's Retry-After headers, or None"""
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+
+    retry_after_ms = headers.get('retry-after-ms') or headers.get('x-ms-retry-after-ms')
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000.0
+        except ValueError:
+            pass
+
+    retry_after = headers.get('Retry-After') or headers.get('retry-after')
+    if not retry_after:
+        return None
+    try:
+        return float(retry_after)
+    except ValueError:
+        pass
+    try:
+        # HTTP-date form
+        retry_at = parsedate_to_datetime(retry_after)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+class SchedulerRetryPolicy(RetryPolicy):
+    """SDK retries minus throttled analyze submissions, which AnalysisScheduler retries and paces"""
+
+    def is_retry(self, settings, response):
+        # Throttled result polls (GET) keep the SDK's Retry-After handling
+        if response.http_response.status_code == 429 and response.http_request.method == 'POST':
+            return False
+        return super().is_retry(settings, response)
+
+
+class TokenBucket:
+    """Thread-safe token bucket; acquire() blocks until a token is available"""
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = float(burst or max(1.0, rate))
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def set_rate(self, rate):
+        with self._lock:
+            self._refill()
+            self.rate = float(rate)
+
+    def block_for(self, seconds):
+        """Hand out no tokens for the next `seconds` (a server-requested pause)"""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+            self._tokens = 0.0
+            # Refill from the end of the pause, not across it, so no burst follows a 429
+            self._updated = max(self._updated, self._blocked_until)
+
+    def acquire(self):
+        """Take one token; returns the seconds spent waiting"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self._blocked_until:
+                    delay = self._blocked_until - now
+                else:
+                    self._refill()
+                    if self._tokens >= 1.0:
+                        self._tokens -= 1.0
+                        return waited
+                    delay = (1.0 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def _refill(self):
+        now = time.monotonic()
+        # _updated is in the future during a pause
+        if now > self._updated:
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+
+class AnalysisScheduler:
+    """Runs Document Intelligence analyses under a rate limit and concurrency ceiling"""
+
+    def __init__(self, client, requests_per_second=15.0, max_concurrency=8, max_retries=5,
+                 min_poll_interval=1.0, max_poll_interval=10.0, model_id="prebuilt-document"):
+        self.client = client
+        self.model_id = model_id
+        self.requests_per_second = float(requests_per_second)
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.min_poll_interval = min_poll_interval
+        self.max_poll_interval = max_poll_interval
+
+        self._bucket = TokenBucket(self.requests_per_second)
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._rate = self.requests_per_second
+        self._average_seconds = None
+
+    @property
+    def in_flight(self):
+        with self._lock:
+            return self._in_flight
+
+    @property
+    def current_rate(self):
+        with self._lock:
+            return self._rate
+
+    def poll_interval(self):
+        """Polling interval for the next analysis, about a fifth of the recent average duration"""
+        with self._lock:
+            average = self._average_seconds
+        if average is None:
+            return self.min_poll_interval
+        return max(self.min_poll_interval, min(self.max_poll_interval, average / 5.0))
+
+    def analyze(self, document):
+        """Analyze PDF bytes or a binary stream; blocks until the result is ready"""
+        with metrics.timer('document_intelligence_seconds', stage='queue_wait'):
+            self._slots.acquire()
+        self._track_in_flight(1)
+        try:
+            return self._analyze_with_retries(document)
+        finally:
+            self._track_in_flight(-1)
+            self._slots.release()
+
+    def _analyze_with_retries(self, document):
+        start = document.tell() if hasattr(document, 'tell') else None
+
+        for attempt in range(self.max_retries + 1):
+            if start is not None:
+                # A throttled attempt may have consumed the stream
+                document.seek(start)
+
+            metrics.observe('document_intelligence_rate_wait_seconds', self._bucket.acquire())
+            polling_interval = self.poll_interval()
+            started = time.monotonic()
+            try:
+                with metrics.timer('document_intelligence_seconds', stage='begin_analyze'):
+                    poller = self.client.begin_analyze_document(
+                        self.model_id,
+                        document,
+                        polling_interval=polling_interval
+                    )
+                with metrics.timer('document_intelligence_seconds', stage='poll_result'):
+                    result = poller.result()
+            except HttpResponseError as e:
+                if getattr(e, 'status_code', None) != 429 or attempt == self.max_retries:
+                    raise
+                self._on_throttled(e, attempt)
+                continue
+
+            self._on_success(time.monotonic() - started)
+            return result
+
+    def _on_throttled(self, error, attempt):
+        delay = _retry_after_seconds(error)
+        if delay is None:
+            # No hint from the service: exponential backoff with jitter
+            delay = min(60.0, 2 ** attempt) + random.uniform(0, 0.5)
+
+        with self._lock:
+            self._rate = max(0.1, self._rate / 2.0)
+            rate = self._rate
+        self._bucket.set_rate(rate)
+        self._bucket.block_for(delay)
+
+        metrics.inc('document_intelligence_throttled_total')
+        metrics.set_gauge('document_intelligence_request_rate', rate)
+        logging.warning(f"Document Intelligence throttled (attempt {attempt + 1}/{self.max_retries + 1}), "
+                        f"retrying in {delay:.1f}s at {rate:.2f} requests/s")
+
+    def _on_success(self, duration):
+        with self._lock:
+            # Exponentially weighted average of analysis time drives the polling interval
+            if self._average_seconds is None:
+                self._average_seconds = duration
+            else:
+                self._average_seconds = 0.8 * self._average_seconds + 0.2 * duration
+            # Additive recovery towards the configured rate after throttling
+            recovered = self._rate < self.requests_per_second
+            if recovered:
+                self._rate = min(self.requests_per_second, self._rate + max(0.1, self.requests_per_second / 20.0))
+            rate = self._rate
+
+        if recovered:
+            self._bucket.set_rate(rate)
+            metrics.set_gauge('document_intelligence_request_rate', rate)
+
+    def _track_in_flight(self, delta):
+        with self._lock:
+            self._in_flight += delta
+            in_flight = self._in_flight
+        metrics.set_gauge('document_intelligence_in_flight', in_flight)
@@ -0,0 +1,4 @@
+"""
+Offline benchmarks for the PDF chatbot. Run from the repository root, e.g.
+python -m benchmarks.bench_query_engine
+"""
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Throughput of DocumentIntelligenceHandler._extract_patterns on synthetic documents.
+
+    python -m benchmarks.bench_extraction --documents 2000
+"""
+import argparse
+import sys
+import time
+
+from benchmarks.harness import configure_offline_env, result, summarize_ms, write_results
+from benchmarks.synthetic import generate_documents
+
+
+def make_extractor():
+    """DocumentIntelligenceHandler without a remote client; only the regex stage is exercised"""
+    configure_offline_env()
+    from document_intelligence import DocumentIntelligenceHandler
+
+    return DocumentIntelligenceHandler.__new__(DocumentIntelligenceHandler)
+
+
+def run(documents=2000, filler_lines=20):
+    extractor = make_extractor()
+    texts = [text for _, text in generate_documents(documents, filler_lines=filler_lines)]
+    total_bytes = sum(len(text.encode('utf-8')) for text in texts)
+
+    extractor._extract_patterns(texts[0])
+    samples = []
+    started = time.perf_counter()
+    for text in texts:
+        start = time.perf_counter()
+        extractor._extract_patterns(text)
+        samples.append(time.perf_counter() - start)
+    elapsed = time.perf_counter() - started
+
+    metrics = {
+        'docs_per_s': round(documents / elapsed, 1),
+        'mb_per_s': round(total_bytes / elapsed / 1e6, 3),
+        'elapsed_s': round(elapsed, 3)
+    }
+    metrics.update(summarize_ms(samples))
+    return [result('extract_patterns', {'documents': documents, 'filler_lines': filler_lines}, metrics)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark regex extraction throughput")
+    parser.add_argument('--documents', type=int, default=2000, help='Synthetic documents to extract')
+    parser.add_argument('--filler-lines', type=int, default=20, help='Extra lines per document')
+    parser.add_argument('--output', type=str, help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    write_results(run(args.documents, args.filler_lines), args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
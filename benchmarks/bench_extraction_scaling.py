@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Extraction throughput of ExtractionPool against process count.
+
+Runs the same synthetic documents in-thread and through pools of 1, 2, 4, ...
+processes (up to the core count) and reports docs/s and speedup over the
+in-thread baseline.
+
+    python -m benchmarks.bench_extraction_scaling --documents 5000
+"""
+import argparse
+import os
+import sys
+import time
+
+from benchmarks.harness import configure_offline_env, result, write_results
+from benchmarks.synthetic import generate_documents
+
+
+def process_counts(max_processes):
+    counts = []
+    count = 1
+    while count < max_processes:
+        counts.append(count)
+        count *= 2
+    counts.append(max_processes)
+    return counts
+
+
+def run(documents=5000, filler_lines=50, max_processes=None, chunksize=None):
+    configure_offline_env()
+    from extraction_pool import ExtractionPool
+    from extraction_rules import extract_fields
+
+    texts = [text for _, text in generate_documents(documents, filler_lines=filler_lines)]
+    max_processes = max_processes or os.cpu_count() or 1
+    params = {'documents': documents, 'filler_lines': filler_lines}
+
+    started = time.perf_counter()
+    for text in texts:
+        extract_fields(text)
+    baseline = documents / (time.perf_counter() - started)
+    results = [result('extraction_scaling', dict(params, processes=0),
+                      {'docs_per_s': round(baseline, 1), 'speedup': 1.0})]
+
+    for processes in process_counts(max_processes):
+        with ExtractionPool(processes, chunksize=chunksize) as pool:
+            # Start the workers before timing
+            pool.extract_many(texts[:processes * 4], chunksize=1)
+            started = time.perf_counter()
+            pool.extract_many(texts)
+            rate = documents / (time.perf_counter() - started)
+        results.append(result('extraction_scaling', dict(params, processes=processes),
+                              {'docs_per_s': round(rate, 1), 'speedup': round(rate / baseline, 2)}))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark extraction throughput against process count")
+    parser.add_argument('--documents', type=int, default=5000, help='Synthetic documents to extract')
+    parser.add_argument('--filler-lines', type=int, default=50, help='Extra lines per document')
+    parser.add_argument('--max-processes', type=int, default=None, help='Largest pool size (default: core count)')
+    parser.add_argument('--chunksize', type=int, default=None, help='Texts per task (default: about 4 chunks per process)')
+    parser.add_argument('--output', type=str, help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    write_results(run(args.documents, args.filler_lines, args.max_processes, args.chunksize), args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
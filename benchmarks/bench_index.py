@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Cost of ADLSHandler._update_search_index as the index grows.
+
+Every update downloads, rewrites and re-uploads the whole index, so the
+per-update cost is expected to grow linearly with N.
+
+    python -m benchmarks.bench_index --sizes 100 1000 10000 100000
+"""
+import argparse
+import sys
+
+from benchmarks.harness import (configure_offline_env, make_memory_handler, measure_peak_memory, result,
+                                seed_search_index, summarize_ms, time_calls, write_results)
+from benchmarks.synthetic import generate_records
+
+
+def run(sizes=(100, 1000, 10000), updates=10, latency_ms=0.0):
+    configure_offline_env()
+    results = []
+    for size in sizes:
+        handler = make_memory_handler(latency_ms)
+        seed_search_index(handler, generate_records(size))
+
+        new_records = generate_records(size + updates + 1, seed=99)[size:]
+        calls = [
+            (record['e_file_id'].replace('synthetic', 'update'), record, record['file_name'])
+            for record in new_records
+        ]
+        samples = time_calls(handler._update_search_index, calls[1:], warmup=0)
+        _, peak = measure_peak_memory(handler._update_search_index, *calls[0])
+
+        metrics = summarize_ms(samples)
+        metrics['peak_memory_bytes'] = peak
+        results.append(result('update_search_index', {'index_size': size, 'latency_ms': latency_ms}, metrics))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark search index updates vs. index size")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000], help='Index sizes to test')
+    parser.add_argument('--updates', type=int, default=10, help='Updates timed per size')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='Injected storage latency')
+    parser.add_argument('--output', type=str, help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    write_results(run(args.sizes, args.updates, args.latency_ms), args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
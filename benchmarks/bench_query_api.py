@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Load test for query_api.py.
+
+Starts QueryAPIServer in-process on a seeded in-memory index and drives it
+from client threads issuing a mix of /query, /search and /records requests.
+With keep-alive each client reuses one connection; --no-keep-alive opens a
+connection per request for comparison. Reports p50/p95/p99 latency and QPS
+per concurrency level.
+
+    python -m benchmarks.bench_query_api --concurrency 1 8 32 --requests 2000
+"""
+import argparse
+import http.client
+import json
+import random
+import sys
+import threading
+import time
+
+from benchmarks.harness import configure_offline_env, make_memory_handler, result, seed_search_index, summarize_ms, write_results
+from benchmarks.synthetic import generate_records
+
+QUESTIONS = [
+    "How many people are there?",
+    "Give me summary statistics",
+    "Show confidence scores",
+    "Show me recent files",
+]
+
+
+def request_mix(records, count, seed=11):
+    """(method, path, body) tuples: half questions, the rest searches and listings"""
+    rng = random.Random(seed)
+    requests = []
+    for i in range(count):
+        record = rng.choice(records)
+        kind = i % 6
+        if kind < 3:
+            requests.append(('POST', '/query', {'question': QUESTIONS[i % len(QUESTIONS)]}))
+        elif kind == 3:
+            requests.append(('GET', f"/search?name={record['last_name']}", None))
+        elif kind == 4:
+            requests.append(('GET', f"/search?email={record['email']}", None))
+        else:
+            requests.append(('GET', '/records?limit=20', None))
+    return requests
+
+
+def drive(port, requests, concurrency, keep_alive=True):
+    """Send requests from `concurrency` client threads; returns (latencies, errors, elapsed)"""
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    next_index = iter(range(len(requests)))
+
+    def client():
+        connection = None
+        while True:
+            with lock:
+                index = next(next_index, None)
+            if index is None:
+                break
+            method, path, body = requests[index]
+            payload = json.dumps(body).encode('utf-8') if body is not None else None
+            headers = {'Content-Type': 'application/json'} if payload else {}
+            if not keep_alive:
+                headers['Connection'] = 'close'
+            started = time.perf_counter()
+            try:
+                if connection is None:
+                    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+                connection.request(method, path, body=payload, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                ok = response.status == 200
+            except (OSError, http.client.HTTPException):
+                ok = False
+                connection = None
+            elapsed = time.perf_counter() - started
+            if connection is not None and not keep_alive:
+                connection.close()
+                connection = None
+            with lock:
+                latencies.append(elapsed)
+                if not ok:
+                    errors.append(index)
+        if connection is not None:
+            connection.close()
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors, time.perf_counter() - started
+
+
+def run(concurrency_levels=(1, 8, 32), requests=1000, records=5000, workers=16, latency_ms=0.0, keep_alive=True):
+    configure_offline_env('memory')
+    from query_api import QueryAPI, QueryAPIServer
+    from query_engine import QueryEngine
+
+    handler = make_memory_handler(latency_ms)
+    seeded = generate_records(records)
+    seed_search_index(handler, seeded)
+    api = QueryAPI(handler, QueryEngine(handler))
+    mix = request_mix(seeded, requests)
+
+    results = []
+    with QueryAPIServer(api, port=0, workers=workers) as server:
+        # Warm the index cache and engine before timing
+        drive(server.port, mix[:20], 1)
+        for concurrency in concurrency_levels:
+            latencies, errors, elapsed = drive(server.port, mix, concurrency, keep_alive)
+            metrics = {
+                'failures': len(errors),
+                'elapsed_s': round(elapsed, 3),
+                'throughput_qps': round(len(latencies) / elapsed, 1) if elapsed else 0.0
+            }
+            metrics.update(summarize_ms(latencies))
+            params = {'concurrency': concurrency, 'requests': requests, 'records': records, 'workers': workers,
+                      'storage_latency_ms': latency_ms, 'keep_alive': keep_alive}
+            results.append(result('query_api_load', params, metrics))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the HTTP query API against local stand-ins")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32], help='Concurrent clients to test')
+    parser.add_argument('--requests', type=int, default=1000, help='Requests per concurrency level')
+    parser.add_argument('--records', type=int, default=5000, help='Synthetic index records')
+    parser.add_argument('--workers', type=int, default=16, help='Server worker threads')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='Injected storage latency')
+    parser.add_argument('--no-keep-alive', action='store_true', help='Open a new connection per request')
+    parser.add_argument('--output', type=str, help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    write_results(run(args.concurrency, args.requests, args.records, args.workers, args.latency_ms,
+                      keep_alive=not args.no_keep_alive), args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+End-to-end QueryEngine latency and throughput benchmark.
+
+Starts llm_stub_server in-process, points QueryEngine at it through
+OPENAI_BASE_URL and fires questions from a thread pool. The OpenAI client is
+built with max_retries=0 so errors injected with --error-rate are not hidden
+by SDK retries; AI errors and pattern-matching fallbacks are counted
+separately from failed answers.
+
+    python -m benchmarks.bench_query_engine --latency-ms 150 --jitter-ms 50 --concurrency 8
+"""
+import argparse
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.harness import configure_offline_env, make_memory_handler, result, seed_search_index, summarize_ms, write_results
+from benchmarks.synthetic import generate_records
+from llm_stub_server import LLMStubServer, StubSettings
+from metrics import metrics
+
+QUESTIONS = [
+    "How many files are processed?",
+    "How many people are in the system?",
+    "Find John Smith",
+    "Search for email john.smith@example.com",
+    "Show me recent files",
+    "What kind of documents do I have?",
+    "Show confidence scores",
+    "Give me summary statistics",
+]
+
+
+def run_benchmark(base_url, requests, concurrency, record_count, use_ai=True):
+    """Run the question mix through QueryEngine and collect latency samples"""
+    configure_offline_env('memory', llm_base_url=base_url)
+    from query_engine import QueryEngine
+
+    handler = make_memory_handler()
+    seed_search_index(handler, generate_records(record_count))
+    engine = QueryEngine(handler)
+    engine.use_ai = use_ai and engine.use_ai
+    if engine.openai_client is not None:
+        # Injected stub errors must surface, not be retried away inside the SDK
+        engine.openai_client = engine.openai_client.with_options(max_retries=0)
+
+    def ask(i):
+        question = QUESTIONS[i % len(QUESTIONS)]
+        start = time.perf_counter()
+        response = engine.process_query(question)
+        return time.perf_counter() - start, response.get('success', False)
+
+    # QueryEngine's own counters tell AI answers, AI errors and pattern fallbacks apart
+    was_enabled = metrics.enabled
+    metrics.enabled = True
+    metrics.reset()
+    try:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            samples = list(pool.map(ask, range(requests)))
+        elapsed = time.perf_counter() - started
+        counters = metrics.snapshot()['counters']
+    finally:
+        metrics.reset()
+        metrics.enabled = was_enabled
+
+    def count(name, **labels):
+        return sum(c['value'] for c in counters
+                   if c['name'] == name and all(c['labels'].get(k) == v for k, v in labels.items()))
+
+    entry_metrics = {
+        'failures': sum(1 for _, ok in samples if not ok),
+        'ai_errors': count('openai_errors_total'),
+        'ai_fallbacks': count('queries_total', path='pattern') if engine.use_ai else 0,
+        'elapsed_s': round(elapsed, 3),
+        'throughput_qps': round(requests / elapsed, 2) if elapsed else 0.0
+    }
+    entry_metrics.update(summarize_ms([latency for latency, _ in samples]))
+    params = {
+        'ai_enabled': engine.use_ai,
+        'requests': requests,
+        'concurrency': concurrency,
+        'records': record_count
+    }
+    return result('query_engine_end_to_end', params, entry_metrics)
+
+
+def run(requests=200, concurrency=4, records=1000, latency_ms=100.0, jitter_ms=25.0,
+        error_rate=0.0, seed=42, use_ai=True):
+    settings = StubSettings(latency_ms, jitter_ms, error_rate, seed=seed)
+    with LLMStubServer(settings=settings) as server:
+        entry = run_benchmark(server.base_url, requests, concurrency, records, use_ai=use_ai)
+    entry['params'].update({'stub_latency_ms': latency_ms, 'stub_jitter_ms': jitter_ms, 'stub_error_rate': error_rate})
+    return [entry]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark QueryEngine against the local LLM stub")
+    parser.add_argument('--requests', type=int, default=200, help='Total questions to ask')
+    parser.add_argument('--concurrency', type=int, default=4, help='Concurrent callers')
+    parser.add_argument('--records', type=int, default=1000, help='Synthetic index records')
+    parser.add_argument('--latency-ms', type=float, default=100.0, help='Stub base latency')
+    parser.add_argument('--jitter-ms', type=float, default=25.0, help='Stub latency jitter')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Stub error rate (0-1)')
+    parser.add_argument('--seed', type=int, default=42, help='Stub random seed')
+    parser.add_argument('--no-ai', action='store_true', help='Measure the pattern-matching path only')
+    parser.add_argument('--output', type=str, help='Write results as JSON to this file')
+
+    args = parser.parse_args()
+
+    results = run(args.requests, args.concurrency, args.records, args.latency_ms,
+                  args.jitter_ms, args.error_rate, args.seed, use_ai=not args.no_ai)
+    write_results(results, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
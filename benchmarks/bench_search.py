@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Latency percentiles of ADLSHandler.search_by_name / search_by_email.
+
+    python -m benchmarks.bench_search --sizes 1000 100000 --queries 50
+"""
+import argparse
+import random
+import sys
+
+from benchmarks.harness import configure_offline_env, make_memory_handler, result, seed_search_index, summarize_ms, time_calls, write_results
+from benchmarks.synthetic import generate_records
+
+
+def run(sizes=(1000, 10000), queries=50, latency_ms=0.0):
+    configure_offline_env()
+    results = []
+    rng = random.Random(5)
+    for size in sizes:
+        handler = make_memory_handler(latency_ms)
+        records = generate_records(size)
+        seed_search_index(handler, records)
+
+        sample = [rng.choice(records) for _ in range(queries)]
+        name_samples = time_calls(handler.search_by_name, [(r['last_name'],) for r in sample])
+        email_samples = time_calls(handler.search_by_email, [(r['email'],) for r in sample])
+
+        params = {'index_size': size, 'latency_ms': latency_ms}
+        results.append(result('search_by_name', params, summarize_ms(name_samples)))
+        results.append(result('search_by_email', params, summarize_ms(email_samples)))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark name/email search latency")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000], help='Index sizes to test')
+    parser.add_argument('--queries', type=int, default=50, help='Queries per search type and size')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='Injected storage latency')
+    parser.add_argument('--output', type=str, help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    write_results(run(args.sizes, args.queries, args.latency_ms), args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Cold-start latency of cli_chatbot.py per subcommand.
+
+Each subcommand runs in a fresh interpreter against an empty local storage
+backend: several timed runs give the wall-clock latency, and one extra run
+under `python -X importtime` gives the total import time, the number of
+modules loaded and how many of the heavy SDKs (storage, Form Recognizer,
+OpenAI, pandas, pypdf) were imported. `interpreter` is a bare `python -c pass`
+for reference.
+
+    python -m benchmarks.bench_startup --repeats 5
+    python -m benchmarks.bench_startup --only list get_record --show-imports 10
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.harness import configure_offline_env, result, write_results
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CLI = os.path.join(ROOT, 'cli_chatbot.py')
+
+SUBCOMMANDS = {
+    'interpreter': None,
+    'help': [],
+    'list': ['--list'],
+    'search_email': ['--search-email', 'nobody@example.com'],
+    'search_name': ['--search-name', 'Nobody'],
+    'get_record': ['--get-record', 'missing'],
+    'query': ['--query', 'How many people are there?'],
+}
+
+HEAVY_MODULES = ('azure.storage.filedatalake', 'azure.ai.formrecognizer', 'openai', 'pandas', 'pypdf')
+
+
+def _command(args, importtime=False):
+    command = [sys.executable]
+    if importtime:
+        command += ['-X', 'importtime']
+    if args is None:
+        return command + ['-c', 'pass']
+    return command + [CLI] + args
+
+
+def parse_importtime(stderr):
+    """Return {module: (self_us, cumulative_us, depth)} from -X importtime output"""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_field, cumulative_field, name = line[len('import time:'):].split('|', 2)
+        self_us, cumulative_us = int(self_field), int(cumulative_field)
+        # Nesting is shown as two spaces per level after the separator's own space
+        depth = (len(name) - len(name.lstrip(' ')) - 1) // 2
+        modules[name.strip()] = (self_us, cumulative_us, depth)
+    return modules
+
+
+def measure(args, repeats=5):
+    """Wall-clock samples (seconds) plus the import profile of one extra run"""
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        subprocess.run(_command(args), cwd=ROOT, capture_output=True)
+        samples.append(time.perf_counter() - started)
+    profile = subprocess.run(_command(args, importtime=True), cwd=ROOT, capture_output=True, text=True)
+    return samples, parse_importtime(profile.stderr)
+
+
+def run(repeats=5, only=None, show_imports=0):
+    configure_offline_env('local')
+    # Every run starts from the same empty store, outside the working tree
+    os.environ['LOCAL_STORAGE_PATH'] = tempfile.mkdtemp(prefix='bench_startup_')
+
+    results = []
+    for name in only or SUBCOMMANDS:
+        samples, modules = measure(SUBCOMMANDS[name], repeats)
+        top_level = [cumulative for _, cumulative, depth in modules.values() if depth == 0]
+        heavy = [module for module in HEAVY_MODULES if module in modules]
+        results.append(result('cli_startup', {'subcommand': name}, {
+            'p50_ms': round(statistics.median(samples) * 1000, 1),
+            'min_ms': round(min(samples) * 1000, 1),
+            'import_ms': round(sum(top_level) / 1000, 1),
+            'modules': len(modules),
+            'heavy_modules': len(heavy)
+        }))
+        if show_imports:
+            slowest = sorted(modules.items(), key=lambda item: item[1][0], reverse=True)[:show_imports]
+            print(f"\n{name}: heavy={heavy or 'none'}", file=sys.stderr)
+            for module, (self_us, cumulative_us, _) in slowest:
+                print(f"  {self_us / 1000:8.1f} ms self {cumulative_us / 1000:8.1f} ms total  {module}", file=sys.stderr)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cli_chatbot.py cold-start latency per subcommand")
+    parser.add_argument('--repeats', type=int, default=5, help='Timed runs per subcommand')
+    parser.add_argument('--only', nargs='+', choices=sorted(SUBCOMMANDS), help='Run only these subcommands')
+    parser.add_argument('--show-imports', type=int, default=0, help='Print the N slowest imports per subcommand')
+    parser.add_argument('--output', type=str, help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    write_results(run(args.repeats, args.only, args.show_imports), args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+QueryEngine statistics latency and memory peak (pattern-matching path).
+
+    python -m benchmarks.bench_stats --sizes 1000 10000
+"""
+import argparse
+import sys
+
+from benchmarks.harness import (configure_offline_env, make_memory_handler, measure_peak_memory, result,
+                                seed_search_index, summarize_ms, time_calls, write_results)
+from benchmarks.synthetic import generate_records
+
+STATS_QUERIES = {
+    'count_files': "how many files are processed",
+    'count_people': "how many people are there",
+    'files_by_type': "what kind of documents do I have",
+    'confidence_stats': "show confidence scores",
+    'summary_stats': "give me summary statistics",
+}
+
+
+def run(sizes=(1000, 10000), repeats=20, latency_ms=0.0):
+    from query_engine import QueryEngine
+
+    configure_offline_env()
+    results = []
+    for size in sizes:
+        handler = make_memory_handler(latency_ms)
+        seed_search_index(handler, generate_records(size))
+        engine = QueryEngine(handler)
+        engine.use_ai = False
+
+        for query_type, question in STATS_QUERIES.items():
+            samples = time_calls(engine.process_query, [(question,)] * repeats)
+            _, peak = measure_peak_memory(engine.process_query, question)
+
+            metrics = summarize_ms(samples)
+            metrics['peak_memory_bytes'] = peak
+            results.append(result(
+                'query_engine_stats',
+                {'query_type': query_type, 'index_size': size, 'latency_ms': latency_ms},
+                metrics
+            ))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark QueryEngine statistics queries")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000], help='Index sizes to test')
+    parser.add_argument('--repeats', type=int, default=20, help='Timed calls per query type')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='Injected storage latency')
+    parser.add_argument('--output', type=str, help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    write_results(run(args.sizes, args.repeats, args.latency_ms), args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Compare two benchmark JSON files and flag regressions.
+
+    python -m benchmarks.compare baseline.json candidate.json --threshold 0.15
+
+Metrics ending in _ms, _s or _bytes are lower-is-better; metrics ending in
+_per_s or _qps are higher-is-better. Other metrics are reported but never
+flagged. Exits with status 1 when any regression exceeds the threshold.
+"""
+import argparse
+import json
+import sys
+
+LOWER_IS_BETTER = ('_ms', '_s', '_bytes')
+HIGHER_IS_BETTER = ('_per_s', '_qps')
+
+
+def _key(entry):
+    return entry['benchmark'], json.dumps(entry.get('params', {}), sort_keys=True)
+
+
+def _direction(metric):
+    if metric.endswith(HIGHER_IS_BETTER):
+        return 1
+    if metric.endswith(LOWER_IS_BETTER):
+        return -1
+    return 0
+
+
+def compare(baseline, candidate, threshold=0.1):
+    """Return rows of (benchmark, params, metric, old, new, change, status)"""
+    baseline_entries = {_key(entry): entry for entry in baseline.get('results', [])}
+    rows = []
+
+    for entry in candidate.get('results', []):
+        key = _key(entry)
+        previous = baseline_entries.get(key)
+        if not previous:
+            continue
+
+        for metric, new_value in entry.get('metrics', {}).items():
+            old_value = previous.get('metrics', {}).get(metric)
+            if not isinstance(new_value, (int, float)) or not isinstance(old_value, (int, float)) or not old_value:
+                continue
+
+            change = (new_value - old_value) / abs(old_value)
+            direction = _direction(metric)
+            status = 'ok'
+            if direction and change * direction < -threshold:
+                status = 'REGRESSION'
+            elif direction and change * direction > threshold:
+                status = 'improved'
+            rows.append((key[0], key[1], metric, old_value, new_value, change, status))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument('baseline', help='Baseline results JSON')
+    parser.add_argument('candidate', help='Candidate results JSON')
+    parser.add_argument('--threshold', type=float, default=0.1, help='Relative change treated as significant')
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    rows = compare(baseline, candidate, args.threshold)
+    print(f"Baseline:  {baseline.get('metadata', {}).get('git_commit')}  "
+          f"Candidate: {candidate.get('metadata', {}).get('git_commit')}\n")
+    for benchmark, params, metric, old_value, new_value, change, status in rows:
+        marker = {'REGRESSION': '❌', 'improved': '✅'}.get(status, '  ')
+        print(f"{marker} {benchmark} {params} {metric}: {old_value} -> {new_value} ({change:+.1%})")
+
+    regressions = [row for row in rows if row[-1] == 'REGRESSION']
+    print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%} across {len(rows)} compared metrics")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
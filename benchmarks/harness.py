@@ -0,0 +1,143 @@
+"""
+Shared helpers for the benchmarks: offline environment setup, timing,
+percentiles, memory peaks and JSON result files.
+"""
+import json
+import math
+import os
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime
+
+OFFLINE_ENV = {
+    'DOCUMENT_INTELLIGENCE_ENDPOINT': 'https://benchmark.invalid/',
+    'DOCUMENT_INTELLIGENCE_KEY': 'benchmark',
+    'ADLS_ACCOUNT_NAME': 'benchmark',
+    'ADLS_ACCOUNT_KEY': 'benchmark',
+}
+
+
+def configure_offline_env(storage_backend='memory', llm_base_url=None):
+    """Point Config at local stand-ins so no Azure or OpenAI call is made"""
+    for name, value in OFFLINE_ENV.items():
+        os.environ.setdefault(name, value)
+    os.environ['STORAGE_BACKEND'] = storage_backend
+
+    # QueryEngine stays on pattern matching unless routed to the LLM stub
+    if llm_base_url:
+        os.environ['OPENAI_API_KEY'] = 'stub-key'
+        os.environ['OPENAI_BASE_URL'] = llm_base_url
+    else:
+        os.environ.pop('OPENAI_API_KEY', None)
+        os.environ.pop('OPENAI_BASE_URL', None)
+
+    # Shared Config and clients were built from the previous environment
+    import client_registry
+    client_registry.reset()
+
+
+def make_memory_handler(latency_ms=0.0, jitter_ms=0.0):
+    """Create an ADLSHandler on a fresh in-memory backend (call configure_offline_env first)"""
+    from adls_handler import ADLSHandler
+    from storage_backends import InMemoryStorageBackend
+
+    return ADLSHandler(filesystem_client=InMemoryStorageBackend(latency_ms, jitter_ms))
+
+
+def seed_search_index(handler, records):
+    """Write a search index with the given records in a single upload"""
+    index_path = f"{handler.config.METADATA_DIRECTORY}/search_index.json"
+    file_client = handler.filesystem_client.get_file_client(index_path)
+    file_client.upload_data(json.dumps({'records': records}, indent=2, default=str), overwrite=True)
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    # Smallest value with at least pct% of the samples at or below it
+    index = max(0, min(len(ordered) - 1, math.ceil(pct / 100.0 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize_ms(samples_s):
+    """Summarize latency samples (in seconds) as millisecond statistics"""
+    samples_ms = [sample * 1000 for sample in samples_s]
+    if not samples_ms:
+        return {}
+    return {
+        'mean_ms': round(statistics.mean(samples_ms), 3),
+        'p50_ms': round(percentile(samples_ms, 50), 3),
+        'p95_ms': round(percentile(samples_ms, 95), 3),
+        'p99_ms': round(percentile(samples_ms, 99), 3),
+        'max_ms': round(max(samples_ms), 3)
+    }
+
+
+def time_calls(fn, args_list, warmup=1):
+    """Call fn once per argument tuple and return the per-call durations in seconds"""
+    for args in args_list[:warmup]:
+        fn(*args)
+    samples = []
+    for args in args_list:
+        start = time.perf_counter()
+        fn(*args)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def measure_peak_memory(fn, *args, **kwargs):
+    """Run fn under tracemalloc and return (result, peak_bytes)"""
+    already_tracing = tracemalloc.is_tracing()
+    if not already_tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    try:
+        result = fn(*args, **kwargs)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        if not already_tracing:
+            tracemalloc.stop()
+    return result, peak
+
+
+def result(benchmark, params, metrics):
+    """Build one result entry; compare.py matches entries on (benchmark, params)"""
+    return {'benchmark': benchmark, 'params': params, 'metrics': metrics}
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def run_metadata():
+    """Describe the environment a benchmark run was taken in"""
+    return {
+        'timestamp': datetime.now().isoformat(),
+        'git_commit': _git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count()
+    }
+
+
+def write_results(results, path=None):
+    """Print results and optionally save them as JSON for compare.py"""
+    document = {'metadata': run_metadata(), 'results': results}
+    print(json.dumps(document, indent=2))
+    if path:
+        with open(path, 'w') as f:
+            json.dump(document, f, indent=2)
+        print(f"\n💾 Results written to {path}")
+    return document
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Run the whole benchmark suite and write one JSON document.
+
+    python -m benchmarks.run_all --output bench_output.json
+    python -m benchmarks.run_all --quick
+    python -m benchmarks.compare baseline.json bench_output.json
+"""
+import argparse
+import logging
+import sys
+
+from benchmarks import (bench_extraction, bench_extraction_scaling, bench_index, bench_query_api, bench_query_engine,
+                        bench_search, bench_startup, bench_stats)
+from benchmarks.harness import write_results
+
+SUITES = {
+    'extraction': lambda quick: bench_extraction.run(documents=300 if quick else 2000),
+    'extraction_scaling': lambda quick: bench_extraction_scaling.run(documents=500 if quick else 5000,
+                                                                     max_processes=2 if quick else None),
+    'index': lambda quick: bench_index.run(sizes=(100, 1000) if quick else (100, 1000, 10000, 100000),
+                                           updates=3 if quick else 10),
+    'search': lambda quick: bench_search.run(sizes=(1000,) if quick else (1000, 10000, 100000),
+                                             queries=10 if quick else 50),
+    'stats': lambda quick: bench_stats.run(sizes=(1000,) if quick else (1000, 10000),
+                                           repeats=5 if quick else 20),
+    'query_engine': lambda quick: bench_query_engine.run(requests=40 if quick else 200,
+                                                         latency_ms=20.0 if quick else 100.0),
+    'query_api': lambda quick: bench_query_api.run(concurrency_levels=(1, 8) if quick else (1, 8, 32),
+                                                   requests=200 if quick else 1000),
+    'startup': lambda quick: bench_startup.run(repeats=2 if quick else 5),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the PDF chatbot benchmark suite")
+    parser.add_argument('--quick', action='store_true', help='Smaller sizes for a fast smoke run')
+    parser.add_argument('--only', nargs='+', choices=sorted(SUITES), help='Run only these suites')
+    parser.add_argument('--output', type=str, help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    # Handler and engine logging would otherwise dominate the output
+    logging.getLogger().setLevel(logging.WARNING)
+
+    results = []
+    for name in args.only or SUITES:
+        print(f"⏱️  Running {name} benchmarks...", file=sys.stderr)
+        results.extend(SUITES[name](args.quick))
+
+    write_results(results, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+"""
+Synthetic corpus generators for the benchmarks: fake employee records,
+document text resembling the sample employee PDFs, and minimal PDFs with an
+embedded text layer.
+"""
+import random
+from datetime import datetime, timedelta
+
+FIRST_NAMES = ['John', 'Mary', 'Alex', 'Priya', 'Chen', 'Fatima', 'Luis', 'Olga',
+               'Kwame', 'Sofia', 'Hiroshi', 'Amara', 'Noah', 'Elena', 'Omar', 'Grace']
+LAST_NAMES = ['Smith', 'Johnson', 'Garcia', 'Patel', 'Wang', 'Khan', 'Silva', 'Ivanova',
+              'Mensah', 'Rossi', 'Tanaka', 'Okafor', 'Brown', 'Novak', 'Haddad', 'Lee']
+STREETS = ['Main Street', 'Oak Avenue', 'Maple Road', 'Sunset Boulevard', 'Pine Drive', 'Elm St']
+CITIES = ['Springfield', 'Riverside', 'Fairview', 'Madison', 'Georgetown', 'Franklin']
+DEPARTMENTS = ['Cardiology', 'Radiology', 'Pediatrics', 'Oncology', 'Emergency', 'Pharmacy']
+DOCUMENT_TYPES = ['Passport', 'Driver License', 'Id Card', 'Birth Certificate', 'Resume', 'Cv', None]
+EMAIL_DOMAINS = ['example.com', 'hospital.org', 'mail.test', 'clinic.net']
+
+
+def generate_person(rng, index):
+    """Generate one fake employee"""
+    first_name = rng.choice(FIRST_NAMES)
+    last_name = rng.choice(LAST_NAMES)
+    age = rng.randint(21, 67)
+    return {
+        'first_name': first_name,
+        'last_name': last_name,
+        'email': f"{first_name}.{last_name}{index}@{rng.choice(EMAIL_DOMAINS)}".lower(),
+        'phone_number': f"({rng.randint(200, 999)}) {rng.randint(200, 999)}-{rng.randint(0, 9999):04d}",
+        'address': f"{rng.randint(1, 9999)} {rng.choice(STREETS)}, {rng.choice(CITIES)}",
+        'age': age,
+        'date_of_birth': f"{datetime.now().year - age}-01-01",
+        'department': rng.choice(DEPARTMENTS),
+        'document_type': rng.choice(DOCUMENT_TYPES),
+        'confidence_score': round(rng.uniform(0.55, 0.99), 3)
+    }
+
+
+def generate_records(count, seed=1234):
+    """Generate search-index records shaped like ADLSHandler._update_search_index output"""
+    rng = random.Random(seed)
+    start = datetime.now() - timedelta(days=30)
+    records = []
+    for i in range(count):
+        person = generate_person(rng, i)
+        records.append({
+            'e_file_id': f"synthetic-{i:08d}",
+            'file_name': f"employee_{i:08d}.pdf",
+            'first_name': person['first_name'],
+            'last_name': person['last_name'],
+            'email': person['email'],
+            'phone_number': person['phone_number'],
+            'address': person['address'],
+            'date_of_birth': person['date_of_birth'],
+            'age': person['age'],
+            'document_type': person['document_type'],
+            'confidence_score': person['confidence_score'],
+            'created_date': (start + timedelta(seconds=i * 7)).isoformat()
+        })
+    return records
+
+
+def render_document_text(person, filler_lines=20, rng=None):
+    """Render employee document text similar to employee1.pdf/employee2.pdf"""
+    rng = rng or random.Random(0)
+    lines = [
+        "Healthcare Employee Record",
+        f"Name: {person['first_name']} {person['last_name']}",
+        f"Email: {person['email']}",
+        f"Phone: {person['phone_number']}",
+        f"Address: {person['address']}",
+        f"Age: {person['age']}",
+        f"Department: {person['department']}",
+    ]
+    if person.get('document_type'):
+        lines.append(f"Document: {person['document_type']}")
+    for i in range(filler_lines):
+        lines.append(
+            f"Note {i + 1}: shift {rng.randint(1, 3)} coverage confirmed for ward {rng.randint(1, 40)}."
+        )
+    return "\n".join(lines) + "\n"
+
+
+def generate_documents(count, seed=1234, filler_lines=20):
+    """Generate (person, text) pairs for extraction benchmarks"""
+    rng = random.Random(seed)
+    return [
+        (person, render_document_text(person, filler_lines, rng))
+        for person in (generate_person(rng, i) for i in range(count))
+    ]
+
+
+def _escape_pdf_text(text):
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def generate_pdf_bytes(pages_text):
+    """Build a minimal born-digital PDF (Helvetica text layer), one string per page"""
+    if isinstance(pages_text, str):
+        pages_text = [pages_text]
+
+    objects = []
+
+    def add(body):
+        objects.append(body)
+        return len(objects)
+
+    catalog_id = add(None)
+    pages_id = add(None)
+    font_id = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    page_ids = []
+    for text in pages_text:
+        commands = ["BT", "/F1 11 Tf", "14 TL", "50 780 Td"]
+        for line in text.splitlines():
+            commands.append(f"({_escape_pdf_text(line)}) Tj T*")
+        commands.append("ET")
+        stream = "\n".join(commands).encode('latin-1', 'replace')
+        content_id = add(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        page_ids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>" % (pages_id, font_id, content_id)
+        ))
+
+    objects[catalog_id - 1] = b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id
+    kids = b" ".join(b"%d 0 R" % page_id for page_id in page_ids)
+    objects[pages_id - 1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids))
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+
+    xref_offset = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        output += b"%010d 00000 n \n" % offset
+    output += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1, catalog_id, xref_offset
+    )
+    return bytes(output)
@@ -1,8 +1,11 @@
 import streamlit as st
 import pandas as pd
 from adls_handler import ADLSHandler
-from document_intelligence import DocumentIntelligenceHandler
+import client_registry
 from query_engine import QueryEngine
+from persistence import create_persistence_sink
+from ingestion import IngestionPipeline
+from job_queue import create_job_queue
 import logging
 import uuid
 from datetime import datetime
@@ -10,49 +13,108 @@ from datetime import datetime
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 
+def _cache_ttl():
+    # Decorators need the TTL at import; a broken config is reported by PDFChatbot() below
+    try:
+        return client_registry.get_config().STREAMLIT_CACHE_SECONDS
+    except Exception:
+        return 60
+
+CACHE_TTL = _cache_ttl()
+
+@st.cache_resource
+def get_query_clients():
+    """ADLSHandler and QueryEngine shared by all sessions, so clients and the index cache stay warm"""
+    adls_handler = ADLSHandler()
+    return adls_handler, QueryEngine(adls_handler)
+
+@st.cache_resource
+def get_job_queue():
+    """Process-wide ingestion queue and workers, shared by all sessions"""
+    adls_handler = ADLSHandler()
+    # One merged index write per batch instead of one per file; each job flushes before it reports done
+    adls_handler.enable_index_batching()
+    # ADLS JSON, plus the SQL row when PERSISTENCE_MODE=dual
+    persistence = create_persistence_sink(adls_handler.config, adls_handler)
+    pipeline = IngestionPipeline(adls_handler, client_registry.get_document_intelligence(), persistence, frontend='streamlit')
+    # Finished jobs change the file counts and records every session shows
+    job_queue = create_job_queue(adls_handler.config, pipeline, on_finished=lambda job_id: clear_data_caches())
+    job_queue.start()
+    return job_queue
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def load_pdf_files(_adls_handler):
+    """PDF listing for the sidebar and the Process PDFs page"""
+    return _adls_handler.list_pdf_files()
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def load_quick_stats(_adls_handler):
+    """Sidebar counts: PDF files, processed files and unique people (by email)"""
+    all_records = _adls_handler.get_all_records(limit=1000)
+    unique_emails = {record['email'].strip().lower() for record in all_records if (record.get('email') or '').strip()}
+    return {
+        'pdf_files': len(load_pdf_files(_adls_handler)),
+        'processed_files': len(all_records),
+        'unique_people': len(unique_emails)
+    }
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def load_records_table(_adls_handler, limit=100):
+    """Most recent records as a display DataFrame plus its CSV export; (None, None) if there are none"""
+    records = _adls_handler.get_all_records(limit=limit)
+    if not records:
+        return None, None
+    df = pd.DataFrame(records)
+    # Format datetime columns
+    if 'created_date' in df.columns:
+        df['created_date'] = pd.to_datetime(df['created_date']).dt.strftime('%Y-%m-%d %H:%M')
+    return df, df.to_csv(index=False)
+
+def clear_data_caches():
+    """Drop cached listings, stats and tables (after ingestion or an upload)"""
+    load_pdf_files.clear()
+    load_quick_stats.clear()
+    load_records_table.clear()
+
+@st.fragment(run_every=2)
+def show_jobs(job_queue, session_id):
+    """Progress of this session's ingestion jobs, refreshed while the page is open"""
+    jobs = job_queue.list_jobs(limit=10, submitted_by=session_id)
+    
+    # When one of our jobs finishes (possibly on a CLI worker), refresh the whole page's data
+    finished = {job['id'] for job in jobs if job['status'] not in ('queued', 'running')}
+    if 'finished_jobs' not in st.session_state:
+        st.session_state.finished_jobs = finished
+    elif finished - st.session_state.finished_jobs:
+        st.session_state.finished_jobs |= finished
+        clear_data_caches()
+        st.rerun()
+    
+    if not jobs:
+        return
+    
+    st.subheader("Ingestion Jobs:")
+    for job in jobs:
+        label = job['files'][0] if job['total'] == 1 else f"{job['total']} files"
+        if job['status'] in ('queued', 'running'):
+            current = f" - {job['current_file']}" if job['current_file'] else ""
+            st.progress(job['progress'], text=f"⏳ {label}: {job['status']} ({job['completed']}/{job['total']}){current}")
+        else:
+            icon = "✅" if job['status'] == 'done' and not job['failed'] else "⚠️" if job['status'] == 'done' else "❌"
+            with st.expander(f"{icon} {label}: {job['completed'] - job['failed']} processed, {job['failed']} failed"):
+                for result in job['results']:
+                    if result['status'] == 'processed':
+                        st.write(f"**{result['file_name']}** - E-File ID: {result['e_file_id']}")
+                        st.session_state.last_processed_id = result['e_file_id']
+                    else:
+                        st.write(f"**{result['file_name']}** - {result['error']}")
+
 class PDFChatbot:
     def __init__(self):
-        self.adls_handler = ADLSHandler()
-        self.doc_intelligence = DocumentIntelligenceHandler()
-        self.query_engine = QueryEngine(self.adls_handler)
-    
-    def process_pdf_file(self, file_name):
-        """Process a single PDF file"""
-        try:
-            # Download PDF from ADLS
-            st.info(f"Downloading {file_name}...")
-            pdf_content = self.adls_handler.download_pdf(file_name)
-            
-            if not pdf_content:
-                st.error(f"Failed to download {file_name}")
-                return None
-            
-            # Extract personal information
-            st.info("Extracting personal information...")
-            personal_info = self.doc_intelligence.extract_personal_info(pdf_content)
-            
-            if not personal_info:
-                st.error("Failed to extract personal information")
-                return None
-            
-            # Generate unique e-file ID
-            e_file_id = str(uuid.uuid4())
-            
-            # Store in ADLS
-            st.info("Storing in ADLS...")
-            success = self.adls_handler.save_extracted_data(file_name, e_file_id, personal_info)
-            
-            if success:
-                st.success(f"Successfully processed {file_name}")
-                st.info(f"E-File ID: {e_file_id}")
-                return e_file_id
-            else:
-                st.error("Failed to store in ADLS")
-                return None
-                
-        except Exception as e:
-            st.error(f"Error processing {file_name}: {str(e)}")
-            return None
+        # Shared by all sessions; nothing is rebuilt or re-fetched per session
+        self.adls_handler, self.query_engine = get_query_clients()
+        # Processing runs on background workers so the page never blocks on it
+        self.job_queue = get_job_queue()
     
     def search_records(self, search_type, query):
         """Search records based on type and query"""
@@ -124,6 +186,8 @@ def main():
             st.stop()
     
     chatbot = st.session_state.chatbot
+    if 'session_id' not in st.session_state:
+        st.session_state.session_id = str(uuid.uuid4())
     
     # Sidebar for navigation
     st.sidebar.title("Navigation")
@@ -330,16 +394,15 @@ def main():
         
         # List available PDF files
         if st.button("Refresh PDF List"):
-            st.session_state.pdf_files = chatbot.adls_handler.list_pdf_files()
+            clear_data_caches()
         
-        if 'pdf_files' not in st.session_state:
-            st.session_state.pdf_files = chatbot.adls_handler.list_pdf_files()
+        pdf_files = load_pdf_files(chatbot.adls_handler)
         
-        if st.session_state.pdf_files:
+        if pdf_files:
             st.subheader("Available PDF Files:")
             
             # Display files in a table
-            df = pd.DataFrame(st.session_state.pdf_files)
+            df = pd.DataFrame(pdf_files)
             df['last_modified'] = pd.to_datetime(df['last_modified']).dt.strftime('%Y-%m-%d %H:%M:%S')
             df['size'] = df['size'].apply(lambda x: f"{x/1024:.1f} KB")
             
@@ -349,28 +412,23 @@ def main():
             st.subheader("Process Files:")
             selected_file = st.selectbox(
                 "Select a file to process:",
-                options=[f['name'] for f in st.session_state.pdf_files]
+                options=[f['name'] for f in pdf_files]
             )
             
             col1, col2 = st.columns(2)
             
             with col1:
                 if st.button("Process Selected File"):
-                    e_file_id = chatbot.process_pdf_file(selected_file)
-                    if e_file_id:
-                        st.session_state.last_processed_id = e_file_id
+                    chatbot.job_queue.submit([selected_file], submitted_by=st.session_state.session_id)
+                    st.success(f"Queued {selected_file} for processing")
             
             with col2:
                 if st.button("Process All Files"):
-                    progress_bar = st.progress(0)
-                    total_files = len(st.session_state.pdf_files)
-                    
-                    for i, file_info in enumerate(st.session_state.pdf_files):
-                        st.write(f"Processing {file_info['name']}...")
-                        chatbot.process_pdf_file(file_info['name'])
-                        progress_bar.progress((i + 1) / total_files)
-                    
-                    st.success("All files processed!")
+                    chatbot.job_queue.submit([f['name'] for f in pdf_files],
+                                             submitted_by=st.session_state.session_id)
+                    st.success(f"Queued {len(pdf_files)} files for processing")
+            
+            show_jobs(chatbot.job_queue, st.session_state.session_id)
         else:
             st.info("No PDF files found in ADLS storage.")
     
@@ -421,24 +479,16 @@ def main():
     elif page == "View All Records":
         st.header("📋 All Personal Information Records")
         
-        # Get all records
-        records = chatbot.adls_handler.get_all_records(limit=100)
+        # Get all records (cached DataFrame and CSV)
+        df, csv = load_records_table(chatbot.adls_handler, limit=100)
         
-        if records:
-            st.info(f"Showing {len(records)} most recent records")
-            
-            # Convert to DataFrame for better display
-            df = pd.DataFrame(records)
-            
-            # Format datetime columns
-            if 'created_date' in df.columns:
-                df['created_date'] = pd.to_datetime(df['created_date']).dt.strftime('%Y-%m-%d %H:%M')
+        if df is not None:
+            st.info(f"Showing {len(df)} most recent records")
             
             # Display in a table
             st.dataframe(df, use_container_width=True)
             
             # Download as CSV
-            csv = df.to_csv(index=False)
             st.download_button(
                 label="Download as CSV",
                 data=csv,
@@ -466,26 +516,24 @@ def main():
                 try:
                     # Upload to ADLS
                     st.info("Uploading to ADLS...")
-                    file_content = uploaded_file.read()
-                    
-                    success = chatbot.adls_handler.upload_pdf(uploaded_file.name, file_content)
+                    # Stream the uploader's buffer instead of copying it with read()
+                    uploaded_file.seek(0)
+                    success = chatbot.adls_handler.upload_pdf(uploaded_file.name, uploaded_file)
                     
                     if success:
                         st.success("File uploaded successfully!")
+                        clear_data_caches()
                         
-                        # Process the uploaded file
-                        st.info("Processing uploaded file...")
-                        e_file_id = chatbot.process_pdf_file(uploaded_file.name)
-                        
-                        if e_file_id:
-                            st.success(f"File processed successfully! E-File ID: {e_file_id}")
-                        else:
-                            st.error("Failed to process uploaded file")
+                        # Process the uploaded file in the background
+                        chatbot.job_queue.submit([uploaded_file.name], submitted_by=st.session_state.session_id)
+                        st.info("Queued for processing")
                     else:
                         st.error("Failed to upload file to ADLS")
                         
                 except Exception as e:
                     st.error(f"Error uploading file: {str(e)}")
+        
+        show_jobs(chatbot.job_queue, st.session_state.session_id)
     
     # Footer
     st.markdown("---")
@@ -495,21 +543,12 @@ def main():
         st.markdown("---")
         st.subheader("📊 Quick Stats")
         try:
-            # Get quick stats
-            all_records = chatbot.adls_handler.get_all_records(limit=1000)
-            pdf_files = chatbot.adls_handler.list_pdf_files()
-            
-            st.metric("PDF Files", len(pdf_files))
-            st.metric("Processed Files", len(all_records))
-            
-            # Count unique people
-            unique_emails = set()
-            for record in all_records:
-                email = record.get('email', '').strip()
-                if email:
-                    unique_emails.add(email.lower())
+            # Get quick stats (cached; cleared when ingestion finishes)
+            stats = load_quick_stats(chatbot.adls_handler)
             
-            st.metric("Unique People", len(unique_emails))
+            st.metric("PDF Files", stats['pdf_files'])
+            st.metric("Processed Files", stats['processed_files'])
+            st.metric("Unique People", stats['unique_people'])
             
         except Exception as e:
             st.error(f"Could not load stats: {str(e)}")
@@ -1,13 +1,41 @@
 import argparse
+from functools import cached_property
 from adls_handler import ADLSHandler
-from document_intelligence import DocumentIntelligenceHandler
+from query_engine import QueryEngine
+import client_registry
+from metrics import configure as configure_metrics
+from profiling import configure as configure_profiling
+from persistence import create_persistence_sink
+from ingestion import IngestionPipeline
+from ingestion_jobs import IngestionJob, format_duration
+from job_queue import create_job_queue
+from partitioning import PartitionedWorker
+from watcher import IngestionWatcher
 import json
-import uuid
+import os
+import time
 
 class CLIChatbot:
     def __init__(self):
         self.adls_handler = ADLSHandler()
-        self.doc_intelligence = DocumentIntelligenceHandler()
+    
+    # Built on first use, so lookups and queries never set up the ingestion side
+    @cached_property
+    def doc_intelligence(self):
+        return client_registry.get_document_intelligence()
+    
+    @cached_property
+    def persistence(self):
+        # ADLS JSON, plus the SQL row when PERSISTENCE_MODE=dual
+        return create_persistence_sink(self.adls_handler.config, self.adls_handler)
+    
+    @cached_property
+    def pipeline(self):
+        return IngestionPipeline(self.adls_handler, self.doc_intelligence, self.persistence)
+    
+    @cached_property
+    def query_engine(self):
+        return QueryEngine(self.adls_handler)
     
     def list_files(self):
         """List all PDF files in ADLS storage"""
@@ -17,34 +45,109 @@ class CLIChatbot:
             print(f"{i}. {file['name']} - {file['size']/1024:.1f} KB")
         return files
     
-    def process_file(self, filename):
-        """Process a specific file"""
+    def process_file(self, filename, batch=False):
+        """Process a specific file (batch=True queues the SQL row until flush)"""
         print(f"\nProcessing {filename}...")
         
-        # Download PDF
-        pdf_content = self.adls_handler.download_pdf(filename)
-        if not pdf_content:
-            print("Failed to download file")
-            return
-        
-        # Extract information
-        personal_info = self.doc_intelligence.extract_personal_info(pdf_content)
-        if not personal_info:
-            print("Failed to extract information")
-            return
-        
-        # Generate e-file ID and store in ADLS
-        e_file_id = str(uuid.uuid4())
-        success = self.adls_handler.save_extracted_data(filename, e_file_id, personal_info)
-        
-        if success:
-            print(f"Successfully processed! E-File ID: {e_file_id}")
+        outcome = self.pipeline.process(filename, batch=batch)
+        if outcome['status'] == 'processed':
+            print(f"Successfully processed! E-File ID: {outcome['e_file_id']}")
             print("\nExtracted Information:")
-            for key, value in personal_info.items():
+            for key, value in outcome['personal_info'].items():
                 if key != 'extracted_text' and value:
                     print(f"  {key}: {value}")
         else:
-            print("Failed to store in ADLS")
+            print(outcome['error'])
+    
+    def process_all(self, job_name='process-all', retry_failed=False, fresh=False):
+        """Process every PDF as a resumable job with a manifest under INGESTION_JOB_DIR"""
+        config = self.adls_handler.config
+        manifest_path = os.path.join(config.INGESTION_JOB_DIR, f"{job_name}.jsonl")
+        if fresh and os.path.exists(manifest_path):
+            os.remove(manifest_path)
+        
+        files = self.list_files()
+        
+        def report(file_name, outcome, progress):
+            marker = "✅" if outcome['status'] == 'processed' else "❌"
+            print(f"{marker} [{progress['completed']}/{progress['total']}] {file_name} "
+                  f"({progress['files_per_second']:.2f} files/s, ETA {format_duration(progress['eta_seconds'])})"
+                  + ("" if outcome['status'] == 'processed' else f" - {outcome['error']}"))
+        
+        job = IngestionJob(
+            self.pipeline,
+            manifest_path,
+            checkpoint_every=config.INGESTION_CHECKPOINT_EVERY,
+            max_attempts=config.INGESTION_MAX_ATTEMPTS,
+            backoff_seconds=config.INGESTION_RETRY_BACKOFF_SECONDS,
+            on_progress=report
+        )
+        
+        self.adls_handler.enable_index_batching()
+        try:
+            counts = job.run([file['name'] for file in files], retry_failed=retry_failed)
+        finally:
+            self.adls_handler.close_index_batching()
+            self.persistence.flush()
+        
+        progress = job.progress()
+        print(f"\n📦 Job '{job_name}': {counts['done']} done, {counts['failed']} failed "
+              f"({progress['completed']} processed this run in {format_duration(progress['elapsed_seconds'])})")
+        if counts['failed']:
+            print("💡 Re-run to retry failures, or add --retry-failed once they have used up their attempts")
+    
+    def process_partition(self, node_id=None, once=False):
+        """Process this node's share of pdfs/ alongside other nodes (leases under metadata/claims)"""
+        config = self.adls_handler.config
+        
+        def report(file_name, outcome):
+            marker = "✅" if outcome['status'] == 'processed' else "❌"
+            print(f"{marker} {file_name}" + ("" if outcome['status'] == 'processed' else f" - {outcome['error']}"))
+        
+        worker = PartitionedWorker(
+            self.pipeline,
+            self.adls_handler,
+            node_id=node_id,
+            lease_seconds=config.PARTITION_LEASE_SECONDS,
+            poll_interval=config.PARTITION_POLL_SECONDS,
+            max_attempts=config.INGESTION_MAX_ATTEMPTS,
+            backoff_seconds=config.INGESTION_RETRY_BACKOFF_SECONDS,
+            on_progress=report
+        )
+        print(f"🧩 Node {worker.node_id} joining partitioned ingestion (Ctrl+C to leave)")
+        try:
+            processed = worker.run(once=once)
+        except KeyboardInterrupt:
+            worker.stop()
+            processed = None
+        if processed is not None:
+            print(f"\n📦 Node {worker.node_id} attempted {processed} file(s)")
+    
+    def watch(self, poll_interval=None, since_now=False):
+        """Continuously process new and changed PDFs (state in metadata/watcher_state.json)"""
+        config = self.adls_handler.config
+        
+        def report(file_name, outcome):
+            marker = "✅" if outcome['status'] == 'processed' else "❌"
+            print(f"{marker} {file_name}" + (f" - E-File ID: {outcome['e_file_id']}" if outcome['status'] == 'processed'
+                                             else f" - {outcome['error']}"))
+        
+        watcher = IngestionWatcher(
+            self.adls_handler,
+            self.pipeline,
+            poll_interval=poll_interval or config.WATCH_POLL_SECONDS,
+            workers=config.WATCH_WORKERS,
+            max_attempts=config.INGESTION_MAX_ATTEMPTS,
+            backoff_seconds=config.INGESTION_RETRY_BACKOFF_SECONDS,
+            on_progress=report
+        )
+        if since_now:
+            print(f"📌 Marked {watcher.baseline()} existing PDF(s) as seen")
+        print(f"👀 Watching {config.PDF_DIRECTORY}/ every {watcher.poll_interval:g}s (Ctrl+C to stop)")
+        try:
+            watcher.run()
+        except KeyboardInterrupt:
+            watcher.stop()
     
     def search_by_email(self, email):
         """Search records by email"""
@@ -86,22 +189,130 @@ class CLIChatbot:
                     print(f"  {key}: {value}")
         else:
             print("Record not found")
+    
+    def ask(self, question):
+        """Answer one question with the query engine and print the answer and its latency"""
+        started = time.perf_counter()
+        response = self.query_engine.process_query(question)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self._print_response(response)
+        print(f"⏱️  {elapsed_ms:.1f} ms")
+        return response
+    
+    def _print_response(self, response, max_rows=10):
+        print(f"\n🤖 {response['message']}")
+        data = response.get('data') or {}
+        for key, value in data.items():
+            if key in ('query_type', 'search_term', 'ai_enhanced', 'ai_enabled'):
+                continue
+            if key == 'results' and isinstance(value, list):
+                for record in value[:max_rows]:
+                    name = f"{record.get('first_name') or ''} {record.get('last_name') or ''}".strip() or '-'
+                    print(f"  • {name} | {record.get('email') or '-'} | {record.get('file_name') or '-'} | {record.get('e_file_id')}")
+                if len(value) > max_rows:
+                    print(f"  … and {len(value) - max_rows} more")
+            elif isinstance(value, dict):
+                print(f"  {key}:")
+                for sub_key, sub_value in value.items():
+                    print(f"    {sub_key}: {', '.join(sub_value) if isinstance(sub_value, list) else sub_value}")
+            elif isinstance(value, list):
+                print(f"  {key}: {', '.join(str(item) for item in value)}")
+            else:
+                print(f"  {key}: {value}")
+    
+    def quick_query(self, question):
+        """Answer a single question and exit"""
+        return self.ask(question)
+    
+    def interactive_chat(self):
+        """Question/answer loop that keeps the clients, search index cache and query engine warm"""
+        try:
+            import readline  # noqa: F401  (line editing and history where available)
+        except ImportError:
+            pass
+        
+        started = time.perf_counter()
+        # Build the engine and load the search index before the first question
+        self.query_engine
+        self.adls_handler.get_all_records(limit=1)
+        print(f"💬 Ready in {(time.perf_counter() - started) * 1000:.0f} ms "
+              f"({'OpenAI' if self.query_engine.use_ai else 'pattern matching'}). "
+              f"Ask about your documents; 'exit' to quit.")
+        
+        while True:
+            try:
+                question = input("\n❓ ").strip()
+            except (EOFError, KeyboardInterrupt):
+                print()
+                break
+            if not question:
+                continue
+            if question.lower() in ('exit', 'quit', 'q'):
+                break
+            if question.lower() == 'help':
+                self._print_response(self.query_engine.get_help())
+                continue
+            self.ask(question)
+        print("👋 Bye")
 
 def main():
     parser = argparse.ArgumentParser(description="PDF Personal Information Extractor CLI")
     parser.add_argument('--chat', action='store_true', help='Start interactive chat mode')
     parser.add_argument('--list', action='store_true', help='List all PDF files')
     parser.add_argument('--process', type=str, help='Process a specific PDF file')
+    parser.add_argument('--upload', type=str, help='Upload a local PDF (streamed in chunks) and process it')
     parser.add_argument('--search-email', type=str, help='Search by email')
     parser.add_argument('--search-name', type=str, help='Search by name')
     parser.add_argument('--get-record', type=str, help='Get record by E-File ID')
-    parser.add_argument('--process-all', action='store_true', help='Process all PDF files')
+    parser.add_argument('--process-all', action='store_true', help='Process all PDF files (resumable job)')
+    parser.add_argument('--job', type=str, default='process-all', help='Name of the --process-all job manifest to resume')
+    parser.add_argument('--retry-failed', action='store_true', help='Give files that failed in earlier runs new attempts')
+    parser.add_argument('--fresh', action='store_true', help='Discard the job manifest and start over')
     parser.add_argument('--query', type=str, help='Ask a natural language question')
+    parser.add_argument('--worker', action='store_true', help='Run background ingestion workers for the job queue')
+    parser.add_argument('--partitioned', action='store_true', help='Share pdfs/ with other nodes: process only this node\'s partition')
+    parser.add_argument('--node-id', type=str, help='Stable id for this node in --partitioned mode (default: host-pid)')
+    parser.add_argument('--once', action='store_true', help='With --partitioned: exit once every file is done or out of attempts')
+    parser.add_argument('--watch', action='store_true', help='Continuously process new and changed PDFs')
+    parser.add_argument('--poll-interval', type=float, default=None, help='Seconds between --watch listings (default: WATCH_POLL_SECONDS)')
+    parser.add_argument('--since-now', action='store_true', help='With --watch: skip PDFs that already exist')
+    parser.add_argument('--processes', type=int, default=None, help='Run extraction rules on this many worker processes (0: in-thread)')
+    parser.add_argument('--replay-outbox', action='store_true', help='Retry SQL writes queued in the persistence outbox')
+    parser.add_argument('--metrics-file', type=str, help='Enable metrics and write them as JSON to this file on exit')
+    parser.add_argument('--metrics-port', type=int, help='Enable metrics and serve them in Prometheus format on this port')
+    parser.add_argument('--profile', action='store_true', help='Profile hot paths (cProfile) and write results to --profile-dir')
+    parser.add_argument('--profile-dir', type=str, default=None, help='Directory for profile output (default: profiles)')
+    parser.add_argument('--profile-sample-rate', type=float, default=None, help='Fraction of operations to profile (0-1)')
+    parser.add_argument('--profile-memory', action='store_true', help='Also record tracemalloc allocation deltas')
     
     args = parser.parse_args()
     
+    if args.metrics_file or args.metrics_port:
+        configure_metrics(True, json_path=args.metrics_file, port=args.metrics_port)
+    
+    if args.profile:
+        configure_profiling(True, output_dir=args.profile_dir, sample_rate=args.profile_sample_rate,
+                            memory=args.profile_memory or None)
+    
     chatbot = CLIChatbot()
     
+    processes = args.processes if args.processes is not None else chatbot.adls_handler.config.EXTRACTION_PROCESSES
+    # Only commands that extract start worker processes (and load the Document Intelligence SDK)
+    extracts = args.process or args.upload or args.process_all or args.worker or args.watch or args.partitioned
+    extraction_pool = None
+    if processes > 0 and extracts:
+        from extraction_pool import ExtractionPool
+        extraction_pool = ExtractionPool(processes)
+        chatbot.doc_intelligence.extraction_pool = extraction_pool
+    
+    try:
+        run_command(chatbot, args, parser)
+    finally:
+        if extraction_pool is not None:
+            extraction_pool.close()
+
+def run_command(chatbot, args, parser):
+    """Dispatch the selected command-line action"""
     if args.chat:
         chatbot.interactive_chat()
     elif args.query:
@@ -110,6 +321,13 @@ def main():
         chatbot.list_files()
     elif args.process:
         chatbot.process_file(args.process)
+    elif args.upload:
+        file_name = os.path.basename(args.upload)
+        if chatbot.adls_handler.upload_pdf(file_name, args.upload):
+            print(f"⬆️  Uploaded {file_name}")
+            chatbot.process_file(file_name)
+        else:
+            print(f"Failed to upload {args.upload}")
     elif args.search_email:
         chatbot.search_by_email(args.search_email)
     elif args.search_name:
@@ -117,9 +335,22 @@ def main():
     elif args.get_record:
         chatbot.get_record(args.get_record)
     elif args.process_all:
-        files = chatbot.list_files()
-        for file in files:
-            chatbot.process_file(file['name'])
+        chatbot.process_all(job_name=args.job, retry_failed=args.retry_failed, fresh=args.fresh)
+    elif args.watch:
+        chatbot.watch(poll_interval=args.poll_interval, since_now=args.since_now)
+    elif args.partitioned:
+        chatbot.process_partition(node_id=args.node_id, once=args.once)
+    elif args.worker:
+        job_queue = create_job_queue(chatbot.adls_handler.config, chatbot.pipeline)
+        print(f"👷 {job_queue.workers} worker(s) processing jobs from {job_queue.path} (Ctrl+C to stop)")
+        chatbot.adls_handler.enable_index_batching()
+        try:
+            job_queue.run_forever()
+        finally:
+            chatbot.adls_handler.close_index_batching()
+    elif args.replay_outbox:
+        replayed, pending = chatbot.persistence.replay_outbox()
+        print(f"🔁 Replayed {replayed} outboxed record(s), {pending} still pending")
     else:
         parser.print_help()
         print("\n💡 Try: --chat for interactive mode, or --query 'How many files?'")
@@ -0,0 +1,101 @@
+"""
+Process-wide configuration and Azure clients.
+
+Config, the storage file system client and the Document Intelligence handler
+are built once per process, on first use, and shared afterwards by every
+ADLSHandler, QueryEngine and frontend session (the Azure SDK clients are safe
+to share between threads), so constructing a handler is cheap and makes no
+network calls. Creating the file system and its directories runs once per
+file system client; for Azure storage the result is also remembered in
+STORAGE_BOOTSTRAP_CACHE so later CLI runs on the same machine skip those
+round-trips entirely.
+"""
+import json
+import logging
+import os
+import threading
+import weakref
+
+_lock = threading.RLock()
+_instances = {}
+_bootstrap_lock = threading.Lock()
+_bootstrapped = weakref.WeakSet()
+
+
+def _shared(name, factory):
+    # Re-entrant: factories fetch the shared Config themselves
+    with _lock:
+        if name not in _instances:
+            _instances[name] = factory()
+        return _instances[name]
+
+
+def get_config():
+    """Shared Config (environment loaded and validated once)"""
+    from config import Config
+    return _shared('config', Config)
+
+
+def get_filesystem_client():
+    """Shared file system client for the configured storage backend"""
+    from adls_handler import create_filesystem_client
+    return _shared('filesystem_client', lambda: create_filesystem_client(get_config()))
+
+
+def get_document_intelligence():
+    """Shared DocumentIntelligenceHandler, so one scheduler paces every analysis in the process"""
+    from document_intelligence import DocumentIntelligenceHandler
+    return _shared('document_intelligence', lambda: DocumentIntelligenceHandler(get_config()))
+
+
+def reset():
+    """Forget shared instances (after changing the environment, e.g. in benchmarks)"""
+    with _lock:
+        _instances.clear()
+    with _bootstrap_lock:
+        _bootstrapped.clear()
+
+
+def _bootstrap_key(config):
+    return f"{config.ADLS_ACCOUNT_NAME}/{config.ADLS_FILESYSTEM_NAME}"
+
+
+def _load_bootstrap_cache(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return set(json.load(f))
+    except (OSError, ValueError):
+        return set()
+
+
+def _save_bootstrap_cache(path, keys):
+    try:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(sorted(keys), f)
+        os.replace(temp_path, path)
+    except OSError as e:
+        logging.warning(f"Could not write storage bootstrap cache {path}: {str(e)}")
+
+
+def bootstrap_storage(filesystem_client, config, initialize):
+    """Run initialize() once per file system client; returns True if it ran"""
+    with _bootstrap_lock:
+        if filesystem_client in _bootstrapped:
+            return False
+
+        # Local stand-ins are cheap to set up and may be fresh per process, so only Azure is cached
+        cache_path = config.STORAGE_BOOTSTRAP_CACHE if config.STORAGE_BACKEND == 'adls' else None
+        cached = _load_bootstrap_cache(cache_path) if cache_path else set()
+        if _bootstrap_key(config) in cached:
+            _bootstrapped.add(filesystem_client)
+            return False
+
+        if initialize():
+            _bootstrapped.add(filesystem_client)
+            if cache_path:
+                _save_bootstrap_cache(cache_path, cached | {_bootstrap_key(config)})
+        return True
@@ -11,19 +11,94 @@ class Config:
         self.ADLS_ACCOUNT_KEY = os.getenv('ADLS_ACCOUNT_KEY')
         self.ADLS_FILESYSTEM_NAME = os.getenv('ADLS_FILESYSTEM_NAME', 'chatbot-data')
         
+        # Storage backend: 'adls' (default), or the offline 'local' / 'memory' stand-ins
+        self.STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'adls').lower()
+        self.LOCAL_STORAGE_PATH = os.getenv('LOCAL_STORAGE_PATH', '.local_storage')
+        self.STORAGE_LATENCY_MS = float(os.getenv('STORAGE_LATENCY_MS', '0'))
+        self.STORAGE_JITTER_MS = float(os.getenv('STORAGE_JITTER_MS', '0'))
+        # Conditional (If-Match) search index writes: attempts and base backoff on conflict
+        self.INDEX_WRITE_RETRIES = int(os.getenv('INDEX_WRITE_RETRIES', '25'))
+        self.INDEX_RETRY_BACKOFF_MS = float(os.getenv('INDEX_RETRY_BACKOFF_MS', '20'))
+        # Batched index writes during bulk ingestion: flush every N records or T seconds
+        self.INDEX_BATCH_SIZE = int(os.getenv('INDEX_BATCH_SIZE', '50'))
+        self.INDEX_FLUSH_SECONDS = float(os.getenv('INDEX_FLUSH_SECONDS', '5'))
+        self.INDEX_JOURNAL_DIR = os.getenv('INDEX_JOURNAL_DIR', '.index_journal')
+        # Lookups reuse a handler's cached search index for this long before revalidating it by ETag
+        self.SEARCH_INDEX_CACHE_SECONDS = float(os.getenv('SEARCH_INDEX_CACHE_SECONDS', '0'))
+        # Resumable --process-all jobs: manifest location, checkpoint interval and retries
+        self.INGESTION_JOB_DIR = os.getenv('INGESTION_JOB_DIR', '.ingestion_jobs')
+        self.INGESTION_CHECKPOINT_EVERY = int(os.getenv('INGESTION_CHECKPOINT_EVERY', '25'))
+        self.INGESTION_MAX_ATTEMPTS = int(os.getenv('INGESTION_MAX_ATTEMPTS', '3'))
+        self.INGESTION_RETRY_BACKOFF_SECONDS = float(os.getenv('INGESTION_RETRY_BACKOFF_SECONDS', '5'))
+        # Streamlit: how long sidebar stats, file lists and record tables are cached (also cleared after ingestion)
+        self.STREAMLIT_CACHE_SECONDS = float(os.getenv('STREAMLIT_CACHE_SECONDS', '60'))
+        # query_api.py: bind address, worker threads for blocking calls, idle keep-alive and optional bearer token
+        self.QUERY_API_HOST = os.getenv('QUERY_API_HOST', '127.0.0.1')
+        self.QUERY_API_PORT = int(os.getenv('QUERY_API_PORT', '8780'))
+        self.QUERY_API_WORKERS = int(os.getenv('QUERY_API_WORKERS', '16'))
+        self.QUERY_API_KEEPALIVE_SECONDS = float(os.getenv('QUERY_API_KEEPALIVE_SECONDS', '15'))
+        self.QUERY_API_TOKEN = os.getenv('QUERY_API_TOKEN') or None
+        # Background ingestion queue (SQLite) used by Streamlit and cli_chatbot.py --worker
+        self.JOB_QUEUE_PATH = os.getenv('JOB_QUEUE_PATH', '.jobs/ingestion_jobs.db')
+        self.JOB_QUEUE_WORKERS = int(os.getenv('JOB_QUEUE_WORKERS', '2'))
+        self.JOB_QUEUE_STALE_SECONDS = float(os.getenv('JOB_QUEUE_STALE_SECONDS', '60'))
+        # Worker processes for the extraction rules in cli_chatbot.py (0 runs them in-thread)
+        self.EXTRACTION_PROCESSES = int(os.getenv('EXTRACTION_PROCESSES', '0'))
+        # cli_chatbot.py --partitioned: lease length (also the node liveness timeout) and idle poll
+        self.PARTITION_LEASE_SECONDS = float(os.getenv('PARTITION_LEASE_SECONDS', '120'))
+        self.PARTITION_POLL_SECONDS = float(os.getenv('PARTITION_POLL_SECONDS', '30'))
+        # cli_chatbot.py --watch: listing interval and files processed in parallel per cycle
+        self.WATCH_POLL_SECONDS = float(os.getenv('WATCH_POLL_SECONDS', '5'))
+        self.WATCH_WORKERS = int(os.getenv('WATCH_WORKERS', '4'))
+        # Remembers that the ADLS file system and directories exist, so later runs skip creating them ('' disables)
+        self.STORAGE_BOOTSTRAP_CACHE = os.getenv('STORAGE_BOOTSTRAP_CACHE', '.cache/storage_bootstrap.json')
+        # PDF transfers: block size and parallel requests; downloads above the spool limit go to a temp file
+        self.TRANSFER_CHUNK_SIZE = int(os.getenv('TRANSFER_CHUNK_SIZE', str(4 * 1024 * 1024)))
+        self.TRANSFER_MAX_CONCURRENCY = int(os.getenv('TRANSFER_MAX_CONCURRENCY', '4'))
+        self.TRANSFER_SPOOL_MAX_BYTES = int(os.getenv('TRANSFER_SPOOL_MAX_BYTES', str(16 * 1024 * 1024)))
+        
         # Azure Document Intelligence
         self.DOCUMENT_INTELLIGENCE_ENDPOINT = os.getenv('DOCUMENT_INTELLIGENCE_ENDPOINT')
         self.DOCUMENT_INTELLIGENCE_KEY = os.getenv('DOCUMENT_INTELLIGENCE_KEY')
+        # Request rate and in-flight ceiling for analyses (S0 tier allows 15 analyze requests/s)
+        self.DOCUMENT_INTELLIGENCE_RPS = float(os.getenv('DOCUMENT_INTELLIGENCE_RPS', '15'))
+        self.DOCUMENT_INTELLIGENCE_MAX_CONCURRENCY = int(os.getenv('DOCUMENT_INTELLIGENCE_MAX_CONCURRENCY', '8'))
+        self.DOCUMENT_INTELLIGENCE_MAX_RETRIES = int(os.getenv('DOCUMENT_INTELLIGENCE_MAX_RETRIES', '5'))
+        self.DOCUMENT_INTELLIGENCE_POLL_MIN_SECONDS = float(os.getenv('DOCUMENT_INTELLIGENCE_POLL_MIN_SECONDS', '1'))
+        self.DOCUMENT_INTELLIGENCE_POLL_MAX_SECONDS = float(os.getenv('DOCUMENT_INTELLIGENCE_POLL_MAX_SECONDS', '10'))
+        # Use a PDF's embedded text layer when it is good enough, instead of the remote model
+        self.PDF_TEXT_FAST_PATH = os.getenv('PDF_TEXT_FAST_PATH', 'true').strip().lower() in ('1', 'true', 'yes', 'on')
+        self.PDF_TEXT_MIN_CHARS_PER_PAGE = int(os.getenv('PDF_TEXT_MIN_CHARS_PER_PAGE', '20'))
+        self.PDF_TEXT_MIN_QUALITY = float(os.getenv('PDF_TEXT_MIN_QUALITY', '0.6'))
+        # Documents longer than PDF_SPLIT_PAGES are analyzed as parallel page ranges (0 disables)
+        self.PDF_SPLIT_PAGES = int(os.getenv('PDF_SPLIT_PAGES', '50'))
+        self.PDF_SPLIT_MAX_WORKERS = int(os.getenv('PDF_SPLIT_MAX_WORKERS', '4'))
         
         # OpenAI Configuration
         self.OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
         self.OPENAI_MODEL = os.getenv('OPENAI_MODEL', 'gpt-3.5-turbo')
+        # Optional override, e.g. the local stub from llm_stub_server.py
+        self.OPENAI_BASE_URL = os.getenv('OPENAI_BASE_URL') or None
         
         # Azure OpenAI (alternative)
         self.AZURE_OPENAI_ENDPOINT = os.getenv('AZURE_OPENAI_ENDPOINT')
         self.AZURE_OPENAI_API_KEY = os.getenv('AZURE_OPENAI_API_KEY')
         self.AZURE_OPENAI_DEPLOYMENT_NAME = os.getenv('AZURE_OPENAI_DEPLOYMENT_NAME')
         
+        # Azure SQL (optional; used by DatabaseHandler)
+        self.SQL_CONNECTION_STRING = os.getenv('SQL_CONNECTION_STRING')
+        self.SQL_POOL_SIZE = int(os.getenv('SQL_POOL_SIZE', '5'))
+        self.SQL_POOL_TIMEOUT = float(os.getenv('SQL_POOL_TIMEOUT', '30'))
+        self.SQL_BATCH_SIZE = int(os.getenv('SQL_BATCH_SIZE', '1000'))
+        # Where QueryEngine computes counts and stats: 'adls' (search index) or 'sql'
+        self.QUERY_BACKEND = os.getenv('QUERY_BACKEND', 'adls').lower()
+        
+        # Persistence: 'adls' (JSON in the lake only) or 'dual' (lake JSON plus SQL row)
+        self.PERSISTENCE_MODE = os.getenv('PERSISTENCE_MODE', 'adls').lower()
+        self.PERSISTENCE_OUTBOX_PATH = os.getenv('PERSISTENCE_OUTBOX_PATH', '.outbox/persistence.jsonl')
+        self.PERSISTENCE_BATCH_SIZE = int(os.getenv('PERSISTENCE_BATCH_SIZE', '100'))
+        self.PERSISTENCE_MAX_RETRIES = int(os.getenv('PERSISTENCE_MAX_RETRIES', '3'))
+        
         # ADLS Directory Structure
         self.PDF_DIRECTORY = "pdfs"
         self.EXTRACTED_DATA_DIRECTORY = "extracted-data"
@@ -35,12 +110,15 @@ class Config:
     def _validate_config(self):
         """Validate that all required environment variables are set"""
         required_vars = {
-            'ADLS_ACCOUNT_NAME': self.ADLS_ACCOUNT_NAME,
-            'ADLS_ACCOUNT_KEY': self.ADLS_ACCOUNT_KEY,
             'DOCUMENT_INTELLIGENCE_ENDPOINT': self.DOCUMENT_INTELLIGENCE_ENDPOINT,
             'DOCUMENT_INTELLIGENCE_KEY': self.DOCUMENT_INTELLIGENCE_KEY
         }
         
+        # ADLS credentials are only needed when talking to Azure storage
+        if self.STORAGE_BACKEND == 'adls':
+            required_vars['ADLS_ACCOUNT_NAME'] = self.ADLS_ACCOUNT_NAME
+            required_vars['ADLS_ACCOUNT_KEY'] = self.ADLS_ACCOUNT_KEY
+        
         # Check if either OpenAI or Azure OpenAI is configured
         has_openai = bool(self.OPENAI_API_KEY)
         has_azure_openai = bool(self.AZURE_OPENAI_ENDPOINT and self.AZURE_OPENAI_API_KEY)
@@ -57,6 +135,10 @@ class Config:
     def adls_account_url(self):
         return f"https://{self.ADLS_ACCOUNT_NAME}.dfs.core.windows.net"
     
+    @property
+    def sql_connection_string(self):
+        return self.SQL_CONNECTION_STRING
+    
     @property
     def use_openai(self):
         """Check if OpenAI is configured and should be used"""
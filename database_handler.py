@@ -1,204 +1,526 @@
-import pyodbc
 import logging
-from config import Config
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+import client_registry
 import uuid
 from datetime import datetime
 
+try:
+    import pyodbc
+    PYODBC_AVAILABLE = True
+except ImportError:
+    PYODBC_AVAILABLE = False
+
+# Columns written for each extracted record, in parameter order
+PERSONAL_INFO_COLUMNS = [
+    'e_file_id', 'file_name', 'first_name', 'last_name', 'email', 'phone_number',
+    'address', 'date_of_birth', 'document_type', 'extracted_text', 'confidence_score'
+]
+
+SQLITE_URL_PREFIX = 'sqlite:///'
+
+SCHEMA_FILES = {
+    'mssql': 'database_schema.sql',
+    'sqlite': 'database_schema_sqlite.sql'
+}
+
+class ConnectionPool:
+    """Thread-safe pool of DB-API connections with a size limit and health checks"""
+
+    def __init__(self, connect, max_size=5, timeout=30, health_check_interval=30, health_check_sql="SELECT 1"):
+        self._connect = connect
+        self.max_size = max_size
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self.health_check_sql = health_check_sql
+        self._idle = deque()
+        self._created = 0
+        self._condition = threading.Condition()
+        self._closed = False
+
+    def acquire(self):
+        """Take a healthy connection from the pool, opening one if below max_size"""
+        deadline = time.monotonic() + self.timeout
+
+        with self._condition:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Connection pool is closed")
+
+                if self._idle:
+                    connection, last_used = self._idle.pop()
+                    break
+
+                if self._created < self.max_size:
+                    self._created += 1
+                    connection, last_used = None, None
+                    break
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"No database connection available after {self.timeout}s")
+                self._condition.wait(remaining)
+
+        if connection is None:
+            return self._open()
+
+        # Only ping connections that have been idle for a while
+        if time.monotonic() - last_used > self.health_check_interval and not self._is_healthy(connection):
+            self._close_quietly(connection)
+            return self._open()
+
+        return connection
+
+    def release(self, connection, discard=False):
+        """Return a connection to the pool, or close it if it is broken"""
+        if not discard:
+            try:
+                connection.rollback()
+            except Exception:
+                discard = True
+
+        with self._condition:
+            if discard or self._closed:
+                self._created -= 1
+            else:
+                self._idle.append((connection, time.monotonic()))
+            self._condition.notify()
+
+        if discard or self._closed:
+            self._close_quietly(connection)
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection for the duration of a with-block"""
+        connection = self.acquire()
+        discard = False
+        try:
+            yield connection
+        except Exception as e:
+            discard = _is_connection_error(e)
+            raise
+        finally:
+            self.release(connection, discard=discard)
+
+    def close_all(self):
+        """Close idle connections and refuse new acquisitions"""
+        with self._condition:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._created -= len(idle)
+            self._condition.notify_all()
+
+        for connection, _ in idle:
+            self._close_quietly(connection)
+
+    @property
+    def size(self):
+        with self._condition:
+            return self._created
+
+    def _open(self):
+        try:
+            return self._connect()
+        except Exception:
+            with self._condition:
+                self._created -= 1
+                self._condition.notify()
+            raise
+
+    def _is_healthy(self, connection):
+        try:
+            cursor = connection.cursor()
+            cursor.execute(self.health_check_sql)
+            cursor.fetchall()
+            cursor.close()
+            return True
+        except Exception as e:
+            logging.warning(f"Discarding unhealthy database connection: {str(e)}")
+            return False
+
+    @staticmethod
+    def _close_quietly(connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+def _is_connection_error(error):
+    """Whether an exception means the connection itself is unusable"""
+    if PYODBC_AVAILABLE and isinstance(error, (pyodbc.OperationalError, pyodbc.InterfaceError)):
+        return True
+    return 'closed' in str(error).lower()
+
+def escape_like(value):
+    """Escape LIKE wildcards so user input only matches literally"""
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
 class DatabaseHandler:
-    def __init__(self):
-        self.config = Config()
+    def __init__(self, connection_factory=None, dialect=None, pool_size=None, config=None):
+        self.config = config or client_registry.get_config()
         self.connection_string = self.config.sql_connection_string
-    
+        self.batch_size = self.config.SQL_BATCH_SIZE
+
+        if connection_factory is None and (self.connection_string or '').startswith(SQLITE_URL_PREFIX):
+            # Local development database, e.g. sqlite:///chatbot.db
+            database_path = self.connection_string[len(SQLITE_URL_PREFIX):]
+            connection_factory = lambda: sqlite3.connect(database_path, check_same_thread=False)
+            dialect = 'sqlite'
+
+        if connection_factory is None:
+            if not PYODBC_AVAILABLE:
+                raise ImportError("pyodbc not available. Please install pyodbc and an ODBC driver")
+            if not self.connection_string:
+                raise ValueError("Missing SQL_CONNECTION_STRING. Please check your .env file.")
+            connection_factory = lambda: pyodbc.connect(self.connection_string)
+            dialect = dialect or 'mssql'
+
+        self.dialect = dialect or 'mssql'
+        self.pool = ConnectionPool(
+            connection_factory,
+            max_size=pool_size or self.config.SQL_POOL_SIZE,
+            timeout=self.config.SQL_POOL_TIMEOUT
+        )
+
     def get_connection(self):
-        """Get database connection"""
+        """Get a standalone (unpooled) database connection"""
         try:
-            connection = pyodbc.connect(self.connection_string)
+            connection = self.pool._connect()
             return connection
         except Exception as e:
             logging.error(f"Error connecting to database: {str(e)}")
             return None
-    
-    def insert_personal_info(self, file_name, personal_info):
-        """Insert extracted personal information into database"""
+
+    def close(self):
+        """Close all pooled connections"""
+        self.pool.close_all()
+
+    def initialize_schema(self, schema_path=None):
+        """Create the PersonalInformation table and indexes for this dialect"""
+        if schema_path is None:
+            schema_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), SCHEMA_FILES[self.dialect])
+
         try:
-            connection = self.get_connection()
-            if not connection:
-                return False
-            
+            with open(schema_path) as f:
+                script = f.read()
+
+            with self.pool.connection() as connection:
+                if self.dialect == 'sqlite':
+                    connection.executescript(script)
+                else:
+                    cursor = connection.cursor()
+                    cursor.execute(script)
+                    cursor.close()
+                connection.commit()
+            return True
+
+        except Exception as e:
+            logging.error(f"Error initializing schema from {schema_path}: {str(e)}")
+            return False
+
+    def execute_query(self, sql, params=()):
+        """Run a read query and return the rows as dicts (errors propagate to the caller)"""
+        with self.pool.connection() as connection:
             cursor = connection.cursor()
-            
-            # Generate unique e-file ID
-            e_file_id = str(uuid.uuid4())
-            
-            # Prepare SQL query
-            sql = """
-            INSERT INTO PersonalInformation 
-            (e_file_id, file_name, first_name, last_name, email, phone_number, 
-             address, date_of_birth, document_type, extracted_text, confidence_score)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """
-            
-            # Prepare values
-            values = (
-                e_file_id,
-                file_name,
-                personal_info.get('first_name'),
-                personal_info.get('last_name'),
-                personal_info.get('email'),
-                personal_info.get('phone_number'),
-                personal_info.get('address'),
-                personal_info.get('date_of_birth'),
-                personal_info.get('document_type'),
-                personal_info.get('extracted_text'),
-                personal_info.get('confidence_score', 0.0)
-            )
-            
-            cursor.execute(sql, values)
-            connection.commit()
-            
+            cursor.execute(sql, params)
+            columns = [column[0] for column in cursor.description]
+            rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
             cursor.close()
-            connection.close()
-            
+        return rows
+
+    def execute_scalar(self, sql, params=()):
+        """Run a query and return the first column of the first row"""
+        with self.pool.connection() as connection:
+            cursor = connection.cursor()
+            cursor.execute(sql, params)
+            row = cursor.fetchone()
+            cursor.close()
+        return row[0] if row else None
+
+    def _row_values(self, e_file_id, file_name, personal_info):
+        return (
+            e_file_id,
+            file_name,
+            personal_info.get('first_name'),
+            personal_info.get('last_name'),
+            personal_info.get('email'),
+            personal_info.get('phone_number'),
+            personal_info.get('address'),
+            personal_info.get('date_of_birth'),
+            personal_info.get('document_type'),
+            personal_info.get('extracted_text'),
+            personal_info.get('confidence_score', 0.0)
+        )
+
+    def _insert_sql(self):
+        columns = ', '.join(PERSONAL_INFO_COLUMNS)
+        placeholders = ', '.join('?' for _ in PERSONAL_INFO_COLUMNS)
+        return f"INSERT INTO PersonalInformation ({columns}) VALUES ({placeholders})"
+
+    def _upsert_sql(self):
+        columns = ', '.join(PERSONAL_INFO_COLUMNS)
+        placeholders = ', '.join('?' for _ in PERSONAL_INFO_COLUMNS)
+        updatable = [column for column in PERSONAL_INFO_COLUMNS if column != 'e_file_id']
+
+        if self.dialect == 'sqlite':
+            assignments = ', '.join(f"{column} = excluded.{column}" for column in updatable)
+            return (
+                f"INSERT INTO PersonalInformation ({columns}) VALUES ({placeholders}) "
+                f"ON CONFLICT(e_file_id) DO UPDATE SET {assignments}, updated_date = CURRENT_TIMESTAMP"
+            )
+
+        assignments = ', '.join(f"target.{column} = source.{column}" for column in updatable)
+        source_columns = ', '.join(f"source.{column}" for column in PERSONAL_INFO_COLUMNS)
+        return f"""
+            MERGE PersonalInformation WITH (HOLDLOCK) AS target
+            USING (VALUES ({placeholders})) AS source ({columns})
+            ON target.e_file_id = source.e_file_id
+            WHEN MATCHED THEN
+                UPDATE SET {assignments}, target.updated_date = SYSDATETIME()
+            WHEN NOT MATCHED THEN
+                INSERT ({columns}) VALUES ({source_columns});
+            """
+
+    def _prepare_batch_cursor(self, cursor):
+        """Enable pyodbc bulk parameter binding where available"""
+        if hasattr(cursor, 'fast_executemany'):
+            cursor.fast_executemany = True
+            # Bind the large text column as a stream instead of a max-size buffer per row
+            if PYODBC_AVAILABLE and hasattr(cursor, 'setinputsizes'):
+                sizes = [None] * len(PERSONAL_INFO_COLUMNS)
+                sizes[PERSONAL_INFO_COLUMNS.index('extracted_text')] = (pyodbc.SQL_WLONGVARCHAR, 0, 0)
+                cursor.setinputsizes(sizes)
+
+    def insert_personal_info(self, file_name, personal_info, e_file_id=None):
+        """Insert extracted personal information into database"""
+        try:
+            # Reuse the caller's e-file ID (e.g. the ADLS document's) or generate one
+            e_file_id = e_file_id or str(uuid.uuid4())
+
+            with self.pool.connection() as connection:
+                cursor = connection.cursor()
+                cursor.execute(self._insert_sql(), self._row_values(e_file_id, file_name, personal_info))
+                connection.commit()
+                cursor.close()
+
             return e_file_id
-            
+
         except Exception as e:
             logging.error(f"Error inserting personal info: {str(e)}")
             return None
-    
+
+    def insert_many(self, items, chunk_size=None):
+        """Bulk insert (file_name, personal_info[, e_file_id]) items, committing per chunk.
+
+        Returns the e-file IDs of the rows that were committed.
+        """
+        return self._write_many(self._insert_sql(), items, chunk_size, 'insert')
+
+    def upsert_many(self, items, chunk_size=None):
+        """Bulk insert-or-update (file_name, personal_info[, e_file_id]) items keyed on e_file_id.
+
+        Returns the e-file IDs of the rows that were committed.
+        """
+        return self._write_many(self._upsert_sql(), items, chunk_size, 'upsert')
+
+    def _write_many(self, sql, items, chunk_size, operation):
+        rows = []
+        for item in items:
+            file_name, personal_info = item[0], item[1]
+            e_file_id = item[2] if len(item) > 2 and item[2] else str(uuid.uuid4())
+            rows.append(self._row_values(e_file_id, file_name, personal_info))
+
+        written = []
+        if not rows:
+            return written
+
+        try:
+            with self.pool.connection() as connection:
+                cursor = connection.cursor()
+                self._prepare_batch_cursor(cursor)
+
+                for chunk in _chunks(rows, chunk_size or self.batch_size):
+                    try:
+                        cursor.executemany(sql, chunk)
+                        connection.commit()
+                        written.extend(row[0] for row in chunk)
+                    except Exception as e:
+                        connection.rollback()
+                        logging.error(f"Error in bulk {operation} of {len(chunk)} rows: {str(e)}")
+                        if _is_connection_error(e):
+                            raise
+
+                cursor.close()
+        except Exception as e:
+            logging.error(f"Error during bulk {operation}: {str(e)}")
+
+        return written
+
     def get_personal_info_by_efile_id(self, e_file_id):
         """Retrieve personal information by e-file ID"""
         try:
-            connection = self.get_connection()
-            if not connection:
-                return None
-            
-            cursor = connection.cursor()
-            
-            sql = """
-            SELECT * FROM PersonalInformation 
-            WHERE e_file_id = ?
-            """
-            
-            cursor.execute(sql, (e_file_id,))
-            row = cursor.fetchone()
-            
-            if row:
-                columns = [column[0] for column in cursor.description]
-                result = dict(zip(columns, row))
-                
+            with self.pool.connection() as connection:
+                cursor = connection.cursor()
+
+                sql = """
+                SELECT * FROM PersonalInformation
+                WHERE e_file_id = ?
+                """
+
+                cursor.execute(sql, (e_file_id,))
+                row = cursor.fetchone()
+
+                result = None
+                if row:
+                    columns = [column[0] for column in cursor.description]
+                    result = dict(zip(columns, row))
+
                 cursor.close()
-                connection.close()
                 return result
-            
-            cursor.close()
-            connection.close()
-            return None
-            
+
         except Exception as e:
             logging.error(f"Error retrieving personal info: {str(e)}")
             return None
-    
-    def search_by_email(self, email):
-        """Search personal information by email"""
+
+    def search_by_email(self, email, match=None):
+        """Search personal information by email using an index-friendly match.
+
+        match='prefix' finds addresses starting with the term, 'domain' looks up
+        the email_domain column (e.g. '@example.com' or 'example.com') and
+        'contains' keeps the old unindexed '%term%' scan. By default a term
+        starting with '@' is a domain search and anything else a prefix search.
+        """
+        where, params = self.email_search_clause(email, match)
+
         try:
-            connection = self.get_connection()
-            if not connection:
-                return []
-            
-            cursor = connection.cursor()
-            
-            sql = """
-            SELECT e_file_id, file_name, first_name, last_name, email, 
+            sql = f"""
+            SELECT e_file_id, file_name, first_name, last_name, email,
                    phone_number, document_type, created_date
-            FROM PersonalInformation 
-            WHERE email LIKE ?
+            FROM PersonalInformation
+            WHERE {where}
             """
-            
-            cursor.execute(sql, (f'%{email}%',))
-            rows = cursor.fetchall()
-            
-            results = []
-            if rows:
-                columns = [column[0] for column in cursor.description]
-                for row in rows:
-                    results.append(dict(zip(columns, row)))
-            
-            cursor.close()
-            connection.close()
-            return results
-            
+            return self.execute_query(sql, params)
+
         except Exception as e:
             logging.error(f"Error searching by email: {str(e)}")
             return []
-    
-    def get_all_records(self, limit=100):
-        """Get all records with pagination"""
-        try:
-            connection = self.get_connection()
-            if not connection:
-                return []
-            
-            cursor = connection.cursor()
-            
-            sql = f"""
-            SELECT TOP {limit} e_file_id, file_name, first_name, last_name, 
+
+    def email_search_clause(self, email, match=None):
+        """Return (where_sql, params) for an email search; see search_by_email"""
+        term = email.strip().lower()
+        if match is None:
+            match = 'domain' if term.startswith('@') else 'prefix'
+
+        if match == 'domain':
+            return "email_domain = ?", (term.lstrip('@'),)
+        if match == 'contains':
+            return "email LIKE ? ESCAPE '\\'", (f'%{escape_like(term)}%',)
+        return "email LIKE ? ESCAPE '\\'", (f'{escape_like(term)}%',)
+
+    def get_records_page(self, page_size=100, after=None):
+        """Get one page of records, newest first, using keyset pagination.
+
+        `after` is the cursor returned with the previous page. Returns
+        (records, next_cursor); next_cursor is None on the last page.
+        """
+        where, params = '', []
+        if after:
+            created_date, record_id = after
+            # The leading created_date <= ? bound lets the index seek instead of scan
+            where = "WHERE created_date <= ? AND (created_date < ? OR id < ?)"
+            params = [created_date, created_date, record_id]
+
+        sql = self._limit_sql(f"""
+            SELECT id, e_file_id, file_name, first_name, last_name,
                    email, phone_number, document_type, created_date, confidence_score
-            FROM PersonalInformation 
-            ORDER BY created_date DESC
-            """
-            
-            cursor.execute(sql)
-            rows = cursor.fetchall()
-            
-            results = []
-            if rows:
-                columns = [column[0] for column in cursor.description]
-                for row in rows:
-                    results.append(dict(zip(columns, row)))
-            
-            cursor.close()
-            connection.close()
-            return results
-            
+            FROM PersonalInformation
+            {where}
+            ORDER BY created_date DESC, id DESC
+            """, page_size, params)
+
+        try:
+            records = self.execute_query(sql, params)
         except Exception as e:
-            logging.error(f"Error getting all records: {str(e)}")
-            return []
-    
+            logging.error(f"Error getting records page: {str(e)}")
+            return [], None
+
+        next_cursor = None
+        if len(records) == page_size:
+            next_cursor = (records[-1]['created_date'], records[-1]['id'])
+        return records, next_cursor
+
+    def iter_records(self, batch_size=500, columns=None):
+        """Stream all records, newest first, fetching batch_size rows at a time"""
+        selected = ', '.join(columns) if columns else '*'
+        sql = f"SELECT {selected} FROM PersonalInformation ORDER BY created_date DESC, id DESC"
+
+        with self.pool.connection() as connection:
+            cursor = connection.cursor()
+            try:
+                cursor.execute(sql)
+                names = [column[0] for column in cursor.description]
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    for row in rows:
+                        yield dict(zip(names, row))
+            finally:
+                cursor.close()
+
+    def get_all_records(self, limit=100):
+        """Get the most recent records (first page of get_records_page)"""
+        records, _ = self.get_records_page(page_size=limit)
+        return records
+
+    def _limit_sql(self, sql, limit, params):
+        """Apply a parameterized row limit for the current dialect"""
+        if self.dialect == 'sqlite':
+            params.append(int(limit))
+            return f"{sql} LIMIT ?"
+        params.insert(0, int(limit))
+        return sql.replace('SELECT', 'SELECT TOP (?)', 1)
+
     def update_personal_info(self, e_file_id, updated_info):
         """Update personal information"""
         try:
-            connection = self.get_connection()
-            if not connection:
-                return False
-            
-            cursor = connection.cursor()
-            
-            sql = """
-            UPDATE PersonalInformation 
-            SET first_name = ?, last_name = ?, email = ?, phone_number = ?, 
-                address = ?, date_of_birth = ?, document_type = ?, updated_date = ?
-            WHERE e_file_id = ?
-            """
-            
-            values = (
-                updated_info.get('first_name'),
-                updated_info.get('last_name'),
-                updated_info.get('email'),
-                updated_info.get('phone_number'),
-                updated_info.get('address'),
-                updated_info.get('date_of_birth'),
-                updated_info.get('document_type'),
-                datetime.now(),
-                e_file_id
-            )
-            
-            cursor.execute(sql, values)
-            connection.commit()
-            
-            cursor.close()
-            connection.close()
+            with self.pool.connection() as connection:
+                cursor = connection.cursor()
+
+                sql = """
+                UPDATE PersonalInformation
+                SET first_name = ?, last_name = ?, email = ?, phone_number = ?,
+                    address = ?, date_of_birth = ?, document_type = ?, updated_date = ?
+                WHERE e_file_id = ?
+                """
+
+                values = (
+                    updated_info.get('first_name'),
+                    updated_info.get('last_name'),
+                    updated_info.get('email'),
+                    updated_info.get('phone_number'),
+                    updated_info.get('address'),
+                    updated_info.get('date_of_birth'),
+                    updated_info.get('document_type'),
+                    datetime.now(),
+                    e_file_id
+                )
+
+                cursor.execute(sql, values)
+                connection.commit()
+                cursor.close()
+
             return True
-            
+
         except Exception as e:
             logging.error(f"Error updating personal info: {str(e)}")
-            return False
\ No newline at end of file
+            return False
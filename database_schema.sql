@@ -13,10 +13,25 @@ CREATE TABLE PersonalInformation (
     extracted_text NTEXT,
     confidence_score FLOAT,
     created_date DATETIME2 DEFAULT GETDATE(),
-    updated_date DATETIME2 DEFAULT GETDATE()
+    updated_date DATETIME2 DEFAULT GETDATE(),
+    -- Domain part of the email, indexed for '@example.com' lookups
+    email_domain AS (
+        CASE WHEN CHARINDEX('@', email) > 0 THEN LOWER(SUBSTRING(email, CHARINDEX('@', email) + 1, 255)) END
+    ) PERSISTED
 );
 
 -- Create index for faster searches
 CREATE INDEX IX_PersonalInformation_EFileId ON PersonalInformation(e_file_id);
 CREATE INDEX IX_PersonalInformation_Email ON PersonalInformation(email);
-CREATE INDEX IX_PersonalInformation_CreatedDate ON PersonalInformation(created_date);
\ No newline at end of file
+CREATE INDEX IX_PersonalInformation_CreatedDate ON PersonalInformation(created_date);
+-- Keyset pagination: ORDER BY created_date DESC, id DESC
+CREATE INDEX IX_PersonalInformation_CreatedDate_Id ON PersonalInformation(created_date DESC, id DESC);
+CREATE INDEX IX_PersonalInformation_EmailDomain ON PersonalInformation(email_domain);
+CREATE INDEX IX_PersonalInformation_DocumentType ON PersonalInformation(document_type);
+
+-- Existing databases: add the computed domain column and new indexes
+-- ALTER TABLE PersonalInformation ADD email_domain AS (
+--     CASE WHEN CHARINDEX('@', email) > 0 THEN LOWER(SUBSTRING(email, CHARINDEX('@', email) + 1, 255)) END
+-- ) PERSISTED;
+-- CREATE INDEX IX_PersonalInformation_CreatedDate_Id ON PersonalInformation(created_date DESC, id DESC);
+-- CREATE INDEX IX_PersonalInformation_EmailDomain ON PersonalInformation(email_domain);
\ No newline at end of file
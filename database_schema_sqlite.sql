@@ -0,0 +1,30 @@
+-- SQLite equivalent of database_schema.sql for local development and testing
+CREATE TABLE IF NOT EXISTS PersonalInformation (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    e_file_id TEXT NOT NULL UNIQUE,
+    file_name TEXT,
+    first_name TEXT,
+    last_name TEXT,
+    email TEXT COLLATE NOCASE,
+    phone_number TEXT,
+    address TEXT,
+    date_of_birth DATE,
+    document_type TEXT,
+    extracted_text TEXT,
+    confidence_score REAL,
+    created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    -- Domain part of the email, indexed for '@example.com' lookups
+    email_domain TEXT GENERATED ALWAYS AS (
+        CASE WHEN instr(email, '@') > 0 THEN lower(substr(email, instr(email, '@') + 1)) END
+    ) STORED
+);
+
+-- Create index for faster searches
+CREATE INDEX IF NOT EXISTS IX_PersonalInformation_EFileId ON PersonalInformation(e_file_id);
+CREATE INDEX IF NOT EXISTS IX_PersonalInformation_Email ON PersonalInformation(email);
+CREATE INDEX IF NOT EXISTS IX_PersonalInformation_CreatedDate ON PersonalInformation(created_date);
+-- Keyset pagination: ORDER BY created_date DESC, id DESC
+CREATE INDEX IF NOT EXISTS IX_PersonalInformation_CreatedDate_Id ON PersonalInformation(created_date DESC, id DESC);
+CREATE INDEX IF NOT EXISTS IX_PersonalInformation_EmailDomain ON PersonalInformation(email_domain);
+CREATE INDEX IF NOT EXISTS IX_PersonalInformation_DocumentType ON PersonalInformation(document_type);
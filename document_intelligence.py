@@ -1,183 +1,145 @@
-from azure.ai.formrecognizer import DocumentAnalysisClient
-from azure.core.credentials import AzureKeyCredential
-from config import Config
+from analysis_scheduler import AnalysisScheduler, SchedulerRetryPolicy
+import client_registry
+from metrics import metrics
+from profiling import profiler
+from pdf_text import extract_text_layer, split_pdf
+from extraction_rules import extract_fields
+from concurrent.futures import ThreadPoolExecutor
 import logging
-import re
-from datetime import datetime
 
 class DocumentIntelligenceHandler:
-    def __init__(self):
-        self.config = Config()
+    # Optional ExtractionPool that runs the rules in other processes
+    extraction_pool = None
+    
+    def __init__(self, config=None):
+        self.config = config or client_registry.get_config()
+        # Imported here so commands that never analyze documents skip loading the SDK
+        from azure.ai.formrecognizer import DocumentAnalysisClient
+        from azure.core.credentials import AzureKeyCredential
         self.client = DocumentAnalysisClient(
             endpoint=self.config.DOCUMENT_INTELLIGENCE_ENDPOINT,
-            credential=AzureKeyCredential(self.config.DOCUMENT_INTELLIGENCE_KEY)
+            credential=AzureKeyCredential(self.config.DOCUMENT_INTELLIGENCE_KEY),
+            # Throttled submissions must reach the scheduler instead of being retried inside the SDK
+            retry_policy=SchedulerRetryPolicy()
+        )
+        self.scheduler = AnalysisScheduler(
+            self.client,
+            requests_per_second=self.config.DOCUMENT_INTELLIGENCE_RPS,
+            max_concurrency=self.config.DOCUMENT_INTELLIGENCE_MAX_CONCURRENCY,
+            max_retries=self.config.DOCUMENT_INTELLIGENCE_MAX_RETRIES,
+            min_poll_interval=self.config.DOCUMENT_INTELLIGENCE_POLL_MIN_SECONDS,
+            max_poll_interval=self.config.DOCUMENT_INTELLIGENCE_POLL_MAX_SECONDS
         )
     
+    @profiler.profiled('document_intelligence.extract_personal_info')
     def extract_personal_info(self, pdf_content):
-        """Extract personal information from PDF using Document Intelligence"""
+        """Extract personal information from PDF bytes or a binary stream using Document Intelligence"""
         try:
-            # Analyze document using prebuilt-document model
-            poller = self.client.begin_analyze_document(
-                "prebuilt-document", 
-                pdf_content
-            )
-            result = poller.result()
+            # Born-digital PDFs: use the embedded text layer and skip the remote model
+            if self.config.PDF_TEXT_FAST_PATH:
+                personal_info = self._extract_from_text_layer(pdf_content)
+                if personal_info:
+                    return personal_info
             
-            # Extract text content
-            extracted_text = ""
-            for page in result.pages:
-                for line in page.lines:
-                    extracted_text += line.content + "\n"
+            # Large documents are analyzed as parallel page ranges and merged
+            page_ranges = split_pdf(pdf_content, self.config.PDF_SPLIT_PAGES)
+            if page_ranges:
+                analyses = self._analyze_ranges(page_ranges)
+            else:
+                analyses = [self._analyze(pdf_content)]
+            
+            extracted_text = "".join(analysis['text'] for analysis in analyses)
+            total_confidence = sum(analysis['total_confidence'] for analysis in analyses)
+            element_count = sum(analysis['element_count'] for analysis in analyses)
             
             # Extract personal information using patterns and AI
-            personal_info = self._extract_patterns(extracted_text)
+            with metrics.timer('document_intelligence_seconds', stage='extract_patterns'):
+                personal_info = self._extract_fields(extracted_text)
             personal_info['extracted_text'] = extracted_text
-            personal_info['confidence_score'] = self._calculate_confidence(result)
+            personal_info['confidence_score'] = total_confidence / element_count if element_count else 0.0
+            personal_info['extraction_method'] = 'document_intelligence'
             
             return personal_info
             
         except Exception as e:
+            metrics.inc('document_intelligence_errors_total')
             logging.error(f"Error extracting personal info: {str(e)}")
             return None
     
-    def _extract_patterns(self, text):
-        """Extract personal information using regex patterns"""
-        personal_info = {
-            'first_name': None,
-            'last_name': None,
-            'email': None,
-            'phone_number': None,
-            'address': None,
-            'date_of_birth': None,
-            'age': None,
-            'document_type': None
-        }
-        
-        # Email pattern
-        email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-        email_match = re.search(email_pattern, text)
-        if email_match:
-            personal_info['email'] = email_match.group()
+    def _analyze(self, pdf_content):
+        """Run the prebuilt-document model on one document (or page range)"""
+        # Analyze document using prebuilt-document model (rate limited, retried on 429)
+        result = self.scheduler.analyze(pdf_content)
+        metrics.inc('document_intelligence_pages_total', len(result.pages))
         
-        # Phone pattern (various formats)
-        phone_pattern = r'(\+?\d{1,3}[-.\s]?)?\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}'
-        phone_match = re.search(phone_pattern, text)
-        if phone_match:
-            personal_info['phone_number'] = phone_match.group()
-        
-        # Age pattern - Extract age and convert to date of birth
-        age_patterns = [
-            r'Age[:\s]+(\d{1,3})',
-            r'age[:\s]+(\d{1,3})',
-            r'AGE[:\s]+(\d{1,3})',
-            r'(\d{1,3})\s+years?\s+old',
-            r'(\d{1,3})\s+yrs?\s+old',
-            r'Born[:\s]+(\d{1,3})\s+years?\s+ago'
-        ]
-        
-        age = None
-        for pattern in age_patterns:
-            age_match = re.search(pattern, text, re.IGNORECASE)
-            if age_match:
-                try:
-                    age = int(age_match.group(1))
-                    if 0 <= age <= 150:  # Reasonable age range
-                        personal_info['age'] = age
-                        # Calculate date of birth from age
-                        current_date = datetime.now()
-                        birth_year = current_date.year - age
-                        # Assume birth date is January 1st if no specific date given
-                        date_of_birth = f"{birth_year}-01-01"
-                        personal_info['date_of_birth'] = date_of_birth
-                        break
-                except ValueError:
-                    continue
+        # Extract text content
+        extracted_text = ""
+        for page in result.pages:
+            for line in page.lines:
+                extracted_text += line.content + "\n"
         
-        # Date patterns (MM/DD/YYYY, DD/MM/YYYY, YYYY-MM-DD) - if no age found
-        if not personal_info['date_of_birth']:
-            date_patterns = [
-                r'\b\d{1,2}[/-]\d{1,2}[/-]\d{4}\b',
-                r'\b\d{4}[/-]\d{1,2}[/-]\d{1,2}\b'
-            ]
-            for pattern in date_patterns:
-                date_match = re.search(pattern, text)
-                if date_match:
-                    try:
-                        # Try to parse the date
-                        date_str = date_match.group()
-                        # Convert to standard format YYYY-MM-DD
-                        if '/' in date_str:
-                            parts = date_str.split('/')
-                        else:
-                            parts = date_str.split('-')
-                        
-                        if len(parts) == 3:
-                            # Try different date formats
-                            if len(parts[0]) == 4:  # YYYY-MM-DD or YYYY/MM/DD
-                                formatted_date = f"{parts[0]}-{parts[1].zfill(2)}-{parts[2].zfill(2)}"
-                            elif len(parts[2]) == 4:  # MM/DD/YYYY or DD/MM/YYYY
-                                # Assume MM/DD/YYYY format
-                                formatted_date = f"{parts[2]}-{parts[0].zfill(2)}-{parts[1].zfill(2)}"
-                            else:
-                                continue
-                            
-                            personal_info['date_of_birth'] = formatted_date
-                            
-                            # Calculate age from date of birth
-                            try:
-                                birth_date = datetime.strptime(formatted_date, '%Y-%m-%d')
-                                today = datetime.now()
-                                calculated_age = today.year - birth_date.year - ((today.month, today.day) < (birth_date.month, birth_date.day))
-                                if 0 <= calculated_age <= 150:
-                                    personal_info['age'] = calculated_age
-                            except:
-                                pass
-                            break
-                    except:
-                        continue
+        total_confidence, element_count = self._confidence_totals(result)
+        return {
+            'text': extracted_text,
+            'total_confidence': total_confidence,
+            'element_count': element_count
+        }
+    
+    def _analyze_ranges(self, page_ranges):
+        """Analyze page ranges concurrently; results come back in page order"""
+        metrics.inc('document_intelligence_split_documents_total')
+        metrics.observe('document_intelligence_split_ranges', len(page_ranges))
+        logging.info(f"Analyzing {page_ranges[-1][1]} pages as {len(page_ranges)} ranges")
         
-        # Name extraction (simple approach - look for common patterns)
-        name_patterns = [
-            r'Name[:\s]+([A-Za-z\s]+)',
-            r'Full Name[:\s]+([A-Za-z\s]+)',
-            r'First Name[:\s]+([A-Za-z]+)',
-            r'Last Name[:\s]+([A-Za-z]+)'
-        ]
+        workers = max(1, min(self.config.PDF_SPLIT_MAX_WORKERS, len(page_ranges)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='analyze-range') as executor:
+            # map() preserves order, and re-raises the first failure so the document fails as a whole
+            return list(executor.map(lambda page_range: self._analyze(page_range[2]), page_ranges))
+    
+    def _extract_from_text_layer(self, pdf_content):
+        """Extract from the PDF's own text layer; None if it is missing or too poor to trust"""
+        with metrics.timer('document_intelligence_seconds', stage='text_layer'):
+            text_layer = extract_text_layer(pdf_content)
         
-        for pattern in name_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                if 'First Name' in pattern:
-                    personal_info['first_name'] = match.group(1).strip()
-                elif 'Last Name' in pattern:
-                    personal_info['last_name'] = match.group(1).strip()
-                else:
-                    # Split full name
-                    full_name = match.group(1).strip().split()
-                    if len(full_name) >= 2:
-                        personal_info['first_name'] = full_name[0]
-                        personal_info['last_name'] = ' '.join(full_name[1:])
-                    elif len(full_name) == 1:
-                        personal_info['first_name'] = full_name[0]
+        if not text_layer or not text_layer.is_usable(
+            min_chars_per_page=self.config.PDF_TEXT_MIN_CHARS_PER_PAGE,
+            min_quality=self.config.PDF_TEXT_MIN_QUALITY
+        ):
+            metrics.inc('text_layer_documents_total', outcome='fallback')
+            return None
         
-        # Address pattern (basic)
-        address_pattern = r'Address[:\s]+([A-Za-z0-9\s,.-]+(?:Street|St|Avenue|Ave|Road|Rd|Boulevard|Blvd|Drive|Dr)[A-Za-z0-9\s,.-]*)'
-        address_match = re.search(address_pattern, text, re.IGNORECASE)
-        if address_match:
-            personal_info['address'] = address_match.group(1).strip()
+        metrics.inc('text_layer_documents_total', outcome='used')
+        metrics.inc('text_layer_pages_total', text_layer.page_count)
         
-        # Document type detection
-        doc_types = ['passport', 'driver license', 'id card', 'birth certificate', 'resume', 'cv']
-        text_lower = text.lower()
-        for doc_type in doc_types:
-            if doc_type in text_lower:
-                personal_info['document_type'] = doc_type.title()
-                break
+        extracted_text = text_layer.text
+        with metrics.timer('document_intelligence_seconds', stage='extract_patterns'):
+            personal_info = self._extract_fields(extracted_text)
+        personal_info['extracted_text'] = extracted_text
+        personal_info['confidence_score'] = round(text_layer.quality(), 3)
+        personal_info['extraction_method'] = 'text_layer'
         
         return personal_info
     
+    def _extract_patterns(self, text):
+        """Extract personal information using regex patterns"""
+        return extract_fields(text)
+    
+    def _extract_fields(self, text):
+        """Run the extraction rules, in the process pool when one is attached"""
+        if self.extraction_pool is not None:
+            return self.extraction_pool.extract(text)
+        return self._extract_patterns(text)
+    
     def _calculate_confidence(self, result):
         """Calculate overall confidence score"""
+        total_confidence, element_count = self._confidence_totals(result)
+        
+        if element_count > 0:
+            return total_confidence / element_count
+        return 0.0
+    
+    def _confidence_totals(self, result):
+        """Sum of line confidences and number of lines, so page ranges can be merged"""
         total_confidence = 0
         element_count = 0
         
@@ -187,6 +149,4 @@ class DocumentIntelligenceHandler:
                     total_confidence += line.confidence
                     element_count += 1
         
-        if element_count > 0:
-            return total_confidence / element_count
-        return 0.0
\ No newline at end of file
+        return total_confidence, element_count
\ No newline at end of file
@@ -0,0 +1,140 @@
+"""
+Rules for pulling personal information out of extracted document text.
+
+The patterns are compiled once at import time and only read afterwards, so
+the tables are built once per process (including each extraction pool
+worker) and shared by every thread in it. extract_fields is a plain
+function of the text, which keeps it cheap to run in another process.
+"""
+import re
+from datetime import datetime
+
+EMAIL_PATTERN = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b')
+
+# Phone pattern (various formats)
+PHONE_PATTERN = re.compile(r'(\+?\d{1,3}[-.\s]?)?\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}')
+
+# Age patterns - the age is converted to a date of birth
+AGE_PATTERNS = tuple(re.compile(pattern, re.IGNORECASE) for pattern in (
+    r'Age[:\s]+(\d{1,3})',
+    r'(\d{1,3})\s+years?\s+old',
+    r'(\d{1,3})\s+yrs?\s+old',
+    r'Born[:\s]+(\d{1,3})\s+years?\s+ago'
+))
+
+# Date patterns (MM/DD/YYYY, DD/MM/YYYY, YYYY-MM-DD) - used if no age is found
+DATE_PATTERNS = (
+    re.compile(r'\b\d{1,2}[/-]\d{1,2}[/-]\d{4}\b'),
+    re.compile(r'\b\d{4}[/-]\d{1,2}[/-]\d{1,2}\b')
+)
+
+# (field, pattern); later matches override earlier ones, as 'full' sets both names
+NAME_PATTERNS = tuple((field, re.compile(pattern, re.IGNORECASE)) for field, pattern in (
+    ('full', r'Name[:\s]+([A-Za-z\s]+)'),
+    ('full', r'Full Name[:\s]+([A-Za-z\s]+)'),
+    ('first_name', r'First Name[:\s]+([A-Za-z]+)'),
+    ('last_name', r'Last Name[:\s]+([A-Za-z]+)')
+))
+
+ADDRESS_PATTERN = re.compile(
+    r'Address[:\s]+([A-Za-z0-9\s,.-]+(?:Street|St|Avenue|Ave|Road|Rd|Boulevard|Blvd|Drive|Dr)[A-Za-z0-9\s,.-]*)',
+    re.IGNORECASE
+)
+
+DOCUMENT_TYPES = ('passport', 'driver license', 'id card', 'birth certificate', 'resume', 'cv')
+
+
+def extract_fields(text):
+    """Extract personal information from document text using the rule tables"""
+    personal_info = {
+        'first_name': None,
+        'last_name': None,
+        'email': None,
+        'phone_number': None,
+        'address': None,
+        'date_of_birth': None,
+        'age': None,
+        'document_type': None
+    }
+
+    email_match = EMAIL_PATTERN.search(text)
+    if email_match:
+        personal_info['email'] = email_match.group()
+
+    phone_match = PHONE_PATTERN.search(text)
+    if phone_match:
+        personal_info['phone_number'] = phone_match.group()
+
+    for pattern in AGE_PATTERNS:
+        age_match = pattern.search(text)
+        if age_match:
+            try:
+                age = int(age_match.group(1))
+                if 0 <= age <= 150:  # Reasonable age range
+                    personal_info['age'] = age
+                    # Assume birth date is January 1st if no specific date given
+                    personal_info['date_of_birth'] = f"{datetime.now().year - age}-01-01"
+                    break
+            except ValueError:
+                continue
+
+    if not personal_info['date_of_birth']:
+        for pattern in DATE_PATTERNS:
+            date_match = pattern.search(text)
+            if date_match:
+                date_of_birth, age = _parse_date(date_match.group())
+                if date_of_birth is None:
+                    continue
+                personal_info['date_of_birth'] = date_of_birth
+                if age is not None:
+                    personal_info['age'] = age
+                break
+
+    for field, pattern in NAME_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            if field != 'full':
+                personal_info[field] = match.group(1).strip()
+            else:
+                # Split full name
+                full_name = match.group(1).strip().split()
+                if len(full_name) >= 2:
+                    personal_info['first_name'] = full_name[0]
+                    personal_info['last_name'] = ' '.join(full_name[1:])
+                elif len(full_name) == 1:
+                    personal_info['first_name'] = full_name[0]
+
+    address_match = ADDRESS_PATTERN.search(text)
+    if address_match:
+        personal_info['address'] = address_match.group(1).strip()
+
+    text_lower = text.lower()
+    for doc_type in DOCUMENT_TYPES:
+        if doc_type in text_lower:
+            personal_info['document_type'] = doc_type.title()
+            break
+
+    return personal_info
+
+
+def _parse_date(date_str):
+    """Normalize a matched date to YYYY-MM-DD; returns (date_of_birth, age), (None, None) if unusable"""
+    parts = date_str.split('/') if '/' in date_str else date_str.split('-')
+    if len(parts) != 3:
+        return None, None
+
+    if len(parts[0]) == 4:  # YYYY-MM-DD or YYYY/MM/DD
+        formatted_date = f"{parts[0]}-{parts[1].zfill(2)}-{parts[2].zfill(2)}"
+    elif len(parts[2]) == 4:  # MM/DD/YYYY or DD/MM/YYYY, assumed MM/DD/YYYY
+        formatted_date = f"{parts[2]}-{parts[0].zfill(2)}-{parts[1].zfill(2)}"
+    else:
+        return None, None
+
+    # Calculate age from date of birth
+    try:
+        birth_date = datetime.strptime(formatted_date, '%Y-%m-%d')
+    except ValueError:
+        return formatted_date, None
+    today = datetime.now()
+    age = today.year - birth_date.year - ((today.month, today.day) < (birth_date.month, birth_date.day))
+    return formatted_date, age if 0 <= age <= 150 else None
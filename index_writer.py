@@ -0,0 +1,260 @@
+"""
+Write-behind batching for search index updates.
+
+During bulk ingestion every processed file would otherwise cost a full
+download/upload of metadata/search_index.json. BufferedIndexWriter keeps new
+index records in memory and merges them into the index in one conditional
+update every `max_records` records or `max_delay` seconds. Each record is
+also appended to a local JSONL journal before it is buffered, so records
+survive a crash between flushes.
+
+Every writer has its own journal in the journal directory and holds an OS
+lock on it while it runs, so processes on one host (Streamlit, --worker,
+--watch, partitioned nodes) never overwrite each other's pending records. On
+start-up a writer adopts only orphaned journals: those whose lock is free
+because their writer exited or crashed.
+"""
+import glob
+import json
+import logging
+import os
+import socket
+import tempfile
+import threading
+import time
+import uuid
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from metrics import metrics
+
+
+def _try_lock(f):
+    """Non-blocking exclusive lock on an open file; released on close or process exit"""
+    try:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class BufferedIndexWriter:
+    """Buffers search index records and flushes them as one merged update"""
+
+    def __init__(self, adls_handler, max_records=50, max_delay=5.0, journal_dir=None, journal_name='index'):
+        self.adls_handler = adls_handler
+        self.max_records = max_records
+        self.max_delay = max_delay
+        # Journals are <journal_name>.<writer>.jsonl in journal_dir; None disables journaling
+        self.journal_dir = journal_dir
+        self.journal_name = journal_name
+        self.journal_path = None
+        self._journal_lock = None
+        self._buffer = {}
+        self._oldest = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._closed = False
+
+        self._open_journal()
+        self._recover()
+
+        self._thread = threading.Thread(target=self._flush_periodically, name='index-writer', daemon=True)
+        self._thread.start()
+
+    def add(self, record):
+        """Queue one index record (keyed by e_file_id); may trigger a flush"""
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Index writer is closed")
+            self._append_journal(record)
+            self._buffer[record['e_file_id']] = record
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+                self._wakeup.notify()
+            ready = len(self._buffer) >= self.max_records
+
+        if ready:
+            self.flush()
+
+    def discard(self, e_file_id):
+        """Drop a buffered record (e.g. one deleted before it was flushed)"""
+        with self._lock:
+            if self._buffer.pop(e_file_id, None) is not None:
+                self._rewrite_journal()
+
+    def flush(self):
+        """Merge all buffered records into the index; returns the number written"""
+        with self._flush_lock:
+            with self._lock:
+                batch = dict(self._buffer)
+            if not batch:
+                return 0
+
+            def merge(index_data):
+                records = [r for r in index_data.get('records', []) if r.get('e_file_id') not in batch]
+                records.extend(batch.values())
+                index_data['records'] = records
+
+            try:
+                with metrics.timer('search_index_flush_seconds'):
+                    self.adls_handler._modify_search_index(merge)
+            except Exception as e:
+                metrics.inc('adls_errors_total', operation='index_flush')
+                logging.error(f"Error flushing {len(batch)} index record(s), will retry: {str(e)}")
+                return 0
+
+            metrics.observe('search_index_flush_records', len(batch))
+            with self._lock:
+                # Keep records that were added or replaced while the flush ran
+                for e_file_id, record in batch.items():
+                    if self._buffer.get(e_file_id) is record:
+                        del self._buffer[e_file_id]
+                self._oldest = time.monotonic() if self._buffer else None
+                self._rewrite_journal()
+
+            logging.info(f"Flushed {len(batch)} record(s) to the search index")
+            return len(batch)
+
+    def close(self):
+        """Flush what is left and stop the background thread"""
+        with self._lock:
+            self._closed = True
+            self._wakeup.notify()
+        self._thread.join()
+        self.flush()
+        self._close_journal()
+
+    @property
+    def pending(self):
+        with self._lock:
+            return len(self._buffer)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def _flush_periodically(self):
+        while True:
+            with self._lock:
+                while not self._closed and (self._oldest is None or time.monotonic() - self._oldest < self.max_delay):
+                    timeout = None if self._oldest is None else self.max_delay - (time.monotonic() - self._oldest)
+                    self._wakeup.wait(timeout)
+                if self._closed:
+                    return
+            if self.flush() == 0:
+                # Nothing written (failed or already flushed); wait a full interval before retrying
+                with self._lock:
+                    self._oldest = time.monotonic() if self._buffer else None
+
+    # Journal
+
+    def _open_journal(self):
+        if not self.journal_dir:
+            return
+        os.makedirs(self.journal_dir, exist_ok=True)
+        writer_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.journal_path = os.path.join(self.journal_dir, f"{self.journal_name}.{writer_id}.jsonl")
+        # Held until close; a free lock marks the journal as orphaned
+        self._journal_lock = open(f"{self.journal_path}.lock", 'a')
+        _try_lock(self._journal_lock)
+        # Created up front so a crash leaves a journal (even an empty one) for recovery to clean up
+        open(self.journal_path, 'a').close()
+
+    def _close_journal(self):
+        if self._journal_lock is None:
+            return
+        if not self._buffer:
+            _remove(self.journal_path)
+            _remove(f"{self.journal_path}.lock")
+        else:
+            # Left for the next writer to recover
+            logging.warning(f"{len(self._buffer)} index record(s) left unflushed in {self.journal_path}")
+        self._journal_lock.close()
+        self._journal_lock = None
+        self.journal_path = None
+
+    def _append_journal(self, record):
+        if not self.journal_path:
+            return
+        with open(self.journal_path, 'a') as f:
+            f.write(json.dumps(record, default=str) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _rewrite_journal(self):
+        if not self.journal_path:
+            return
+        fd, temp_path = tempfile.mkstemp(dir=self.journal_dir, prefix=f"{os.path.basename(self.journal_path)}.", suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                for record in self._buffer.values():
+                    f.write(json.dumps(record, default=str) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.journal_path)
+        except BaseException:
+            _remove(temp_path)
+            raise
+
+    def _read_journal(self, path):
+        records = []
+        with open(path) as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    # A torn final line from a crash mid-write
+                    logging.warning(f"Skipping unreadable journal line in {path}")
+        return records
+
+    def _recover(self):
+        """Adopt records from journals whose writer is gone (their lock is free) and never reached the index"""
+        if not self.journal_path:
+            return
+
+        # <name>.jsonl is the shared journal used before journals were per writer
+        pattern = os.path.join(glob.escape(self.journal_dir), f"{glob.escape(self.journal_name)}.*jsonl")
+        for path in sorted(glob.glob(pattern)):
+            if path == self.journal_path:
+                continue
+            with open(f"{path}.lock", 'a') as lock:
+                if not _try_lock(lock):
+                    continue
+                if not os.path.exists(path):
+                    # Adopted by another writer while we waited
+                    _remove(f"{path}.lock")
+                    continue
+                records = self._read_journal(path)
+                for record in records:
+                    self._buffer[record['e_file_id']] = record
+                # Into our own journal before the orphan is removed, so the records are always on disk
+                self._rewrite_journal()
+                _remove(path)
+                _remove(f"{path}.lock")
+            if records:
+                logging.info(f"Recovered {len(records)} unflushed index record(s) from {path}")
+
+        if self._buffer:
+            self._oldest = time.monotonic()
@@ -0,0 +1,66 @@
+"""
+Front-end independent processing of one PDF: download, extract, persist.
+
+The CLI, bulk jobs and background workers share IngestionPipeline so every
+path records the same metrics and can pass in a known e_file_id, which makes
+re-processing a file (after a crash or a retry) overwrite the earlier
+result instead of creating a duplicate record.
+"""
+import logging
+import uuid
+
+from metrics import metrics
+
+
+class IngestionPipeline:
+    """Downloads a PDF from ADLS, extracts personal information and stores it"""
+
+    def __init__(self, adls_handler, doc_intelligence, persistence, frontend='cli'):
+        self.adls_handler = adls_handler
+        self.doc_intelligence = doc_intelligence
+        self.persistence = persistence
+        self.frontend = frontend
+
+    def process(self, file_name, e_file_id=None, batch=False):
+        """Process one file; returns a dict with status, e_file_id, personal_info and error"""
+        e_file_id = e_file_id or str(uuid.uuid4())
+        outcome = {'file_name': file_name, 'e_file_id': e_file_id, 'status': None, 'personal_info': None, 'error': None}
+
+        try:
+            with metrics.timer('pipeline_seconds', frontend=self.frontend, stage='total'):
+                # Download PDF
+                with metrics.timer('pipeline_seconds', frontend=self.frontend, stage='download'):
+                    pdf_stream = self.adls_handler.open_pdf_stream(file_name)
+                if pdf_stream is None:
+                    return self._finish(outcome, 'download_failed', "Failed to download file")
+
+                # Extract information
+                with metrics.timer('pipeline_seconds', frontend=self.frontend, stage='extract'):
+                    with pdf_stream:
+                        personal_info = self.doc_intelligence.extract_personal_info(pdf_stream)
+                if not personal_info:
+                    return self._finish(outcome, 'extract_failed', "Failed to extract information")
+                outcome['personal_info'] = personal_info
+
+                # Store in ADLS (and SQL in dual mode); batch=True queues the SQL row until flush
+                with metrics.timer('pipeline_seconds', frontend=self.frontend, stage='store'):
+                    store = self.persistence.add if batch else self.persistence.save
+                    if store(file_name, personal_info, e_file_id) is None:
+                        return self._finish(outcome, 'store_failed', "Failed to store in ADLS")
+        except Exception as e:
+            logging.error(f"Error processing {file_name}: {str(e)}")
+            return self._finish(outcome, 'error', str(e))
+
+        return self._finish(outcome, 'processed')
+
+    def flush(self):
+        """Write everything buffered by batch processing (index records, SQL rows)"""
+        if self.adls_handler.index_writer is not None:
+            self.adls_handler.index_writer.flush()
+        self.persistence.flush()
+
+    def _finish(self, outcome, status, error=None):
+        metrics.inc('pipeline_files_total', frontend=self.frontend, status=status)
+        outcome['status'] = status
+        outcome['error'] = error
+        return outcome
@@ -0,0 +1,235 @@
+"""
+Resumable batch ingestion.
+
+An IngestionJob keeps a manifest of per-file status as an append-only JSONL
+log. Before a file is processed its e_file_id is recorded, so a file that was
+interrupted is re-processed under the same ID and overwrites its partial
+result. Completed files are committed to the manifest at checkpoints, after
+buffered index records and SQL rows have been flushed, so a crash redoes at
+most one checkpoint's worth of files. Failed files are retried with
+exponential backoff, within the run and again on the next run, up to
+`max_attempts` in total.
+"""
+import json
+import logging
+import os
+import random
+import time
+import uuid
+from datetime import datetime
+
+from metrics import metrics
+
+PENDING = 'pending'
+PROCESSING = 'processing'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class JobManifest:
+    """Per-file job state, persisted as an append-only JSONL log"""
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        self._load()
+
+    def get(self, file_name):
+        return self.entries.get(file_name)
+
+    def status(self, file_name):
+        entry = self.entries.get(file_name)
+        return entry['status'] if entry else PENDING
+
+    def update(self, file_name, **fields):
+        """Record new state for one file (durably, before returning)"""
+        self.update_many([(file_name, fields)])
+
+    def update_many(self, updates):
+        """Record new state for several files with a single fsync"""
+        now = datetime.now().isoformat()
+        lines = []
+        for file_name, fields in updates:
+            entry = dict(self.entries.get(file_name) or {'file_name': file_name, 'attempts': 0})
+            entry.update(fields)
+            entry['updated_at'] = now
+            self.entries[file_name] = entry
+            lines.append(json.dumps(entry, default=str))
+        if not lines:
+            return
+        with open(self.path, 'a') as f:
+            f.write("\n".join(lines) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def counts(self):
+        counts = {PENDING: 0, PROCESSING: 0, DONE: 0, FAILED: 0}
+        for entry in self.entries.values():
+            counts[entry['status']] = counts.get(entry['status'], 0) + 1
+        return counts
+
+    def _load(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if not os.path.exists(self.path):
+            return
+
+        line_count = 0
+        with open(self.path) as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                line_count += 1
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A torn final line from a crash mid-write
+                    logging.warning(f"Skipping unreadable manifest line in {self.path}")
+                    continue
+                self.entries[entry['file_name']] = entry
+
+        # Keep the log proportional to the number of files
+        if line_count > 2 * len(self.entries):
+            self._compact()
+
+    def _compact(self):
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, 'w') as f:
+            for entry in self.entries.values():
+                f.write(json.dumps(entry, default=str) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
+
+
+class IngestionJob:
+    """Runs an IngestionPipeline over many files with checkpoints, resume and retries"""
+
+    def __init__(self, pipeline, manifest_path, checkpoint_every=25, max_attempts=3,
+                 backoff_seconds=5.0, on_progress=None):
+        self.pipeline = pipeline
+        self.manifest = JobManifest(manifest_path)
+        self.checkpoint_every = max(1, checkpoint_every)
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.on_progress = on_progress
+        self._uncommitted = []
+        self._started = None
+        self._completed = 0
+        self._total = 0
+
+    def run(self, file_names, retry_failed=False):
+        """Process every file not yet done; returns the manifest status counts"""
+        file_names = list(dict.fromkeys(file_names))
+        if retry_failed:
+            # Give files that used up their attempts in earlier runs a fresh budget
+            self.manifest.update_many([
+                (name, {'attempts': 0}) for name in file_names if self.manifest.status(name) == FAILED
+            ])
+
+        todo = [name for name in file_names if self._should_process(name)]
+        skipped = len(file_names) - len(todo)
+        if skipped:
+            logging.info(f"Resuming job: {skipped} of {len(file_names)} file(s) already done or out of attempts")
+
+        self._started = time.monotonic()
+        self._completed = 0
+        self._total = len(todo)
+
+        failed = self._run_pass(todo)
+        for retry in range(1, self.max_attempts):
+            failed = [name for name in failed if self.manifest.get(name)['attempts'] < self.max_attempts]
+            if not failed:
+                break
+            delay = self.backoff_seconds * (2 ** (retry - 1))
+            delay += random.uniform(0, delay / 2)
+            logging.warning(f"Retrying {len(failed)} failed file(s) in {delay:.1f}s (retry {retry}/{self.max_attempts - 1})")
+            time.sleep(delay)
+            self._total += len(failed)
+            failed = self._run_pass(failed)
+
+        return self.manifest.counts()
+
+    def progress(self):
+        """Throughput and ETA for the current run"""
+        elapsed = time.monotonic() - self._started if self._started else 0.0
+        rate = self._completed / elapsed if elapsed > 0 else 0.0
+        remaining = self._total - self._completed
+        return {
+            'completed': self._completed,
+            'total': self._total,
+            'elapsed_seconds': elapsed,
+            'files_per_second': rate,
+            'eta_seconds': remaining / rate if rate > 0 else None
+        }
+
+    def _should_process(self, file_name):
+        entry = self.manifest.get(file_name)
+        if entry is None:
+            return True
+        if entry['status'] == DONE:
+            return False
+        if entry['status'] == FAILED:
+            return entry.get('attempts', 0) < self.max_attempts
+        # pending, or processing when a previous run died mid-file
+        return True
+
+    def _run_pass(self, file_names):
+        failed = []
+        try:
+            for file_name in file_names:
+                if not self._process_one(file_name):
+                    failed.append(file_name)
+        finally:
+            self.checkpoint()
+        return failed
+
+    def _process_one(self, file_name):
+        entry = self.manifest.get(file_name) or {}
+        # Reuse the ID from an interrupted attempt so its partial output is overwritten
+        e_file_id = entry.get('e_file_id') or str(uuid.uuid4())
+        attempts = entry.get('attempts', 0) + 1
+        self.manifest.update(file_name, status=PROCESSING, e_file_id=e_file_id, attempts=attempts)
+
+        started = time.monotonic()
+        outcome = self.pipeline.process(file_name, e_file_id=e_file_id, batch=True)
+        duration = round(time.monotonic() - started, 3)
+        self._completed += 1
+
+        if outcome['status'] == 'processed':
+            metrics.inc('ingestion_job_files_total', status=DONE)
+            # Committed as done at the next checkpoint, once its buffered writes are flushed
+            self._uncommitted.append((file_name, {'status': DONE, 'error': None, 'duration_seconds': duration}))
+            if len(self._uncommitted) >= self.checkpoint_every:
+                self.checkpoint()
+        else:
+            metrics.inc('ingestion_job_files_total', status=FAILED)
+            self.manifest.update(file_name, status=FAILED, error=outcome['error'] or outcome['status'],
+                                 duration_seconds=duration)
+
+        if self.on_progress:
+            self.on_progress(file_name, outcome, self.progress())
+        return outcome['status'] == 'processed'
+
+    def checkpoint(self):
+        """Flush buffered writes, then mark the files behind them as done"""
+        if not self._uncommitted:
+            return
+        with metrics.timer('ingestion_job_checkpoint_seconds'):
+            self.pipeline.flush()
+            self.manifest.update_many(self._uncommitted)
+        self._uncommitted = []
+
+
+def format_duration(seconds):
+    """Render seconds as e.g. 1h02m, 4m05s or 12s"""
+    if seconds is None:
+        return "?"
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{(seconds % 3600) // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds}s"
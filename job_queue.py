@@ -0,0 +1,327 @@
+"""
+Background ingestion queue.
+
+Front-ends submit jobs (a list of PDF file names) to a SQLite-backed queue
+and poll their progress; worker threads claim queued jobs and run each file
+through an IngestionPipeline, recording per-file results as they go. The
+queue database can be shared by several processes (Streamlit sessions,
+`cli_chatbot.py --worker`), and a job whose worker stopped sending heartbeats
+is put back in the queue and continues after the files it already finished.
+Each file's e_file_id is stored in the job before the file is processed, so
+a file interrupted mid-way is re-processed under the same id and overwrites
+its partial record instead of adding a second one.
+"""
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from metrics import metrics
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ingestion_jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    files TEXT NOT NULL,
+    results TEXT NOT NULL DEFAULT '[]',
+    e_file_ids TEXT NOT NULL DEFAULT '{}',
+    total INTEGER NOT NULL,
+    completed INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    current_file TEXT,
+    submitted_by TEXT,
+    worker TEXT,
+    error TEXT,
+    created_at TEXT NOT NULL,
+    started_at TEXT,
+    finished_at TEXT,
+    heartbeat_at REAL
+);
+CREATE INDEX IF NOT EXISTS IX_IngestionJobs_Status_Created ON ingestion_jobs (status, created_at);
+"""
+
+
+class JobLostError(Exception):
+    """Raised when a job was requeued and taken over by another worker while this one ran it"""
+
+
+class JobQueue:
+    """SQLite-backed ingestion job queue with a pool of worker threads"""
+
+    def __init__(self, path, pipeline=None, workers=2, stale_seconds=60.0, poll_interval=1.0, on_finished=None):
+        self.path = path
+        self.pipeline = pipeline
+        self.workers = workers
+        self.stale_seconds = stale_seconds
+        self.poll_interval = poll_interval
+        # Called with the job id after one of this process's workers finishes a job
+        self.on_finished = on_finished
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}"
+        self._local = threading.local()
+        self._stop = threading.Event()
+        self._wakeup = threading.Event()
+        self._threads = []
+        # job id -> worker string the job was claimed under
+        self._running = {}
+        self._running_lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection().executescript(SCHEMA)
+        self._migrate()
+
+    def _migrate(self):
+        # Queues created before e_file_ids was tracked
+        columns = {row['name'] for row in self._connection().execute("PRAGMA table_info(ingestion_jobs)")}
+        if 'e_file_ids' not in columns:
+            self._connection().execute("ALTER TABLE ingestion_jobs ADD COLUMN e_file_ids TEXT NOT NULL DEFAULT '{}'")
+
+    def _connection(self):
+        # sqlite3 connections are per thread
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA busy_timeout=30000")
+            self._local.connection = connection
+        return connection
+
+    # Producer side
+
+    def submit(self, files, submitted_by=None):
+        """Queue a job for the given file names; returns the job id"""
+        files = list(dict.fromkeys(files))
+        job_id = str(uuid.uuid4())
+        self._connection().execute(
+            "INSERT INTO ingestion_jobs (id, status, files, total, submitted_by, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (job_id, QUEUED, json.dumps(files), len(files), submitted_by, datetime.now().isoformat())
+        )
+        metrics.inc('job_queue_jobs_total', status='submitted')
+        self._wakeup.set()
+        return job_id
+
+    def get(self, job_id):
+        """Return one job as a dict, or None"""
+        row = self._connection().execute("SELECT * FROM ingestion_jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._job_dict(row) if row else None
+
+    def list_jobs(self, limit=20, submitted_by=None):
+        """Most recent jobs first, optionally only those of one submitter"""
+        if submitted_by:
+            rows = self._connection().execute(
+                "SELECT * FROM ingestion_jobs WHERE submitted_by = ? ORDER BY created_at DESC LIMIT ?",
+                (submitted_by, limit)
+            ).fetchall()
+        else:
+            rows = self._connection().execute(
+                "SELECT * FROM ingestion_jobs ORDER BY created_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [self._job_dict(row) for row in rows]
+
+    def pending_count(self):
+        return self._connection().execute(
+            "SELECT COUNT(*) FROM ingestion_jobs WHERE status IN (?, ?)", (QUEUED, RUNNING)
+        ).fetchone()[0]
+
+    def _job_dict(self, row):
+        job = dict(row)
+        job['files'] = json.loads(job['files'])
+        job['results'] = json.loads(job['results'])
+        job['e_file_ids'] = json.loads(job['e_file_ids'])
+        job['progress'] = job['completed'] / job['total'] if job['total'] else 1.0
+        return job
+
+    # Worker side
+
+    def start(self):
+        """Start the worker threads (no-op without a pipeline or with workers=0)"""
+        if self._threads or not self.pipeline or self.workers <= 0:
+            return
+        self._stop.clear()
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f'ingestion-worker-{index}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        # Keeps long-running files from looking abandoned to other processes
+        thread = threading.Thread(target=self._heartbeat, name='ingestion-heartbeat', daemon=True)
+        thread.start()
+        self._threads.append(thread)
+        logging.info(f"Started {self.workers} ingestion worker(s) on {self.path}")
+
+    def stop(self, timeout=None):
+        """Stop the workers after their current file"""
+        self._stop.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def run_forever(self):
+        """Run the workers in the foreground until interrupted"""
+        self.start()
+        try:
+            while not self._stop.is_set():
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def _work(self):
+        while not self._stop.is_set():
+            try:
+                job = self._claim()
+            except sqlite3.Error as e:
+                logging.error(f"Error claiming ingestion job: {str(e)}")
+                job = None
+            if job is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+            with self._running_lock:
+                self._running[job['id']] = job['worker']
+            try:
+                self._run(job)
+            except JobLostError:
+                # The new owner carries on; our results would overwrite its progress
+                metrics.inc('job_queue_jobs_total', status='lost')
+                logging.warning(f"Job {job['id']} was taken over by another worker; stopping")
+            except Exception as e:
+                logging.error(f"Error running ingestion job {job['id']}: {str(e)}")
+                try:
+                    self._update_owned(job, status=FAILED, error=str(e), finished_at=datetime.now().isoformat())
+                except JobLostError:
+                    pass
+            finally:
+                with self._running_lock:
+                    self._running.pop(job['id'], None)
+
+    def _heartbeat(self):
+        while not self._stop.wait(max(1.0, self.stale_seconds / 3)):
+            with self._running_lock:
+                running = list(self._running.items())
+            for job_id, worker in running:
+                try:
+                    # Only while we still own it; a lost job is noticed at its next update
+                    self._connection().execute(
+                        "UPDATE ingestion_jobs SET heartbeat_at = ? WHERE id = ? AND worker = ?", (time.time(), job_id, worker)
+                    )
+                except sqlite3.Error as e:
+                    logging.warning(f"Could not record heartbeat for job {job_id}: {str(e)}")
+
+    def _claim(self):
+        """Atomically move the oldest queued (or abandoned) job to running"""
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            # Jobs whose worker stopped heart-beating go back to the queue
+            connection.execute(
+                "UPDATE ingestion_jobs SET status = ?, worker = NULL WHERE status = ? AND heartbeat_at < ?",
+                (QUEUED, RUNNING, time.time() - self.stale_seconds)
+            )
+            row = connection.execute(
+                "SELECT * FROM ingestion_jobs WHERE status = ? ORDER BY created_at LIMIT 1", (QUEUED,)
+            ).fetchone()
+            if row is None:
+                connection.execute("COMMIT")
+                return None
+            # Unique per claim, so a requeued job's previous run can tell it no longer owns the job
+            worker = f"{self.worker_id}/{threading.current_thread().name}/{uuid.uuid4().hex[:8]}"
+            connection.execute(
+                "UPDATE ingestion_jobs SET status = ?, worker = ?, started_at = COALESCE(started_at, ?), heartbeat_at = ? WHERE id = ?",
+                (RUNNING, worker, datetime.now().isoformat(), time.time(), row['id'])
+            )
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        job = self._job_dict(row)
+        job['worker'] = worker
+        return job
+
+    def _run(self, job):
+        results = job['results']
+        finished = {result['file_name'] for result in results}
+        if finished:
+            logging.info(f"Resuming job {job['id']} after {len(finished)} finished file(s)")
+
+        for file_name in job['files']:
+            if file_name in finished:
+                continue
+            if self._stop.is_set():
+                # Hand the rest back to the queue for the next worker
+                self._update_owned(job, status=QUEUED, worker=None, current_file=None)
+                return
+            # Record the id first: a retry after a crash reuses it and overwrites the same record
+            e_file_ids = job['e_file_ids']
+            if file_name not in e_file_ids:
+                e_file_ids[file_name] = str(uuid.uuid4())
+            self._update_owned(job, current_file=file_name, e_file_ids=json.dumps(e_file_ids))
+
+            with metrics.timer('job_queue_file_seconds'):
+                outcome = self.pipeline.process(file_name, e_file_id=e_file_ids[file_name])
+            results.append({
+                'file_name': file_name,
+                'status': outcome['status'],
+                'e_file_id': outcome['e_file_id'] if outcome['status'] == 'processed' else None,
+                'error': outcome['error']
+            })
+            self._update_owned(
+                job,
+                results=json.dumps(results),
+                completed=len(results),
+                failed=sum(1 for result in results if result['status'] != 'processed')
+            )
+
+        # Buffered index records and SQL rows must land before the job reports DONE
+        try:
+            self.pipeline.flush()
+        except Exception as e:
+            logging.error(f"Error flushing job {job['id']}: {str(e)}")
+        index_writer = self.pipeline.adls_handler.index_writer
+        if index_writer is not None and index_writer.pending:
+            # Journaled; the writer's timer retries the merge
+            logging.warning(f"{index_writer.pending} index record(s) from job {job['id']} not yet in the search index")
+
+        failed = sum(1 for result in results if result['status'] != 'processed')
+        status = FAILED if failed and failed == len(results) else DONE
+        self._update_owned(job, status=status, current_file=None, finished_at=datetime.now().isoformat(),
+                     error=f"{failed} of {len(results)} file(s) failed" if failed else None)
+        metrics.inc('job_queue_jobs_total', status=status)
+        if self.on_finished:
+            try:
+                self.on_finished(job['id'])
+            except Exception as e:
+                logging.error(f"Job finished callback failed for {job['id']}: {str(e)}")
+
+    def _update_owned(self, job, **fields):
+        """Update a job this worker claimed; raises JobLostError if another worker has taken it over"""
+        assignments = ", ".join(f"{column} = ?" for column in fields)
+        cursor = self._connection().execute(
+            f"UPDATE ingestion_jobs SET {assignments} WHERE id = ? AND worker = ?", (*fields.values(), job['id'], job['worker'])
+        )
+        if cursor.rowcount == 0:
+            raise JobLostError(job['id'])
+
+
+def create_job_queue(config, pipeline=None, on_finished=None):
+    """Build the queue at JOB_QUEUE_PATH with JOB_QUEUE_WORKERS workers"""
+    return JobQueue(
+        config.JOB_QUEUE_PATH,
+        pipeline,
+        workers=config.JOB_QUEUE_WORKERS,
+        stale_seconds=config.JOB_QUEUE_STALE_SECONDS,
+        on_finished=on_finished
+    )
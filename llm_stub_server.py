@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Local OpenAI-compatible stand-in for benchmarking and load testing QueryEngine.
+
+Serves POST /v1/chat/completions and answers with deterministic intents, so
+QueryEngine can run end to end without calling OpenAI. Point the client at it
+with OPENAI_BASE_URL="http://127.0.0.1:8765/v1".
+"""
+import argparse
+import json
+import logging
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+EMAIL_PATTERN = re.compile(r'[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}')
+
+# Ordered (query_type, regex) rules; the first match wins
+INTENT_RULES = [
+    ('search_by_email', re.compile(r'\bemail\b')),
+    ('search_by_name', re.compile(r'\b(?:find|who is|search for)\s+([a-z][a-z\s]*?)(?:\s+(?:person|people|individual))?\s*\??$')),
+    ('count_people', re.compile(r'\b(people|persons|individuals|employees|users)\b')),
+    ('files_by_type', re.compile(r'\b(kind|type|types)\b')),
+    ('recent_files', re.compile(r'\b(recent|latest|today|yesterday|this week|last week)\b')),
+    ('confidence_stats', re.compile(r'\b(confidence|accuracy|quality)\b')),
+    ('count_files', re.compile(r'\b(files|pdfs|documents)\b')),
+    ('summary_stats', re.compile(r'\b(summary|statistics|stats|overview)\b')),
+]
+
+
+def classify_query(user_query):
+    """Map a user query to a deterministic (query_type, parameters) pair"""
+    query = user_query.lower().strip()
+
+    for query_type, pattern in INTENT_RULES:
+        match = pattern.search(query)
+        if not match:
+            continue
+
+        if query_type == 'search_by_email':
+            email_match = EMAIL_PATTERN.search(query)
+            if not email_match:
+                continue
+            return query_type, {'email': email_match.group()}
+
+        if query_type == 'search_by_name':
+            return query_type, {'name': match.group(1).strip()}
+
+        return query_type, {}
+
+    return 'unknown', {}
+
+
+class StubSettings:
+    """Latency and failure behaviour of the stub endpoint"""
+
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0,
+                 error_status=500, seed=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def next_delay(self):
+        """Return the delay in seconds for the next request"""
+        with self._lock:
+            jitter = self._random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0
+        return max(0.0, self.latency_ms + jitter) / 1000.0
+
+    def should_fail(self):
+        """Decide whether the next request returns an injected error"""
+        if not self.error_rate:
+            return False
+        with self._lock:
+            return self._random.random() < self.error_rate
+
+
+class _StubRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; avoid Nagle/delayed-ACK stalls
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        logging.debug("llm-stub: " + format, *args)
+
+    def do_GET(self):
+        if self.path.rstrip('/').endswith('/models'):
+            self._send_json(200, {
+                'object': 'list',
+                'data': [{'id': self.server.model_name, 'object': 'model', 'owned_by': 'stub'}]
+            })
+        else:
+            self._send_json(404, {'error': {'message': 'Not found', 'type': 'invalid_request_error'}})
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self._send_json(404, {'error': {'message': 'Not found', 'type': 'invalid_request_error'}})
+            return
+
+        settings = self.server.settings
+        delay = settings.next_delay()
+        if delay:
+            time.sleep(delay)
+
+        if settings.should_fail():
+            self._send_json(settings.error_status, {
+                'error': {'message': 'Injected failure from llm_stub_server', 'type': 'server_error'}
+            })
+            return
+
+        try:
+            payload = json.loads(body.decode('utf-8') or '{}')
+        except ValueError:
+            self._send_json(400, {'error': {'message': 'Invalid JSON body', 'type': 'invalid_request_error'}})
+            return
+
+        self._send_json(200, self._build_completion(payload))
+
+    def _build_completion(self, payload):
+        messages = payload.get('messages') or []
+        system_prompt = next((m.get('content', '') for m in messages if m.get('role') == 'system'), '')
+        user_message = next((m.get('content', '') for m in reversed(messages) if m.get('role') == 'user'), '')
+
+        if 'Respond in JSON format' in system_prompt:
+            query_type, parameters = classify_query(user_message)
+            content = json.dumps({
+                'query_type': query_type,
+                'parameters': parameters,
+                'response': f"Stub answer for {query_type}.",
+                'confidence': 0.9 if query_type != 'unknown' else 0.1
+            })
+        else:
+            content = "I can help with file counts, people counts, searches by name or email, and statistics."
+
+        return {
+            'id': f"chatcmpl-stub-{uuid.uuid4().hex[:12]}",
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': payload.get('model') or self.server.model_name,
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': content},
+                'finish_reason': 'stop'
+            }],
+            'usage': {
+                'prompt_tokens': sum(len(str(m.get('content', '')).split()) for m in messages),
+                'completion_tokens': len(content.split()),
+                'total_tokens': 0
+            }
+        }
+
+    def _send_json(self, status, data):
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class LLMStubServer:
+    """Threaded OpenAI-compatible stub server that can run in the background"""
+
+    def __init__(self, host='127.0.0.1', port=0, settings=None, model_name='stub-model'):
+        self.settings = settings or StubSettings()
+        self.httpd = ThreadingHTTPServer((host, port), _StubRequestHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.settings = self.settings
+        self.httpd.model_name = model_name
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        """Serve requests on a daemon thread"""
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving and release the socket"""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible stub for QueryEngine")
+    parser.add_argument('--host', default='127.0.0.1', help='Interface to bind')
+    parser.add_argument('--port', type=int, default=8765, help='Port to listen on')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='Base response latency')
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help='Uniform +/- jitter added to the latency')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests that fail (0-1)')
+    parser.add_argument('--error-status', type=int, default=500, help='HTTP status used for injected failures')
+    parser.add_argument('--seed', type=int, default=None, help='Random seed for reproducible jitter/errors')
+
+    args = parser.parse_args()
+
+    settings = StubSettings(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        seed=args.seed
+    )
+    server = LLMStubServer(args.host, args.port, settings)
+    print(f"🧪 LLM stub listening on {server.base_url}")
+    print(f"   Set OPENAI_BASE_URL=\"{server.base_url}\" to route QueryEngine here")
+
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+"""
+Lightweight pipeline instrumentation: counters, gauges and timing histograms.
+
+Metrics are off unless METRICS_ENABLED is set; while disabled every call
+returns immediately and timer() hands back a shared no-op context manager.
+When enabled, metrics can be scraped from a Prometheus text endpoint
+(METRICS_PORT) and/or dumped as JSON (METRICS_FILE, written at exit).
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+
+from dotenv import load_dotenv
+
+METRIC_PREFIX = "pdf_chatbot_"
+
+# Upper bounds in seconds; covers fast regex work up to slow analyzer polls
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def _label_key(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(label_key, extra=None):
+    pairs = list(label_key) + (list(extra) if extra else [])
+    if not pairs:
+        return ''
+    body = ','.join('{}="{}"'.format(key, value.replace('\\', '\\\\').replace('"', '\\"')) for key, value in pairs)
+    return '{' + body + '}'
+
+
+class Histogram:
+    """Cumulative-bucket histogram with sum and count"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.bucket_counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.bucket_counts[i] += 1
+                break
+
+    def cumulative(self):
+        running = 0
+        for bound, count in zip(self.buckets, self.bucket_counts):
+            running += count
+            yield bound, running
+
+
+class _NullTimer:
+    """No-op context manager returned while metrics are disabled"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    def __init__(self, registry, name, labels):
+        self._registry = registry
+        self._name = name
+        self._labels = labels
+        self._start = None
+        self.elapsed = None
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.elapsed = time.perf_counter() - self._start
+        self._registry.observe(self._name, self.elapsed, **self._labels)
+        if exc_type is not None:
+            self._registry.inc(self._name.replace('_seconds', '') + '_exceptions_total', **self._labels)
+        return False
+
+
+class MetricsRegistry:
+    """Thread-safe store of counters, gauges and histograms"""
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+        self._http_server = None
+
+    def inc(self, name, amount=1, **labels):
+        """Increment a counter"""
+        if not self.enabled:
+            return
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def set_gauge(self, name, value, **labels):
+        """Set a gauge to an absolute value"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._gauges[(name, _label_key(labels))] = value
+
+    def observe(self, name, value, **labels):
+        """Record one histogram observation"""
+        if not self.enabled:
+            return
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def timer(self, name, **labels):
+        """Context manager that records its duration (seconds) into a histogram"""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name, labels)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+
+    def snapshot(self):
+        """Return all metrics as a JSON-serializable dict"""
+        with self._lock:
+            counters = [
+                {'name': name, 'labels': dict(labels), 'value': value}
+                for (name, labels), value in sorted(self._counters.items())
+            ]
+            gauges = [
+                {'name': name, 'labels': dict(labels), 'value': value}
+                for (name, labels), value in sorted(self._gauges.items())
+            ]
+            histograms = [
+                {
+                    'name': name,
+                    'labels': dict(labels),
+                    'count': histogram.count,
+                    'sum': round(histogram.sum, 6),
+                    'mean': round(histogram.sum / histogram.count, 6) if histogram.count else 0.0,
+                    'max': round(histogram.max, 6),
+                    'buckets': {str(bound): count for bound, count in histogram.cumulative()}
+                }
+                for (name, labels), histogram in sorted(self._histograms.items())
+            ]
+        return {
+            'timestamp': datetime.now().isoformat(),
+            'pid': os.getpid(),
+            'counters': counters,
+            'gauges': gauges,
+            'histograms': histograms
+        }
+
+    def render_prometheus(self):
+        """Render all metrics in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            for kind, store in (('counter', self._counters), ('gauge', self._gauges)):
+                seen = set()
+                for (name, labels), value in sorted(store.items()):
+                    full_name = METRIC_PREFIX + name
+                    if full_name not in seen:
+                        lines.append(f"# TYPE {full_name} {kind}")
+                        seen.add(full_name)
+                    lines.append(f"{full_name}{_format_labels(labels)} {value}")
+
+            seen = set()
+            for (name, labels), histogram in sorted(self._histograms.items()):
+                full_name = METRIC_PREFIX + name
+                if full_name not in seen:
+                    lines.append(f"# TYPE {full_name} histogram")
+                    seen.add(full_name)
+                for bound, count in histogram.cumulative():
+                    lines.append(f"{full_name}_bucket{_format_labels(labels, [('le', str(bound))])} {count}")
+                lines.append(f"{full_name}_bucket{_format_labels(labels, [('le', '+Inf')])} {histogram.count}")
+                lines.append(f"{full_name}_sum{_format_labels(labels)} {histogram.sum}")
+                lines.append(f"{full_name}_count{_format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def write_json(self, path):
+        """Write a snapshot to a JSON file"""
+        try:
+            with open(path, 'w') as f:
+                json.dump(self.snapshot(), f, indent=2)
+            logging.info(f"Metrics written to {path}")
+            return True
+        except Exception as e:
+            logging.error(f"Error writing metrics to {path}: {str(e)}")
+            return False
+
+    def start_http_server(self, port, host='0.0.0.0'):
+        """Serve /metrics in Prometheus format from a daemon thread"""
+        if self._http_server:
+            return self._http_server
+        # Only imported when serving; it pulls in http.client, ssl and email
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        registry = self
+
+        class _MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/metrics', '/'):
+                    self.send_error(404)
+                    return
+                body = registry.render_prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._http_server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        self._http_server.daemon_threads = True
+        threading.Thread(target=self._http_server.serve_forever, daemon=True).start()
+        logging.info(f"Metrics endpoint listening on http://{host}:{port}/metrics")
+        return self._http_server
+
+
+# Read before Config is imported (adls_handler imports this module first), so load .env here too
+load_dotenv()
+
+
+def _env_flag(name):
+    return os.getenv(name, '').strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+# Process-wide registry used by the handlers and front ends
+metrics = MetricsRegistry(enabled=_env_flag('METRICS_ENABLED'))
+_json_exports = set()
+
+
+def configure(enabled=True, json_path=None, port=None):
+    """Enable metrics at runtime and set up exporters (used by CLI flags)"""
+    metrics.enabled = enabled
+    if not enabled:
+        return metrics
+    if port:
+        try:
+            metrics.start_http_server(int(port))
+        except OSError as e:
+            logging.error(f"Could not start metrics endpoint on port {port}: {str(e)}")
+    if json_path and json_path not in _json_exports:
+        _json_exports.add(json_path)
+        atexit.register(metrics.write_json, json_path)
+    return metrics
+
+
+if metrics.enabled:
+    configure(True, os.getenv('METRICS_FILE'), os.getenv('METRICS_PORT'))
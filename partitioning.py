@@ -0,0 +1,343 @@
+"""
+Partitioned ingestion across several hosts sharing one `pdfs/` directory.
+
+Each node registers itself under metadata/nodes/ and refreshes that entry
+while it runs. Files are assigned to the live nodes with a consistent-hash
+ring, so every node works on its own share of the backlog and, when a node
+stops heart-beating, only its share moves to the survivors.
+
+Assignment alone can overlap while nodes join or leave, so a node must also
+hold a lease on a file before processing it. Leases live in
+metadata/claims/<file>.lease and are taken with create-if-absent or, for an
+expired lease, an If-Match write, so exactly one node wins. The holder renews
+its leases in the background; a finished file gets a <file>.done marker and
+a file that failed `max_attempts` times a <file>.failed marker. Failed
+attempts release the lease after a backoff, so any node may retry. The
+lease also carries the file's e_file_id, so a file taken over from a dead
+node is re-processed under the same ID and overwrites any partial result.
+"""
+import bisect
+import hashlib
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime
+from urllib.parse import quote, unquote
+
+from metrics import metrics
+from storage_backends import MatchConditions, ResourceExistsError, ResourceModifiedError, ResourceNotFoundError
+
+LEASE_SUFFIX = '.lease'
+DONE_SUFFIX = '.done'
+FAILED_SUFFIX = '.failed'
+
+
+def _hash(value):
+    return int(hashlib.md5(value.encode('utf-8')).hexdigest()[:16], 16)
+
+
+class HashRing:
+    """Consistent-hash ring mapping keys to nodes (with virtual nodes for balance)"""
+
+    def __init__(self, nodes, replicas=64):
+        self.nodes = sorted(set(nodes))
+        self._ring = sorted((_hash(f"{node}#{index}"), node) for node in self.nodes for index in range(replicas))
+        self._keys = [point for point, _ in self._ring]
+
+    def owner(self, key):
+        if not self._ring:
+            return None
+        index = bisect.bisect(self._keys, _hash(key)) % len(self._ring)
+        return self._ring[index][1]
+
+
+class ClaimStore:
+    """Lease-based claims on files, stored next to the data in ADLS"""
+
+    def __init__(self, adls_handler, node_id, lease_seconds=120.0, max_attempts=3, backoff_seconds=5.0):
+        self.adls_handler = adls_handler
+        self.node_id = node_id
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.claims_directory = f"{adls_handler.config.METADATA_DIRECTORY}/claims"
+        self.nodes_directory = f"{adls_handler.config.METADATA_DIRECTORY}/nodes"
+
+    @property
+    def filesystem_client(self):
+        return self.adls_handler.filesystem_client
+
+    def _path(self, file_name, suffix):
+        return f"{self.claims_directory}/{quote(file_name, safe='')}{suffix}"
+
+    def _read(self, path):
+        """Return (data, etag) for a JSON blob, or (None, None) if it does not exist"""
+        file_client = self.filesystem_client.get_file_client(path)
+        try:
+            download = file_client.download_file()
+            content = download.readall()
+        except ResourceNotFoundError:
+            return None, None
+        etag = getattr(getattr(download, 'properties', None), 'etag', None)
+        return json.loads(content), etag
+
+    def _exists(self, path):
+        try:
+            self.filesystem_client.get_file_client(path).get_file_properties()
+            return True
+        except ResourceNotFoundError:
+            return False
+
+    def _list(self, directory):
+        try:
+            return [path.name.split('/')[-1] for path in
+                    self.filesystem_client.get_directory_client(directory).get_paths() if not path.is_directory]
+        except ResourceNotFoundError:
+            return []
+
+    # Node membership
+
+    def heartbeat(self):
+        """Record this node as alive"""
+        entry = {'node_id': self.node_id, 'host': socket.gethostname(), 'heartbeat_at': time.time()}
+        self.filesystem_client.get_file_client(f"{self.nodes_directory}/{quote(self.node_id, safe='')}.json").upload_data(
+            json.dumps(entry), overwrite=True
+        )
+
+    def leave(self):
+        """Remove this node from the membership so its share moves immediately"""
+        try:
+            self.filesystem_client.get_file_client(f"{self.nodes_directory}/{quote(self.node_id, safe='')}.json").delete_file()
+        except ResourceNotFoundError:
+            pass
+
+    def live_nodes(self):
+        """Node ids with a heartbeat within the lease period"""
+        cutoff = time.time() - self.lease_seconds
+        nodes = []
+        for name in self._list(self.nodes_directory):
+            entry, _ = self._read(f"{self.nodes_directory}/{name}")
+            if entry and entry.get('heartbeat_at', 0) >= cutoff:
+                nodes.append(entry['node_id'])
+        return nodes
+
+    # Claims
+
+    def settled(self):
+        """Names of files that are done or out of attempts, from one listing of the claims"""
+        settled = set()
+        for name in self._list(self.claims_directory):
+            for suffix in (DONE_SUFFIX, FAILED_SUFFIX):
+                if name.endswith(suffix):
+                    settled.add(unquote(name[:-len(suffix)]))
+        return settled
+
+    def try_claim(self, file_name):
+        """Take the lease on a file; returns the claim, or None if another node holds it"""
+        path = self._path(file_name, LEASE_SUFFIX)
+        current, etag = self._read(path)
+        now = time.time()
+
+        if current is not None and current['expires_at'] > now:
+            # Held by another node, or a failed attempt still backing off
+            if current['holder'] != self.node_id or current.get('status') == 'failed':
+                return None
+
+        claim = {
+            'file_name': file_name,
+            'holder': self.node_id,
+            'status': 'processing',
+            # Keep the ID across takeovers so re-processing overwrites instead of duplicating
+            'e_file_id': current['e_file_id'] if current else str(uuid.uuid4()),
+            'attempts': (current.get('attempts', 0) if current else 0) + 1,
+            'claimed_at': datetime.now().isoformat(),
+            'expires_at': now + self.lease_seconds
+        }
+        file_client = self.filesystem_client.get_file_client(path)
+        try:
+            if current is None:
+                response = file_client.upload_data(json.dumps(claim), overwrite=False)
+            else:
+                response = file_client.upload_data(json.dumps(claim), overwrite=True, etag=etag,
+                                                   match_condition=MatchConditions.IfNotModified)
+        except (ResourceExistsError, ResourceModifiedError):
+            # Another node claimed it between our read and write
+            metrics.inc('partition_claims_total', outcome='lost')
+            return None
+
+        claim['etag'] = response.get('etag') if isinstance(response, dict) else None
+
+        # The file may have been finished (marker written, lease dropped) since it was listed;
+        # complete() writes the marker before releasing, so checking after the claim is race-free
+        if self._exists(self._path(file_name, DONE_SUFFIX)) or self._exists(self._path(file_name, FAILED_SUFFIX)):
+            self._release(claim)
+            metrics.inc('partition_claims_total', outcome='already_settled')
+            return None
+
+        metrics.inc('partition_claims_total', outcome='takeover' if current else 'new')
+        return claim
+
+    def renew(self, claim):
+        """Extend a held lease; returns the renewed claim, or None if it was lost to another node"""
+        claim = dict(claim)
+        etag = claim.pop('etag', None)
+        claim['expires_at'] = time.time() + self.lease_seconds
+        try:
+            response = self.filesystem_client.get_file_client(self._path(claim['file_name'], LEASE_SUFFIX)).upload_data(
+                json.dumps(claim), overwrite=True, etag=etag, match_condition=MatchConditions.IfNotModified
+            )
+        except (ResourceModifiedError, ResourceNotFoundError):
+            return None
+        claim['etag'] = response.get('etag') if isinstance(response, dict) else None
+        return claim
+
+    def complete(self, claim):
+        """Mark a file done and drop its lease"""
+        marker = {'file_name': claim['file_name'], 'e_file_id': claim['e_file_id'], 'node_id': self.node_id,
+                  'completed_at': datetime.now().isoformat()}
+        self.filesystem_client.get_file_client(self._path(claim['file_name'], DONE_SUFFIX)).upload_data(
+            json.dumps(marker), overwrite=True
+        )
+        self._release(claim)
+
+    def fail(self, claim, error):
+        """Record a failed attempt; the lease is released after a backoff so any node may retry"""
+        if claim['attempts'] >= self.max_attempts:
+            marker = dict(claim, error=error, node_id=self.node_id, failed_at=datetime.now().isoformat())
+            marker.pop('etag', None)
+            self.filesystem_client.get_file_client(self._path(claim['file_name'], FAILED_SUFFIX)).upload_data(
+                json.dumps(marker), overwrite=True
+            )
+            self._release(claim)
+            return
+
+        backoff = self.backoff_seconds * (2 ** (claim['attempts'] - 1))
+        failed = dict(claim, status='failed', error=error, expires_at=time.time() + backoff)
+        failed.pop('etag', None)
+        try:
+            self.filesystem_client.get_file_client(self._path(claim['file_name'], LEASE_SUFFIX)).upload_data(
+                json.dumps(failed), overwrite=True, etag=claim.get('etag'), match_condition=MatchConditions.IfNotModified
+            )
+        except (ResourceModifiedError, ResourceNotFoundError):
+            logging.warning(f"Lease on {claim['file_name']} was lost before recording the failure")
+
+    def _release(self, claim):
+        # Conditional, so a lease another node has taken over is left alone
+        try:
+            self.filesystem_client.get_file_client(self._path(claim['file_name'], LEASE_SUFFIX)).delete_file(
+                etag=claim.get('etag'), match_condition=MatchConditions.IfNotModified
+            )
+        except (ResourceModifiedError, ResourceNotFoundError):
+            pass
+
+
+class PartitionedWorker:
+    """Processes this node's share of pdfs/ under leases; rebalances as nodes come and go"""
+
+    def __init__(self, pipeline, adls_handler, node_id=None, lease_seconds=120.0, poll_interval=30.0,
+                 max_attempts=3, backoff_seconds=5.0, on_progress=None):
+        self.pipeline = pipeline
+        self.adls_handler = adls_handler
+        self.node_id = node_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.poll_interval = poll_interval
+        self.claims = ClaimStore(adls_handler, self.node_id, lease_seconds, max_attempts, backoff_seconds)
+        self.on_progress = on_progress
+        self._held = {}
+        self._held_lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def run(self, once=False):
+        """Work until stopped (or, with once=True, until the backlog is drained)"""
+        self.claims.heartbeat()
+        renewer = threading.Thread(target=self._renew_leases, name='lease-renewer', daemon=True)
+        renewer.start()
+        processed = 0
+        try:
+            while not self._stop.is_set():
+                count, remaining = self.run_cycle()
+                processed += count
+                if once and remaining == 0:
+                    break
+                if count == 0:
+                    # Nothing we could claim: wait for new files or for leases to expire
+                    self._stop.wait(self.poll_interval)
+        finally:
+            self._stop.set()
+            renewer.join()
+            self.claims.leave()
+        return processed
+
+    def stop(self):
+        self._stop.set()
+
+    def run_cycle(self):
+        """One pass over this node's share; returns (files attempted, files not yet settled before the pass)"""
+        self.claims.heartbeat()
+        nodes = self.claims.live_nodes()
+        if self.node_id not in nodes:
+            nodes.append(self.node_id)
+        ring = HashRing(nodes)
+
+        settled = self.claims.settled()
+        outstanding = [f['name'] for f in self.adls_handler.list_pdf_files() if f['name'] not in settled]
+        mine = [name for name in outstanding if ring.owner(name) == self.node_id]
+        metrics.set_gauge('partition_owned_files', len(mine), node=self.node_id)
+
+        processed = 0
+        for file_name in mine:
+            if self._stop.is_set():
+                break
+            if self._process(file_name):
+                processed += 1
+        return processed, len(outstanding)
+
+    def _process(self, file_name):
+        claim = self.claims.try_claim(file_name)
+        if claim is None:
+            return False
+        with self._held_lock:
+            self._held[file_name] = claim
+
+        try:
+            outcome = self.pipeline.process(file_name, e_file_id=claim['e_file_id'])
+        finally:
+            # Waits for an in-flight renewal, so the claim carries the lease's current etag
+            with self._held_lock:
+                claim = self._held.pop(file_name, claim)
+
+        if outcome['status'] == 'processed':
+            self.claims.complete(claim)
+        else:
+            self.claims.fail(claim, outcome['error'] or outcome['status'])
+        metrics.inc('partition_files_total', node=self.node_id, status=outcome['status'])
+        if self.on_progress:
+            self.on_progress(file_name, outcome)
+        return True
+
+    def _renew_leases(self):
+        """Heartbeat and extend held leases well before they expire"""
+        interval = max(1.0, self.claims.lease_seconds / 3)
+        while not self._stop.wait(interval):
+            try:
+                self.claims.heartbeat()
+            except Exception as e:
+                logging.warning(f"Node heartbeat failed: {str(e)}")
+            with self._held_lock:
+                held = list(self._held)
+            for file_name in held:
+                # Held across the write so _process never finishes a claim with an etag this renewal replaces
+                with self._held_lock:
+                    claim = self._held.get(file_name)
+                    if claim is None:
+                        continue
+                    renewed = self.claims.renew(claim)
+                    if renewed is None:
+                        logging.error(f"Lost the lease on {file_name} to another node")
+                        metrics.inc('partition_claims_total', outcome='lease_lost')
+                        del self._held[file_name]
+                    else:
+                        self._held[file_name] = renewed
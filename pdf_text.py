@@ -0,0 +1,137 @@
+"""
+Local text-layer extraction for born-digital PDFs.
+
+Reads the embedded text of each page with pypdf and scores how usable it is,
+so DocumentIntelligenceHandler only sends scanned or image-only documents,
+and documents with garbled text, to the remote model. Also splits large PDFs
+into page ranges that can be analyzed in parallel.
+"""
+import io
+import logging
+import re
+
+# pypdf is optional; without it every document goes to Document Intelligence
+try:
+    from pypdf import PdfReader, PdfWriter
+    PYPDF_AVAILABLE = True
+except ImportError:
+    PYPDF_AVAILABLE = False
+
+# Glyphs pypdf emits for characters it cannot map to Unicode
+_GARBAGE_PATTERN = re.compile(r'\(cid:\d+\)|\ufffd')
+_WORD_PATTERN = re.compile(r'[A-Za-z]{2,}')
+
+
+class TextLayer:
+    """Text layer of a PDF with per-page quality measurements"""
+
+    def __init__(self, pages):
+        self.pages = pages
+
+    @property
+    def text(self):
+        return "\n".join(page for page in self.pages if page)
+
+    @property
+    def page_count(self):
+        return len(self.pages)
+
+    def page_quality(self, page_text):
+        """Score one page between 0 (no or garbled text) and 1 (clean text)"""
+        stripped = ''.join(page_text.split())
+        if not stripped:
+            return 0.0
+
+        garbage_chars = sum(len(match) for match in _GARBAGE_PATTERN.findall(page_text))
+        printable = sum(1 for char in stripped if char.isprintable())
+        alphanumeric = sum(1 for char in stripped if char.isalnum())
+        words = _WORD_PATTERN.findall(page_text)
+
+        printable_ratio = printable / len(stripped)
+        alnum_ratio = alphanumeric / len(stripped)
+        garbage_ratio = garbage_chars / len(stripped)
+        # Real text has recognizable words; broken encodings tend to produce symbol soup
+        word_ratio = min(1.0, sum(len(word) for word in words) / len(stripped) / 0.5)
+
+        score = printable_ratio * min(1.0, alnum_ratio / 0.6) * word_ratio * (1.0 - garbage_ratio)
+        return max(0.0, min(1.0, score))
+
+    def quality(self):
+        """Average quality over all pages; image-only pages count as 0"""
+        if not self.pages:
+            return 0.0
+        return sum(self.page_quality(page) for page in self.pages) / len(self.pages)
+
+    def is_usable(self, min_chars_per_page=20, min_quality=0.6):
+        """True when every page has enough clean text to skip the remote model"""
+        if not self.pages:
+            return False
+        for page in self.pages:
+            if len(''.join(page.split())) < min_chars_per_page:
+                return False
+            if self.page_quality(page) < min_quality:
+                return False
+        return True
+
+
+def _as_stream(pdf_content):
+    if isinstance(pdf_content, (bytes, bytearray, memoryview)):
+        return io.BytesIO(pdf_content)
+    return pdf_content
+
+
+def extract_text_layer(pdf_content):
+    """Read the embedded text of a PDF given as bytes or a binary stream; None if unreadable"""
+    if not PYPDF_AVAILABLE:
+        return None
+
+    stream = _as_stream(pdf_content)
+    start = stream.tell() if hasattr(stream, 'tell') else 0
+
+    try:
+        reader = PdfReader(stream)
+        if reader.is_encrypted:
+            return None
+        return TextLayer([page.extract_text() or '' for page in reader.pages])
+    except Exception as e:
+        logging.info(f"No usable PDF text layer: {str(e)}")
+        return None
+    finally:
+        # Leave the stream where we found it for the Document Intelligence fallback
+        if hasattr(stream, 'seek'):
+            stream.seek(start)
+
+
+def split_pdf(pdf_content, pages_per_range):
+    """Split a PDF into (first_page, last_page, pdf_bytes) ranges; None if it cannot or need not be split"""
+    if not PYPDF_AVAILABLE or pages_per_range <= 0:
+        return None
+
+    stream = _as_stream(pdf_content)
+    start = stream.tell() if hasattr(stream, 'tell') else 0
+
+    try:
+        reader = PdfReader(stream)
+        if reader.is_encrypted:
+            return None
+        page_count = len(reader.pages)
+        if page_count <= pages_per_range:
+            return None
+
+        ranges = []
+        for first in range(0, page_count, pages_per_range):
+            last = min(first + pages_per_range, page_count)
+            writer = PdfWriter()
+            for index in range(first, last):
+                writer.add_page(reader.pages[index])
+            buffer = io.BytesIO()
+            writer.write(buffer)
+            # Page numbers are 1-based, like the analyzer's `pages` option
+            ranges.append((first + 1, last, buffer.getvalue()))
+        return ranges
+    except Exception as e:
+        logging.warning(f"Could not split PDF into page ranges: {str(e)}")
+        return None
+    finally:
+        if hasattr(stream, 'seek'):
+            stream.seek(start)
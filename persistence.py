@@ -0,0 +1,192 @@
+"""
+Unified persistence for extracted records.
+
+PersistenceSink stores each record as the JSON document in ADLS (the raw
+copy that stays in the lake) and, in 'dual' mode, as a row in the SQL
+PersonalInformation table under the same e_file_id so search and stats can
+run off SQL indexes. The lake write goes first; SQL rows are upserted in
+batches with retry and backoff, and rows that still fail are appended to a
+JSONL outbox that replay_outbox() re-applies later. Upserts are keyed on
+e_file_id, so replaying an entry twice is harmless.
+"""
+import json
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from metrics import metrics
+
+
+class PersistenceSink:
+    """Writes extracted records to ADLS and, optionally, SQL"""
+
+    def __init__(self, adls_handler, database_handler=None, outbox_path='.outbox/persistence.jsonl',
+                 batch_size=100, max_retries=3, backoff_seconds=0.5):
+        self.adls_handler = adls_handler
+        self.database_handler = database_handler
+        self.outbox_path = outbox_path
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self._pending = []
+        self._lock = threading.Lock()
+
+    @property
+    def dual_write(self):
+        return self.database_handler is not None
+
+    def save(self, file_name, personal_info, e_file_id=None):
+        """Persist one record immediately; returns its e_file_id, or None if the lake write failed"""
+        e_file_id = e_file_id or str(uuid.uuid4())
+        if not self._write_document(file_name, e_file_id, personal_info):
+            return None
+        if self.dual_write:
+            self._write_rows([(file_name, personal_info, e_file_id)])
+        return e_file_id
+
+    def add(self, file_name, personal_info, e_file_id=None):
+        """Write the lake document now and queue the SQL row; flushes every batch_size records"""
+        e_file_id = e_file_id or str(uuid.uuid4())
+        if not self._write_document(file_name, e_file_id, personal_info):
+            return None
+        if self.dual_write:
+            with self._lock:
+                self._pending.append((file_name, personal_info, e_file_id))
+                ready = len(self._pending) >= self.batch_size
+            if ready:
+                self.flush()
+        return e_file_id
+
+    def flush(self):
+        """Write queued SQL rows; returns the number written"""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if not pending:
+            return 0
+        return len(self._write_rows(pending))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.flush()
+        return False
+
+    def _write_document(self, file_name, e_file_id, personal_info):
+        with metrics.timer('persistence_seconds', target='adls'):
+            success = self.adls_handler.save_extracted_data(file_name, e_file_id, personal_info)
+        metrics.inc('persistence_writes_total', target='adls', status='ok' if success else 'failed')
+        return success
+
+    def _write_rows(self, items):
+        """Upsert rows with retries; anything still failing goes to the outbox"""
+        remaining = list(items)
+        written = []
+
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                # Exponential backoff with jitter
+                delay = self.backoff_seconds * (2 ** (attempt - 1))
+                time.sleep(delay + random.uniform(0, delay / 2))
+
+            with metrics.timer('persistence_seconds', target='sql'):
+                committed = set(self.database_handler.upsert_many(remaining))
+            written.extend(item[2] for item in remaining if item[2] in committed)
+            remaining = [item for item in remaining if item[2] not in committed]
+            if not remaining:
+                break
+            logging.warning(f"SQL write failed for {len(remaining)} record(s) (attempt {attempt + 1}/{self.max_retries + 1})")
+
+        metrics.inc('persistence_writes_total', len(written), target='sql', status='ok')
+        if remaining:
+            metrics.inc('persistence_writes_total', len(remaining), target='sql', status='outboxed')
+            self._append_outbox(remaining)
+        return written
+
+    def _append_outbox(self, items):
+        try:
+            directory = os.path.dirname(self.outbox_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.outbox_path, 'a') as f:
+                for file_name, personal_info, e_file_id in items:
+                    entry = {
+                        'e_file_id': e_file_id,
+                        'file_name': file_name,
+                        'personal_info': personal_info,
+                        'queued_at': datetime.now().isoformat()
+                    }
+                    f.write(json.dumps(entry, default=str) + "\n")
+            logging.error(f"Queued {len(items)} record(s) in outbox {self.outbox_path} for replay")
+        except Exception as e:
+            logging.error(f"Error writing outbox {self.outbox_path}: {str(e)}")
+
+    def _read_outbox(self, path):
+        if not os.path.exists(path):
+            return []
+        entries = []
+        with open(path) as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    logging.warning(f"Skipping unreadable outbox line in {path}")
+        return entries
+
+    def pending_outbox(self):
+        """Return the entries waiting in the outbox"""
+        return self._read_outbox(f"{self.outbox_path}.replaying") + self._read_outbox(self.outbox_path)
+
+    def replay_outbox(self):
+        """Re-apply outboxed SQL writes; returns (replayed, still_pending)"""
+        if not self.dual_write:
+            logging.warning("Outbox replay needs a database handler (PERSISTENCE_MODE=dual)")
+            return 0, len(self.pending_outbox())
+
+        # Move entries aside so failures during replay append to a fresh outbox.
+        # A leftover .replaying file (interrupted replay) is picked up again.
+        replay_path = f"{self.outbox_path}.replaying"
+        if os.path.exists(self.outbox_path):
+            if os.path.exists(replay_path):
+                with open(self.outbox_path) as source, open(replay_path, 'a') as target:
+                    target.write(source.read())
+                os.remove(self.outbox_path)
+            else:
+                os.replace(self.outbox_path, replay_path)
+
+        entries = self._read_outbox(replay_path)
+        if not entries:
+            if os.path.exists(replay_path):
+                os.remove(replay_path)
+            return 0, 0
+
+        items = [(entry['file_name'], entry['personal_info'], entry['e_file_id']) for entry in entries]
+        written = self._write_rows(items)
+        os.remove(replay_path)
+
+        return len(written), len(items) - len(written)
+
+
+def create_persistence_sink(config, adls_handler):
+    """Build the sink selected by PERSISTENCE_MODE ('adls' or 'dual')"""
+    database_handler = None
+    if config.PERSISTENCE_MODE == 'dual':
+        from database_handler import DatabaseHandler
+        database_handler = DatabaseHandler()
+    elif config.PERSISTENCE_MODE != 'adls':
+        logging.warning(f"Unknown PERSISTENCE_MODE '{config.PERSISTENCE_MODE}', using adls")
+
+    return PersistenceSink(
+        adls_handler,
+        database_handler,
+        outbox_path=config.PERSISTENCE_OUTBOX_PATH,
+        batch_size=config.PERSISTENCE_BATCH_SIZE,
+        max_retries=config.PERSISTENCE_MAX_RETRIES
+    )
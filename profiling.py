@@ -0,0 +1,196 @@
+"""
+Opt-in profiling hooks for hot paths.
+
+Enable with PROFILE_ENABLED=true (or `cli_chatbot.py --profile`). Each
+sampled call of a wrapped operation writes a cProfile dump (.prof, open
+with pstats/snakeviz), a short text summary and, with PROFILE_MEMORY, the
+top tracemalloc allocation deltas into PROFILE_DIR/<operation>/.
+PROFILE_SAMPLE_RATE limits profiling to a fraction of calls.
+"""
+import cProfile
+import functools
+import io
+import itertools
+import logging
+import os
+import pstats
+import random
+import threading
+import time
+import tracemalloc
+
+from dotenv import load_dotenv
+
+
+# Read before Config is imported (adls_handler imports this module first), so load .env here too
+load_dotenv()
+
+
+def _env_flag(name, default=''):
+    return os.getenv(name, default).strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+class Profiler:
+    """Samples operations and writes per-operation CPU and memory profiles to disk"""
+
+    def __init__(self, enabled=False, output_dir='profiles', sample_rate=1.0,
+                 memory=False, top_n=25):
+        self.enabled = enabled
+        self.output_dir = output_dir
+        self.sample_rate = sample_rate
+        self.memory = memory
+        self.top_n = top_n
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._counter = itertools.count(1)
+        self._tracemalloc_users = 0
+        self._owns_tracemalloc = False
+        self._random = random.Random()
+
+    def _sampled(self):
+        if self.sample_rate >= 1.0:
+            return True
+        with self._lock:
+            return self._random.random() < self.sample_rate
+
+    def profiled(self, operation):
+        """Decorator that profiles sampled calls of the wrapped function"""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with self.profile(operation):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def profile(self, operation):
+        """Context manager that profiles one operation if it is sampled"""
+        if not self.enabled or getattr(self._local, 'active', False) or not self._sampled():
+            return _NULL_PROFILE
+        return _ProfileSession(self, operation)
+
+    def _start_tracemalloc(self):
+        with self._lock:
+            if self._tracemalloc_users == 0 and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._owns_tracemalloc = True
+            self._tracemalloc_users += 1
+
+    def _stop_tracemalloc(self):
+        with self._lock:
+            self._tracemalloc_users -= 1
+            if self._tracemalloc_users == 0 and self._owns_tracemalloc:
+                tracemalloc.stop()
+                self._owns_tracemalloc = False
+
+    def _output_path(self, operation, suffix):
+        directory = os.path.join(self.output_dir, operation.replace('/', '_'))
+        os.makedirs(directory, exist_ok=True)
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        return os.path.join(directory, f"{stamp}-{os.getpid()}-{next(self._counter)}{suffix}")
+
+
+class _NullProfile:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NULL_PROFILE = _NullProfile()
+
+# Allocations made by the profiling machinery itself
+_MEMORY_IGNORE = ('*/cProfile.py', '*/pstats.py', '*/tracemalloc.py', __file__)
+
+
+class _ProfileSession:
+    def __init__(self, profiler, operation):
+        self._profiler = profiler
+        self._operation = operation
+        self._cpu = None
+        self._snapshot = None
+        self._start = None
+
+    def __enter__(self):
+        profiler = self._profiler
+        profiler._local.active = True
+        if profiler.memory:
+            profiler._start_tracemalloc()
+            self._snapshot = tracemalloc.take_snapshot()
+        self._cpu = cProfile.Profile()
+        try:
+            self._cpu.enable()
+        except ValueError:
+            # Another profiler is already active (e.g. a concurrent thread on 3.12+)
+            self._cpu = None
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        elapsed = time.perf_counter() - self._start
+        profiler = self._profiler
+        try:
+            if self._cpu:
+                self._cpu.disable()
+            base_path = profiler._output_path(self._operation, '')
+            # Memory first, so the CPU report's own allocations are not counted
+            if self._snapshot is not None:
+                self._write_memory(base_path)
+            self._write_cpu(base_path, elapsed)
+        except Exception as e:
+            logging.error(f"Error writing profile for {self._operation}: {str(e)}")
+        finally:
+            if self._snapshot is not None:
+                profiler._stop_tracemalloc()
+            profiler._local.active = False
+        return False
+
+    def _write_cpu(self, base_path, elapsed):
+        if not self._cpu:
+            return
+        self._cpu.dump_stats(f"{base_path}.prof")
+
+        summary = io.StringIO()
+        summary.write(f"operation: {self._operation}\nwall_time_s: {elapsed:.6f}\n\n")
+        pstats.Stats(self._cpu, stream=summary).sort_stats('cumulative').print_stats(self._profiler.top_n)
+        with open(f"{base_path}.txt", 'w') as f:
+            f.write(summary.getvalue())
+
+    def _write_memory(self, base_path):
+        current, peak = tracemalloc.get_traced_memory()
+        ignore = [tracemalloc.Filter(False, pattern) for pattern in _MEMORY_IGNORE]
+        stats = tracemalloc.take_snapshot().filter_traces(ignore).compare_to(
+            self._snapshot.filter_traces(ignore), 'lineno'
+        )
+        with open(f"{base_path}.mem.txt", 'w') as f:
+            f.write(f"operation: {self._operation}\ntraced_current_bytes: {current}\ntraced_peak_bytes: {peak}\n\n")
+            for stat in stats[:self._profiler.top_n]:
+                f.write(f"{stat}\n")
+
+
+# Process-wide profiler used by the handlers and the CLI
+profiler = Profiler(
+    enabled=_env_flag('PROFILE_ENABLED'),
+    output_dir=os.getenv('PROFILE_DIR', 'profiles'),
+    sample_rate=float(os.getenv('PROFILE_SAMPLE_RATE', '1.0')),
+    memory=_env_flag('PROFILE_MEMORY')
+)
+
+
+def configure(enabled=True, output_dir=None, sample_rate=None, memory=None):
+    """Adjust the process-wide profiler at runtime (used by CLI flags)"""
+    profiler.enabled = enabled
+    if output_dir:
+        profiler.output_dir = output_dir
+    if sample_rate is not None:
+        profiler.sample_rate = max(0.0, min(1.0, sample_rate))
+    if memory is not None:
+        profiler.memory = memory
+    if enabled:
+        logging.info(
+            f"Profiling enabled: dir={profiler.output_dir} sample_rate={profiler.sample_rate} memory={profiler.memory}"
+        )
+    return profiler
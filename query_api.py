@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Local HTTP API for queries, searches and record lookups.
+
+A small asyncio HTTP/1.1 server: connections are kept alive between
+requests, and the blocking work (QueryEngine, storage reads) runs on a
+thread pool so many requests are served concurrently. One ADLSHandler and
+QueryEngine are built at startup and shared, so clients, the search index
+cache and the engine stay warm for every request.
+
+    POST /query                {"question": "How many people are there?"}
+    GET  /search?name=smith    (or ?email=...)
+    GET  /records?limit=20
+    GET  /records/<e_file_id>
+    GET  /health
+
+    python query_api.py --port 8780 --workers 16
+
+Responses contain personal information: the server binds to 127.0.0.1 by
+default, and every route except /health requires
+`Authorization: Bearer <QUERY_API_TOKEN>` when that variable is set.
+"""
+import argparse
+import asyncio
+import hmac
+import json
+import logging
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from metrics import metrics
+
+MAX_HEADER_BYTES = 64 * 1024
+MAX_BODY_BYTES = 1024 * 1024
+# E-File IDs are UUIDs; anything else must not reach a storage path
+E_FILE_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+REASONS = {200: 'OK', 400: 'Bad Request', 401: 'Unauthorized', 404: 'Not Found', 405: 'Method Not Allowed',
+           413: 'Payload Too Large', 431: 'Request Header Fields Too Large', 500: 'Internal Server Error'}
+
+
+class HTTPError(Exception):
+    """Ends a request with an error status and a JSON message"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class QueryAPI:
+    """Routes API requests to a shared ADLSHandler and QueryEngine (blocking; called from worker threads)"""
+
+    def __init__(self, adls_handler, query_engine, token=None):
+        self.adls_handler = adls_handler
+        self.query_engine = query_engine
+        self.token = token
+
+    def route(self, method, path):
+        """Return (route name, handler, path argument, allowed methods) for a request path"""
+        parts = [unquote(part) for part in path.strip('/').split('/') if part]
+        if parts == ['health']:
+            return 'health', self.health, None, ('GET',)
+        if parts == ['query']:
+            return 'query', self.query, None, ('POST',)
+        if parts == ['search']:
+            return 'search', self.search, None, ('GET',)
+        if parts == ['records']:
+            return 'records', self.records, None, ('GET',)
+        if len(parts) == 2 and parts[0] == 'records' and E_FILE_ID_PATTERN.match(parts[1]):
+            return 'record', self.record, parts[1], ('GET',)
+        raise HTTPError(404, f"No route for {path}")
+
+    def authorize(self, headers):
+        if not self.token:
+            return
+        supplied = headers.get('authorization', '')
+        if not hmac.compare_digest(supplied.encode('utf-8'), f"Bearer {self.token}".encode('utf-8')):
+            raise HTTPError(401, "Missing or invalid bearer token")
+
+    def health(self, query, body, argument):
+        return {'status': 'ok'}
+
+    def query(self, query, body, argument):
+        question = (body or {}).get('question')
+        if not isinstance(question, str) or not question.strip():
+            raise HTTPError(400, "Body must be JSON with a non-empty 'question'")
+        return self.query_engine.process_query(question)
+
+    def search(self, query, body, argument):
+        if query.get('email'):
+            return {'results': self.adls_handler.search_by_email(query['email'])}
+        if query.get('name'):
+            return {'results': self.adls_handler.search_by_name(query['name'])}
+        raise HTTPError(400, "Pass ?name= or ?email=")
+
+    def records(self, query, body, argument):
+        try:
+            limit = int(query.get('limit', 100))
+        except ValueError:
+            raise HTTPError(400, "limit must be an integer")
+        return {'results': self.adls_handler.get_all_records(limit=max(1, min(limit, 1000)))}
+
+    def record(self, query, body, argument):
+        record = self.adls_handler.get_extracted_data(argument)
+        if not record:
+            raise HTTPError(404, f"No record with E-File ID {argument}")
+        return record
+
+
+class QueryAPIServer:
+    """asyncio HTTP/1.1 server with keep-alive; runs in the foreground or on a background thread"""
+
+    def __init__(self, api, host='127.0.0.1', port=8780, workers=16, keepalive_seconds=15.0):
+        self.api = api
+        self.host = host
+        self.port = port
+        self.workers = max(1, workers)
+        self.keepalive_seconds = keepalive_seconds
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='query-api')
+        self._loop = None
+        self._server = None
+        self._thread = None
+        self._ready = threading.Event()
+        self._error = None
+        # Open connection handlers, closed by _serve_until_stopped() on shutdown
+        self._connections = set()
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}:{self.port}"
+
+    async def serve(self, on_listening=None):
+        """Serve until cancelled; on_listening is called once the socket is bound"""
+        self._loop = asyncio.get_running_loop()
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port,
+                                                  limit=MAX_HEADER_BYTES)
+        # Port 0 picks a free port
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._ready.set()
+        if on_listening:
+            on_listening()
+        async with self._server:
+            await self._server.serve_forever()
+
+    def start(self, timeout=10.0):
+        """Serve from a daemon thread (for tests and benchmarks); returns once listening"""
+        self._thread = threading.Thread(target=lambda: asyncio.run(self._serve_until_stopped()), daemon=True)
+        self._thread.start()
+        if not self._ready.wait(timeout):
+            raise TimeoutError(f"Query API did not start listening on {self.host}:{self.port} within {timeout}s")
+        if self._error is not None:
+            # e.g. the port is already in use
+            self._executor.shutdown(wait=False)
+            raise self._error
+        return self
+
+    async def _serve_until_stopped(self):
+        try:
+            await self.serve()
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            # Reported by start() instead of dying silently in this thread
+            self._error = e
+            self._ready.set()
+        finally:
+            await self._close_connections()
+
+    async def _close_connections(self):
+        # Idle keep-alive connections would otherwise be torn down by asyncio.run() after the loop stops
+        connections = list(self._connections)
+        for task in connections:
+            task.cancel()
+        await asyncio.gather(*connections, return_exceptions=True)
+
+    def stop(self):
+        # Closing the server ends serve_forever(); asyncio.run() then cancels idle keep-alive connections
+        if self._loop and self._server:
+            self._loop.call_soon_threadsafe(self._server.close)
+        if self._thread:
+            self._thread.join(timeout=5)
+        self._executor.shutdown(wait=False)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    async def _handle_connection(self, reader, writer):
+        metrics.inc('query_api_connections_total')
+        task = asyncio.current_task()
+        self._connections.add(task)
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), self.keepalive_seconds)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except asyncio.LimitOverrunError:
+                    await self._write(writer, 431, {'error': REASONS[431]}, keep_alive=False)
+                    break
+
+                keep_alive = await self._handle_request(head, reader, writer)
+                if not keep_alive:
+                    break
+        except asyncio.CancelledError:
+            # Shutdown (see _close_connections); finishing normally keeps asyncio from logging the cancelled handler
+            pass
+        finally:
+            self._connections.discard(task)
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (ConnectionError, asyncio.CancelledError):
+                pass
+
+    async def _handle_request(self, head, reader, writer):
+        """Serve one request; returns whether the connection stays open"""
+        started = time.perf_counter()
+        route_name = 'unknown'
+        try:
+            request_line, *header_lines = head.decode('latin-1').split('\r\n')
+            method, target, version = request_line.split(' ', 2)
+            headers = {}
+            for line in header_lines:
+                if ':' in line:
+                    name, value = line.split(':', 1)
+                    headers[name.strip().lower()] = value.strip()
+        except ValueError:
+            await self._write(writer, 400, {'error': "Malformed request"}, keep_alive=False)
+            return False
+
+        connection = headers.get('connection', '').lower()
+        keep_alive = connection != 'close' if version == 'HTTP/1.1' else connection == 'keep-alive'
+
+        try:
+            length = int(headers.get('content-length') or 0)
+            if length > MAX_BODY_BYTES:
+                raise HTTPError(413, f"Body larger than {MAX_BODY_BYTES} bytes")
+            raw_body = await reader.readexactly(length) if length else b''
+
+            url = urlsplit(target)
+            query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            route_name, handler, argument, methods = self.api.route(method, url.path)
+            # Health checks stay open so load balancers and probes need no token
+            if route_name != 'health':
+                self.api.authorize(headers)
+            if method not in methods:
+                raise HTTPError(405, f"{method} not allowed on {url.path}")
+            try:
+                body = json.loads(raw_body) if raw_body else None
+            except ValueError:
+                raise HTTPError(400, "Body is not valid JSON")
+
+            # Storage and model calls block; keep them off the event loop
+            payload = await asyncio.get_running_loop().run_in_executor(self._executor, handler, query, body, argument)
+            status = 200
+        except HTTPError as e:
+            status, payload = e.status, {'error': e.message}
+        except asyncio.IncompleteReadError:
+            return False
+        except Exception as e:
+            logging.error(f"Query API error on {target}: {str(e)}")
+            status, payload = 500, {'error': str(e)}
+
+        await self._write(writer, status, payload, keep_alive)
+        metrics.inc('query_api_requests_total', route=route_name, status=status)
+        metrics.observe('query_api_seconds', time.perf_counter() - started, route=route_name)
+        return keep_alive
+
+    async def _write(self, writer, status, payload, keep_alive):
+        body = json.dumps(payload, default=str).encode('utf-8')
+        head = (f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+                f"Content-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode('latin-1') + body)
+        await writer.drain()
+
+
+def create_query_api(config, adls_handler=None):
+    """QueryAPI over a shared handler and engine built from config"""
+    from adls_handler import ADLSHandler
+    from query_engine import QueryEngine
+
+    adls_handler = adls_handler or ADLSHandler()
+    return QueryAPI(adls_handler, QueryEngine(adls_handler), token=config.QUERY_API_TOKEN)
+
+
+def main():
+    import client_registry
+
+    config = client_registry.get_config()
+    parser = argparse.ArgumentParser(description="HTTP API for PDF chatbot queries and lookups")
+    parser.add_argument('--host', default=config.QUERY_API_HOST, help='Interface to bind')
+    parser.add_argument('--port', type=int, default=config.QUERY_API_PORT, help='Port to listen on')
+    parser.add_argument('--workers', type=int, default=config.QUERY_API_WORKERS, help='Threads for blocking work')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    server = QueryAPIServer(create_query_api(config), args.host, args.port, args.workers,
+                            keepalive_seconds=config.QUERY_API_KEEPALIVE_SECONDS)
+
+    def listening():
+        # After binding, so --port 0 shows the port actually chosen
+        print(f"🌐 Query API listening on {server.base_url} ({server.workers} workers)")
+        if not config.QUERY_API_TOKEN:
+            print("⚠️  QUERY_API_TOKEN is not set; any local client can read records")
+
+    try:
+        asyncio.run(server.serve(on_listening=listening))
+    except KeyboardInterrupt:
+        pass
+    except OSError as e:
+        print(f"❌ Could not listen on {args.host}:{args.port}: {str(e)}")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
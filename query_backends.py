@@ -0,0 +1,282 @@
+"""
+Data backends for QueryEngine.
+
+QueryEngine asks a backend for counts, breakdowns and searches and only
+formats the answers. ADLSQueryBackend computes them in Python over the
+search index (capped at `record_limit` records); SQLQueryBackend pushes
+them down to the PersonalInformation table as COUNT/GROUP BY/AVG queries.
+Select one with QUERY_BACKEND=adls|sql.
+"""
+import logging
+from datetime import datetime, timezone
+
+# Columns returned for record listings, matching the search index fields
+RECORD_COLUMNS = (
+    'e_file_id, file_name, first_name, last_name, email, phone_number, '
+    'address, date_of_birth, document_type, confidence_score, created_date'
+)
+
+
+class ADLSQueryBackend:
+    """Answers queries from the ADLS search index"""
+
+    name = 'adls'
+
+    def __init__(self, adls_handler, record_limit=1000):
+        self.adls_handler = adls_handler
+        self.record_limit = record_limit
+
+    def _records(self, limit=None):
+        return self.adls_handler.get_all_records(limit=limit or self.record_limit)
+
+    def count_pdf_files(self):
+        return len(self.adls_handler.list_pdf_files())
+
+    def count_records(self):
+        return len(self._records())
+
+    def count_people(self):
+        """Count unique people by email, falling back to first/last name"""
+        unique_people = set()
+        for record in self._records():
+            email = (record.get('email') or '').lower().strip()
+            first_name = (record.get('first_name') or '').lower().strip()
+            last_name = (record.get('last_name') or '').lower().strip()
+
+            if email:
+                unique_people.add(email)
+            elif first_name and last_name:
+                unique_people.add(f"{first_name}_{last_name}")
+            elif first_name:
+                unique_people.add(first_name)
+        return len(unique_people)
+
+    def search_by_name(self, name):
+        return self.adls_handler.search_by_name(name)
+
+    def search_by_email(self, email):
+        return self.adls_handler.search_by_email(email)
+
+    def records_since(self, cutoff, limit=100):
+        """Records created at or after cutoff, newest first"""
+        recent_records = []
+        for record in self._records(limit):
+            created_date_str = record.get('created_date', '')
+            try:
+                created_date = datetime.fromisoformat(created_date_str.replace('Z', '+00:00'))
+                if created_date >= cutoff:
+                    recent_records.append(record)
+            except:
+                continue
+        return recent_records
+
+    def records_by_type(self, doc_type):
+        return [
+            record for record in self._records()
+            if (record.get('document_type') or '').lower().find(doc_type.lower()) != -1
+        ]
+
+    def document_type_counts(self):
+        type_counts = {}
+        for record in self._records():
+            doc_type = record.get('document_type') or 'Unknown'
+            type_counts[doc_type] = type_counts.get(doc_type, 0) + 1
+        return type_counts
+
+    def confidence_stats(self):
+        """Return {average, min, max, count} of confidence scores, or None if there are none"""
+        scores = [
+            float(record['confidence_score']) for record in self._records()
+            if isinstance(record.get('confidence_score'), (int, float))
+        ]
+        if not scores:
+            return None
+        return {
+            'average': sum(scores) / len(scores),
+            'min': min(scores),
+            'max': max(scores),
+            'count': len(scores)
+        }
+
+    def summary(self):
+        """Totals used by summary stats and the AI data context"""
+        records = self._records()
+        unique_emails = set()
+        doc_types = {}
+        scores = []
+
+        for record in records:
+            email = (record.get('email') or '').lower().strip()
+            if email:
+                unique_emails.add(email)
+
+            doc_type = record.get('document_type') or 'Unknown'
+            doc_types[doc_type] = doc_types.get(doc_type, 0) + 1
+
+            score = record.get('confidence_score')
+            if score is not None and isinstance(score, (int, float)):
+                scores.append(float(score))
+
+        return {
+            'total_pdf_files': self.count_pdf_files(),
+            'total_processed_files': len(records),
+            'unique_people': len(unique_emails),
+            'document_types': doc_types,
+            'average_confidence': (sum(scores) / len(scores)) if scores else 0
+        }
+
+
+class SQLQueryBackend:
+    """Answers queries with aggregate SQL against the PersonalInformation table"""
+
+    name = 'sql'
+
+    def __init__(self, database_handler, adls_handler=None):
+        self.db = database_handler
+        # PDFs live in ADLS; without a handler, count distinct file names instead
+        self.adls_handler = adls_handler
+
+    def _normalized(self, column):
+        return f"LOWER(LTRIM(RTRIM({column})))"
+
+    def _concat(self, *parts):
+        if self.db.dialect == 'sqlite':
+            return ' || '.join(parts)
+        return ' + '.join(parts)
+
+    def _limit(self, sql, limit):
+        if self.db.dialect == 'sqlite':
+            return f"{sql} LIMIT {int(limit)}"
+        return sql.replace('SELECT', f'SELECT TOP {int(limit)}', 1)
+
+    def _date_param(self, value):
+        # SQLite stores CURRENT_TIMESTAMP as UTC text, so compare against the same format
+        if self.db.dialect == 'sqlite':
+            return value.astimezone(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+        return value
+
+    def _records(self, sql, params=()):
+        rows = self.db.execute_query(sql, params)
+        for row in rows:
+            created_date = row.get('created_date')
+            if isinstance(created_date, datetime):
+                row['created_date'] = created_date.isoformat()
+        return rows
+
+    def count_pdf_files(self):
+        if self.adls_handler is not None:
+            return len(self.adls_handler.list_pdf_files())
+        return self.db.execute_scalar("SELECT COUNT(DISTINCT file_name) FROM PersonalInformation") or 0
+
+    def count_records(self):
+        return self.db.execute_scalar("SELECT COUNT(*) FROM PersonalInformation") or 0
+
+    def count_people(self):
+        """Count unique people by email, falling back to first/last name"""
+        email = self._normalized('email')
+        first_name = self._normalized('first_name')
+        last_name = self._normalized('last_name')
+        sql = f"""
+        SELECT COUNT(DISTINCT CASE
+            WHEN {email} <> '' THEN {email}
+            WHEN {first_name} <> '' AND {last_name} <> '' THEN {self._concat(first_name, "'_'", last_name)}
+            WHEN {first_name} <> '' THEN {first_name}
+        END)
+        FROM PersonalInformation
+        """
+        return self.db.execute_scalar(sql) or 0
+
+    def search_by_name(self, name):
+        from database_handler import escape_like
+        # Escaped so '%' and '_' in a name match literally, as in ADLSQueryBackend's substring match
+        pattern = f"%{escape_like(name.lower())}%"
+        full_name = self._concat("LOWER(COALESCE(first_name, ''))", "' '", "LOWER(COALESCE(last_name, ''))")
+        sql = f"""
+        SELECT {RECORD_COLUMNS} FROM PersonalInformation
+        WHERE LOWER(first_name) LIKE ? ESCAPE '\\' OR LOWER(last_name) LIKE ? ESCAPE '\\' OR {full_name} LIKE ? ESCAPE '\\'
+        ORDER BY created_date DESC
+        """
+        return self._records(sql, (pattern, pattern, pattern))
+
+    def search_by_email(self, email):
+        # Substring match, like ADLSQueryBackend, so answers do not depend on QUERY_BACKEND;
+        # '%term%' cannot seek the email indexes and scans the table
+        where, params = self.db.email_search_clause(email, match='contains')
+        sql = f"""
+        SELECT {RECORD_COLUMNS} FROM PersonalInformation
+        WHERE {where}
+        ORDER BY created_date DESC
+        """
+        return self._records(sql, params)
+
+    def records_since(self, cutoff, limit=100):
+        """Records created at or after cutoff, newest first"""
+        sql = self._limit(f"""
+        SELECT {RECORD_COLUMNS} FROM PersonalInformation
+        WHERE created_date >= ?
+        ORDER BY created_date DESC
+        """.strip(), limit)
+        return self._records(sql, (self._date_param(cutoff),))
+
+    def records_by_type(self, doc_type):
+        from database_handler import escape_like
+        sql = f"""
+        SELECT {RECORD_COLUMNS} FROM PersonalInformation
+        WHERE LOWER(document_type) LIKE ? ESCAPE '\\'
+        ORDER BY created_date DESC
+        """
+        return self._records(sql, (f"%{escape_like(doc_type.lower())}%",))
+
+    def document_type_counts(self):
+        rows = self.db.execute_query("""
+        SELECT COALESCE(document_type, 'Unknown') AS document_type, COUNT(*) AS total
+        FROM PersonalInformation
+        GROUP BY COALESCE(document_type, 'Unknown')
+        """)
+        return {row['document_type']: row['total'] for row in rows}
+
+    def confidence_stats(self):
+        """Return {average, min, max, count} of confidence scores, or None if there are none"""
+        rows = self.db.execute_query("""
+        SELECT AVG(confidence_score) AS average, MIN(confidence_score) AS min_score,
+               MAX(confidence_score) AS max_score, COUNT(confidence_score) AS total
+        FROM PersonalInformation
+        """)
+        if not rows or not rows[0]['total']:
+            return None
+        row = rows[0]
+        return {
+            'average': float(row['average']),
+            'min': float(row['min_score']),
+            'max': float(row['max_score']),
+            'count': row['total']
+        }
+
+    def summary(self):
+        """Totals used by summary stats and the AI data context"""
+        email = self._normalized('email')
+        rows = self.db.execute_query(f"""
+        SELECT COUNT(*) AS total,
+               COUNT(DISTINCT CASE WHEN {email} <> '' THEN {email} END) AS unique_people,
+               AVG(confidence_score) AS average_confidence
+        FROM PersonalInformation
+        """)
+        row = rows[0] if rows else {}
+        return {
+            'total_pdf_files': self.count_pdf_files(),
+            'total_processed_files': row.get('total') or 0,
+            'unique_people': row.get('unique_people') or 0,
+            'document_types': self.document_type_counts(),
+            'average_confidence': float(row.get('average_confidence') or 0)
+        }
+
+
+def create_query_backend(config, adls_handler):
+    """Build the backend selected by QUERY_BACKEND"""
+    if config.QUERY_BACKEND == 'sql':
+        from database_handler import DatabaseHandler
+        return SQLQueryBackend(DatabaseHandler(), adls_handler)
+    if config.QUERY_BACKEND != 'adls':
+        logging.warning(f"Unknown QUERY_BACKEND '{config.QUERY_BACKEND}', using adls")
+    return ADLSQueryBackend(adls_handler)
+
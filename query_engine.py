@@ -3,41 +3,46 @@ import re
 import logging
 from datetime import datetime, timedelta
 from typing import Dict, List, Any
-import pandas as pd
 
-# OpenAI imports with error handling
-try:
-    import openai
-    from openai import OpenAI
-    OPENAI_AVAILABLE = True
-except ImportError:
-    OPENAI_AVAILABLE = False
-    logging.warning("OpenAI not available. Using basic pattern matching only.")
-
-from config import Config
+import client_registry
+from metrics import metrics
+from profiling import profiler
+from query_backends import create_query_backend
 
 class QueryEngine:
     """
     Enhanced query engine that uses OpenAI for intelligent query interpretation
     """
     
-    def __init__(self, adls_handler):
+    def __init__(self, adls_handler, backend=None):
         self.adls_handler = adls_handler
-        self.config = Config()
+        self.config = client_registry.get_config()
+        # Source of counts, breakdowns and searches (ADLS search index or SQL)
+        self.backend = backend or create_query_backend(self.config, adls_handler)
         self.query_patterns = self._initialize_patterns()
         
         # Initialize OpenAI client
         self.openai_client = None
         self.use_ai = False
         
-        if OPENAI_AVAILABLE:
+        # The SDK is only imported when a model is configured; it is slow to load
+        if self.config.use_openai or self.config.use_azure_openai:
             self._initialize_openai()
     
     def _initialize_openai(self):
         """Initialize OpenAI client"""
+        try:
+            from openai import OpenAI
+        except ImportError:
+            logging.warning("OpenAI not available. Using basic pattern matching only.")
+            return
+        
         try:
             if self.config.use_openai:
-                self.openai_client = OpenAI(api_key=self.config.OPENAI_API_KEY)
+                self.openai_client = OpenAI(
+                    api_key=self.config.OPENAI_API_KEY,
+                    base_url=self.config.OPENAI_BASE_URL
+                )
                 self.use_ai = True
                 logging.info("✅ OpenAI client initialized successfully")
             elif self.config.use_azure_openai:
@@ -108,6 +113,7 @@ class QueryEngine:
             ]
         }
     
+    @profiler.profiled('query_engine.process_query')
     def process_query(self, user_query: str) -> Dict[str, Any]:
         """Process user query using AI or pattern matching"""
         user_query = user_query.lower().strip()
@@ -115,19 +121,25 @@ class QueryEngine:
         try:
             # First try AI-powered interpretation
             if self.use_ai:
-                ai_response = self._process_with_ai(user_query)
+                with metrics.timer('query_seconds', path='ai'):
+                    ai_response = self._process_with_ai(user_query)
                 if ai_response:
+                    metrics.inc('queries_total', path='ai', query_type=(ai_response.get('data') or {}).get('query_type', 'unknown'))
                     return ai_response
             
             # Fallback to pattern matching
-            query_type, extracted_params = self._match_query_pattern(user_query)
-            
-            if query_type:
-                return self._execute_query(query_type, extracted_params, user_query)
-            else:
-                return self._handle_unknown_query(user_query)
+            with metrics.timer('query_seconds', path='pattern'):
+                query_type, extracted_params = self._match_query_pattern(user_query)
+                
+                if query_type:
+                    response = self._execute_query(query_type, extracted_params, user_query)
+                else:
+                    response = self._handle_unknown_query(user_query)
+            metrics.inc('queries_total', path='pattern', query_type=query_type or 'unknown')
+            return response
                 
         except Exception as e:
+            metrics.inc('query_errors_total')
             logging.error(f"Error processing query: {str(e)}")
             return {
                 'success': False,
@@ -139,7 +151,8 @@ class QueryEngine:
         """Process query using OpenAI for intelligent interpretation"""
         try:
             # Get current data context
-            stats = self._get_data_context()
+            with metrics.timer('query_stage_seconds', stage='data_context'):
+                stats = self._get_data_context()
             
             system_prompt = f"""You are a helpful assistant for a PDF document processing system. 
             
@@ -179,15 +192,16 @@ Respond in JSON format:
 
 If the query doesn't match any type well, use query_type: "unknown"."""
 
-            response = self.openai_client.chat.completions.create(
-                model=self.config.OPENAI_MODEL,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_query}
-                ],
-                temperature=0.3,
-                max_tokens=500
-            )
+            with metrics.timer('openai_request_seconds', purpose='interpret'):
+                response = self.openai_client.chat.completions.create(
+                    model=self.config.OPENAI_MODEL,
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": user_query}
+                    ],
+                    temperature=0.3,
+                    max_tokens=500
+                )
             
             ai_result = json.loads(response.choices[0].message.content)
             
@@ -209,6 +223,7 @@ If the query doesn't match any type well, use query_type: "unknown"."""
             return None
             
         except Exception as e:
+            metrics.inc('openai_errors_total')
             logging.error(f"AI processing failed: {str(e)}")
             return None
     
@@ -248,26 +263,13 @@ If the query doesn't match any type well, use query_type: "unknown"."""
     def _get_data_context(self) -> Dict[str, Any]:
         """Get current data context for AI"""
         try:
-            records = self.adls_handler.get_all_records(limit=1000)
-            pdf_files = self.adls_handler.list_pdf_files()
-            
-            # Count unique people
-            unique_emails = set()
-            doc_types = {}
-            
-            for record in records:
-                email = record.get('email', '').lower().strip()
-                if email:
-                    unique_emails.add(email)
-                
-                doc_type = record.get('document_type', 'Unknown')
-                doc_types[doc_type] = doc_types.get(doc_type, 0) + 1
+            summary = self.backend.summary()
             
             return {
-                'total_pdf_files': len(pdf_files),
-                'total_processed_files': len(records),
-                'unique_people': len(unique_emails),
-                'document_types': doc_types
+                'total_pdf_files': summary['total_pdf_files'],
+                'total_processed_files': summary['total_processed_files'],
+                'unique_people': summary['unique_people'],
+                'document_types': summary['document_types']
             }
         except:
             return {
@@ -322,8 +324,7 @@ If the query doesn't match any type well, use query_type: "unknown"."""
     def _count_files(self) -> Dict[str, Any]:
         """Count total number of processed files"""
         try:
-            records = self.adls_handler.get_all_records(limit=1000)
-            count = len(records)
+            count = self.backend.count_records()
             
             return {
                 'success': True,
@@ -343,23 +344,8 @@ If the query doesn't match any type well, use query_type: "unknown"."""
     def _count_people(self) -> Dict[str, Any]:
         """Count unique people/individuals"""
         try:
-            records = self.adls_handler.get_all_records(limit=1000)
-            
             # Count unique people based on email or name combination
-            unique_people = set()
-            for record in records:
-                email = record.get('email', '').lower().strip()
-                first_name = (record.get('first_name', '') or '').lower().strip()
-                last_name = (record.get('last_name', '') or '').lower().strip()
-                
-                if email:
-                    unique_people.add(email)
-                elif first_name and last_name:
-                    unique_people.add(f"{first_name}_{last_name}")
-                elif first_name:
-                    unique_people.add(first_name)
-            
-            count = len(unique_people)
+            count = self.backend.count_people()
             
             return {
                 'success': True,
@@ -386,7 +372,7 @@ If the query doesn't match any type well, use query_type: "unknown"."""
             }
         
         try:
-            results = self.adls_handler.search_by_name(name.strip())
+            results = self.backend.search_by_name(name.strip())
             
             if results:
                 return {
@@ -425,7 +411,7 @@ If the query doesn't match any type well, use query_type: "unknown"."""
             }
         
         try:
-            results = self.adls_handler.search_by_email(email.strip())
+            results = self.backend.search_by_email(email.strip())
             
             if results:
                 return {
@@ -457,8 +443,6 @@ If the query doesn't match any type well, use query_type: "unknown"."""
     def _get_recent_files(self, query: str) -> Dict[str, Any]:
         """Get recent files based on time period"""
         try:
-            records = self.adls_handler.get_all_records(limit=100)
-            
             # Determine time filter
             days_back = 7  # Default to last week
             if 'today' in query:
@@ -472,16 +456,7 @@ If the query doesn't match any type well, use query_type: "unknown"."""
             
             # Filter by date
             cutoff_date = datetime.now() - timedelta(days=days_back)
-            recent_records = []
-            
-            for record in records:
-                created_date_str = record.get('created_date', '')
-                try:
-                    created_date = datetime.fromisoformat(created_date_str.replace('Z', '+00:00'))
-                    if created_date >= cutoff_date:
-                        recent_records.append(record)
-                except:
-                    continue
+            recent_records = self.backend.records_since(cutoff_date, limit=100)
             
             period_name = "today" if days_back == 1 else f"last {days_back} days"
             
@@ -504,14 +479,9 @@ If the query doesn't match any type well, use query_type: "unknown"."""
     def _get_files_by_type(self, doc_type: str) -> Dict[str, Any]:
         """Get files by document type"""
         try:
-            records = self.adls_handler.get_all_records(limit=1000)
-            
             if doc_type.strip():
                 # Filter by document type
-                filtered_records = [
-                    record for record in records 
-                    if record.get('document_type', '').lower().find(doc_type.lower()) != -1
-                ]
+                filtered_records = self.backend.records_by_type(doc_type.strip())
                 
                 return {
                     'success': True,
@@ -524,10 +494,7 @@ If the query doesn't match any type well, use query_type: "unknown"."""
                 }
             else:
                 # Group by document type
-                type_counts = {}
-                for record in records:
-                    doc_type = record.get('document_type', 'Unknown')
-                    type_counts[doc_type] = type_counts.get(doc_type, 0) + 1
+                type_counts = self.backend.document_type_counts()
                 
                 return {
                     'success': True,
@@ -547,27 +514,17 @@ If the query doesn't match any type well, use query_type: "unknown"."""
     def _get_confidence_stats(self) -> Dict[str, Any]:
         """Get confidence score statistics"""
         try:
-            records = self.adls_handler.get_all_records(limit=1000)
-            
-            confidence_scores = []
-            for record in records:
-                score = record.get('confidence_score')
-                if score is not None and isinstance(score, (int, float)):
-                    confidence_scores.append(float(score))
-            
-            if confidence_scores:
-                avg_confidence = sum(confidence_scores) / len(confidence_scores)
-                min_confidence = min(confidence_scores)
-                max_confidence = max(confidence_scores)
-                
+            stats = self.backend.confidence_stats()
+            
+            if stats:
                 return {
                     'success': True,
                     'message': f"Confidence Statistics:",
                     'data': {
-                        'average_confidence': round(avg_confidence, 2),
-                        'min_confidence': round(min_confidence, 2),
-                        'max_confidence': round(max_confidence, 2),
-                        'total_records': len(confidence_scores),
+                        'average_confidence': round(stats['average'], 2),
+                        'min_confidence': round(stats['min'], 2),
+                        'max_confidence': round(stats['max'], 2),
+                        'total_records': stats['count'],
                         'query_type': 'confidence_stats'
                     }
                 }
@@ -587,37 +544,17 @@ If the query doesn't match any type well, use query_type: "unknown"."""
     def _get_summary_stats(self) -> Dict[str, Any]:
         """Get overall summary statistics"""
         try:
-            records = self.adls_handler.get_all_records(limit=1000)
-            pdf_files = self.adls_handler.list_pdf_files()
-            
-            # Count unique people
-            unique_emails = set()
-            doc_types = {}
-            confidence_scores = []
-            
-            for record in records:
-                email = record.get('email', '').lower().strip()
-                if email:
-                    unique_emails.add(email)
-                
-                doc_type = record.get('document_type', 'Unknown')
-                doc_types[doc_type] = doc_types.get(doc_type, 0) + 1
-                
-                score = record.get('confidence_score')
-                if score is not None and isinstance(score, (int, float)):
-                    confidence_scores.append(float(score))
-            
-            avg_confidence = (sum(confidence_scores) / len(confidence_scores)) if confidence_scores else 0
+            summary = self.backend.summary()
             
             return {
                 'success': True,
                 'message': "Here's a summary of your document processing system:",
                 'data': {
-                    'total_pdf_files': len(pdf_files),
-                    'total_processed_files': len(records),
-                    'unique_people': len(unique_emails),
-                    'document_types': doc_types,
-                    'average_confidence': round(avg_confidence, 2),
+                    'total_pdf_files': summary['total_pdf_files'],
+                    'total_processed_files': summary['total_processed_files'],
+                    'unique_people': summary['unique_people'],
+                    'document_types': summary['document_types'],
+                    'average_confidence': round(summary['average_confidence'], 2),
                     'query_type': 'summary_stats'
                 }
             }
@@ -26,12 +26,14 @@ def check_environment_variables():
     load_dotenv()
     
     required_vars = [
-        'ADLS_ACCOUNT_NAME',
-        'ADLS_ACCOUNT_KEY',
         'DOCUMENT_INTELLIGENCE_ENDPOINT',
         'DOCUMENT_INTELLIGENCE_KEY'
     ]
     
+    # ADLS credentials are not needed for the local/memory storage stand-ins
+    if os.getenv('STORAGE_BACKEND', 'adls').lower() == 'adls':
+        required_vars = ['ADLS_ACCOUNT_NAME', 'ADLS_ACCOUNT_KEY'] + required_vars
+    
     missing_vars = []
     empty_vars = []
     
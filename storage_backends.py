@@ -0,0 +1,594 @@
+"""
+Local stand-ins for the ADLS Gen2 file system client.
+
+Both backends mimic the subset of the azure-storage-file-datalake surface
+that ADLSHandler uses (get_file_client, get_directory_client, get_paths,
+download_file, upload_data, ...), so the storage path can be benchmarked
+and exercised offline. Latency can be injected to approximate round trips.
+"""
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+try:
+    from azure.core import MatchConditions
+    from azure.core.exceptions import ResourceNotFoundError, ResourceExistsError, ResourceModifiedError, ResourceNotModifiedError
+except ImportError:
+    class MatchConditions:
+        """Same values as azure.core.MatchConditions"""
+        Unconditionally = 1
+        IfNotModified = 2
+        IfModified = 3
+        IfPresent = 4
+        IfMissing = 5
+
+    class ResourceNotFoundError(Exception):
+        """Raised when a path does not exist"""
+
+    class ResourceExistsError(Exception):
+        """Raised when a path already exists and overwrite is not allowed"""
+
+    class ResourceModifiedError(Exception):
+        """Raised when a conditional write's ETag no longer matches (HTTP 412)"""
+
+    class ResourceNotModifiedError(Exception):
+        """Raised when a conditional read's ETag still matches (HTTP 304)"""
+
+
+class PathProperties:
+    """Entry returned by get_paths()"""
+
+    def __init__(self, name, is_directory, last_modified, content_length=0, etag=None):
+        self.name = name
+        self.is_directory = is_directory
+        self.last_modified = last_modified
+        self.content_length = content_length
+        self.etag = etag
+
+
+class FileProperties:
+    """Result of get_file_properties()"""
+
+    def __init__(self, name, size, last_modified, etag):
+        self.name = name
+        self.size = size
+        self.last_modified = last_modified
+        self.etag = etag
+
+
+class StorageDownloader:
+    """Minimal StorageStreamDownloader equivalent"""
+
+    def __init__(self, data, properties, chunk_size=4 * 1024 * 1024):
+        self._data = data
+        self.properties = properties
+        self.size = len(data)
+        self._chunk_size = chunk_size
+
+    def readall(self):
+        return self._data
+
+    def readinto(self, stream):
+        stream.write(self._data)
+        return self.size
+
+    def chunks(self):
+        for start in range(0, self.size, self._chunk_size):
+            yield self._data[start:start + self._chunk_size]
+
+
+class FileStorageDownloader:
+    """StorageStreamDownloader over an open local file; reads in chunks instead of all at once"""
+
+    def __init__(self, file_obj, properties, offset=0, length=None, chunk_size=4 * 1024 * 1024):
+        self._file = file_obj
+        self.properties = properties
+        self._offset = offset or 0
+        available = max(0, properties.size - self._offset)
+        self.size = available if length is None else min(length, available)
+        self._chunk_size = chunk_size
+
+    def chunks(self):
+        try:
+            self._file.seek(self._offset)
+            remaining = self.size
+            while remaining > 0:
+                chunk = self._file.read(min(self._chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+        finally:
+            self._file.close()
+
+    def readall(self):
+        return b''.join(self.chunks())
+
+    def readinto(self, stream):
+        written = 0
+        for chunk in self.chunks():
+            stream.write(chunk)
+            written += len(chunk)
+        return written
+
+
+def _to_bytes(data):
+    """Normalize upload payloads (str, bytes or file-like) to bytes"""
+    if isinstance(data, str):
+        return data.encode('utf-8')
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        return bytes(data)
+    if hasattr(data, 'read'):
+        content = data.read()
+        return content.encode('utf-8') if isinstance(content, str) else bytes(content)
+    raise TypeError(f"Unsupported upload data type: {type(data).__name__}")
+
+
+def _normalize_path(path):
+    return '/'.join(part for part in str(path).replace('\\', '/').split('/') if part)
+
+
+def _check_write_conditions(path, current, overwrite, etag, match_condition):
+    """Apply ADLS conditional-write semantics against the current file properties"""
+    if match_condition == MatchConditions.IfNotModified:
+        if current is None or current.etag != etag:
+            raise ResourceModifiedError(f"The condition specified using HTTP conditional header(s) is not met: {path}")
+    elif match_condition == MatchConditions.IfModified:
+        if current is not None and current.etag == etag:
+            raise ResourceModifiedError(f"The condition specified using HTTP conditional header(s) is not met: {path}")
+    elif match_condition == MatchConditions.IfPresent:
+        if current is None:
+            raise ResourceNotFoundError(f"The specified path does not exist: {path}")
+    elif match_condition == MatchConditions.IfMissing or not overwrite:
+        if current is not None:
+            raise ResourceExistsError(f"The specified path already exists: {path}")
+
+
+class LocalFileClient:
+    """File client bound to one path of a local backend"""
+
+    def __init__(self, backend, path):
+        self._backend = backend
+        self.path_name = _normalize_path(path)
+
+    def get_file_properties(self, **kwargs):
+        self._backend._inject_latency()
+        return self._backend._stat(self.path_name)
+
+    def download_file(self, offset=None, length=None, etag=None, match_condition=None, **kwargs):
+        self._backend._inject_latency()
+        # Conditional GET: nothing is transferred while the caller's copy is current
+        if match_condition == MatchConditions.IfModified:
+            current = self._backend._stat_or_none(self.path_name)
+            if current is not None and current.etag == etag:
+                raise ResourceNotModifiedError(f"The condition specified using HTTP conditional header(s) is not met: {self.path_name}")
+        return self._backend._open_download(self.path_name, offset, length)
+
+    def upload_data(self, data, overwrite=False, etag=None, match_condition=None, chunk_size=None, **kwargs):
+        self._backend._inject_latency()
+        # Transfer the content first; the lock only covers the condition check and the swap-in,
+        # so a long streamed upload never holds it long enough to look stale
+        staged = self._backend._stage(self.path_name, data, chunk_size or 4 * 1024 * 1024)
+        try:
+            with self._backend._path_lock(self.path_name):
+                current = self._backend._stat_or_none(self.path_name)
+                _check_write_conditions(self.path_name, current, overwrite, etag, match_condition)
+                properties = self._backend._commit(self.path_name, staged)
+        except BaseException:
+            self._backend._discard(staged)
+            raise
+        return {'etag': properties.etag, 'last_modified': properties.last_modified}
+
+    def delete_file(self, etag=None, match_condition=None, **kwargs):
+        self._backend._inject_latency()
+        with self._backend._path_lock(self.path_name):
+            if match_condition is not None:
+                current = self._backend._stat_or_none(self.path_name)
+                _check_write_conditions(self.path_name, current, True, etag, match_condition)
+            self._backend._delete(self.path_name)
+
+
+class LocalDirectoryClient:
+    """Directory client bound to one prefix of a local backend"""
+
+    def __init__(self, backend, path):
+        self._backend = backend
+        self.path_name = _normalize_path(path)
+
+    def get_paths(self, recursive=True, **kwargs):
+        return self._backend.get_paths(path=self.path_name, recursive=recursive)
+
+    def get_file_client(self, file_name):
+        return LocalFileClient(self._backend, f"{self.path_name}/{file_name}")
+
+    def create_directory(self, **kwargs):
+        return self._backend.create_directory(self.path_name)
+
+
+class StorageBackend:
+    """Common file-system-client surface for the local stand-ins"""
+
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, seed=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self._random = random.Random(seed)
+        self._lock = threading.RLock()
+
+    # Public surface mirroring FileSystemClient
+
+    def create_file_system(self, **kwargs):
+        self._inject_latency()
+
+    def get_file_system_properties(self, **kwargs):
+        self._inject_latency()
+        return {'name': self.__class__.__name__}
+
+    def create_directory(self, directory, **kwargs):
+        self._inject_latency()
+        self._make_directory(_normalize_path(directory))
+        return self.get_directory_client(directory)
+
+    def get_file_client(self, file_path):
+        return LocalFileClient(self, file_path)
+
+    def get_directory_client(self, directory):
+        return LocalDirectoryClient(self, directory)
+
+    def get_paths(self, path=None, recursive=True, **kwargs):
+        self._inject_latency()
+        prefix = _normalize_path(path or '')
+        entries = self._list(prefix)
+        if not recursive:
+            depth = prefix.count('/') + 1 if prefix else 0
+            entries = [entry for entry in entries if entry.name.count('/') == depth]
+        return iter(entries)
+
+    # Latency injection
+
+    def _inject_latency(self):
+        if not self.latency_ms and not self.jitter_ms:
+            return
+        with self._lock:
+            jitter = self._random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0
+        delay = max(0.0, self.latency_ms + jitter) / 1000.0
+        if delay:
+            time.sleep(delay)
+
+    # Locking used by conditional writes
+
+    @contextmanager
+    def _path_lock(self, path):
+        with self._lock:
+            yield
+
+    def _stat_or_none(self, path):
+        try:
+            return self._stat(path)
+        except ResourceNotFoundError:
+            return None
+
+    # Streaming hooks; the defaults buffer the whole file
+
+    def _open_download(self, path, offset=None, length=None):
+        data, properties = self._read(path)
+        if offset is not None:
+            end = offset + length if length is not None else None
+            data = data[offset:end]
+        return StorageDownloader(data, properties)
+
+    def _stage(self, path, data, chunk_size):
+        """Receive upload content before it is committed; returns a handle for _commit/_discard"""
+        return _to_bytes(data)
+
+    def _commit(self, path, staged):
+        return self._write(path, staged)
+
+    def _discard(self, staged):
+        pass
+
+    # Storage primitives implemented by subclasses
+
+    def _read(self, path):
+        raise NotImplementedError
+
+    def _write(self, path, content):
+        raise NotImplementedError
+
+    def _delete(self, path):
+        raise NotImplementedError
+
+    def _stat(self, path):
+        raise NotImplementedError
+
+    def _exists(self, path):
+        raise NotImplementedError
+
+    def _list(self, prefix):
+        raise NotImplementedError
+
+    def _make_directory(self, path):
+        raise NotImplementedError
+
+
+class InMemoryStorageBackend(StorageBackend):
+    """Process-local storage kept in a dict; fast and disposable"""
+
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, seed=None):
+        super().__init__(latency_ms, jitter_ms, seed)
+        self._files = {}
+        self._directories = set()
+        self._version = 0
+
+    def _next_properties(self, path, size):
+        self._version += 1
+        return FileProperties(
+            name=path,
+            size=size,
+            last_modified=datetime.now(timezone.utc),
+            etag=f'"0x{self._version:016X}"'
+        )
+
+    def _read(self, path):
+        with self._lock:
+            if path not in self._files:
+                raise ResourceNotFoundError(f"The specified path does not exist: {path}")
+            return self._files[path]
+
+    def _write(self, path, content):
+        with self._lock:
+            properties = self._next_properties(path, len(content))
+            self._files[path] = (content, properties)
+            parent = path.rsplit('/', 1)[0] if '/' in path else ''
+            if parent:
+                self._make_directory(parent)
+            return properties
+
+    def _delete(self, path):
+        with self._lock:
+            if self._files.pop(path, None) is None:
+                raise ResourceNotFoundError(f"The specified path does not exist: {path}")
+
+    def _stat(self, path):
+        return self._read(path)[1]
+
+    def _exists(self, path):
+        with self._lock:
+            return path in self._files
+
+    def _list(self, prefix):
+        base = f"{prefix}/" if prefix else ''
+        with self._lock:
+            entries = [
+                PathProperties(name, True, None)
+                for name in self._directories if name.startswith(base)
+            ]
+            entries.extend(
+                PathProperties(name, False, props.last_modified, props.size, props.etag)
+                for name, (_, props) in self._files.items() if name.startswith(base)
+            )
+        return sorted(entries, key=lambda entry: entry.name)
+
+    def _make_directory(self, path):
+        with self._lock:
+            parts = path.split('/')
+            for i in range(1, len(parts) + 1):
+                self._directories.add('/'.join(parts[:i]))
+
+
+class LocalFileSystemBackend(StorageBackend):
+    """Storage rooted in a local directory; survives restarts and is shareable across processes"""
+
+    # Lock files older than this are assumed to belong to a crashed writer (locks are held for one
+    # file operation); capped below lock_timeout so a waiter breaks a stale lock before giving up
+    STALE_LOCK_SECONDS = 5.0
+
+    def __init__(self, root, latency_ms=0.0, jitter_ms=0.0, seed=None, lock_timeout=10.0):
+        super().__init__(latency_ms, jitter_ms, seed)
+        self.root = os.path.abspath(root)
+        self.lock_timeout = lock_timeout
+        self.stale_lock_seconds = min(self.STALE_LOCK_SECONDS, lock_timeout / 2)
+        os.makedirs(self.root, exist_ok=True)
+
+    @contextmanager
+    def _path_lock(self, path):
+        """Exclusive lock on one path shared by threads and processes (via an O_EXCL lock file)"""
+        lock_path = f"{self._full_path(path)}.lock"
+        os.makedirs(os.path.dirname(lock_path), exist_ok=True)
+        deadline = time.monotonic() + self.lock_timeout
+
+        while True:
+            try:
+                fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                stat_result = os.fstat(fd)
+                os.close(fd)
+                identity = self._lock_identity(stat_result)
+                break
+            except FileExistsError:
+                try:
+                    stat_result = os.stat(lock_path)
+                except FileNotFoundError:
+                    continue
+                if time.time() - stat_result.st_mtime > self.stale_lock_seconds:
+                    if self._remove_lock(lock_path, self._lock_identity(stat_result)):
+                        logging.warning(f"Broke stale lock on {path}")
+                    continue
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"Timed out waiting for lock on {path}")
+                time.sleep(0.001 + self._random.random() * 0.004)
+
+        try:
+            yield
+        finally:
+            # Only our own lock file: if it was broken as stale, another writer may hold a new one
+            self._remove_lock(lock_path, identity)
+
+    @staticmethod
+    def _lock_identity(stat_result):
+        # The creation mtime tells a new lock apart from an old one that reused the inode
+        return (stat_result.st_dev, stat_result.st_ino, stat_result.st_mtime_ns)
+
+    def _remove_lock(self, lock_path, identity):
+        """Remove lock_path only if it is still the lock file `identity`; returns True if removed"""
+        # Renaming is atomic: whatever file we moved aside is no longer anyone's lock, so check it there
+        moved_path = f"{lock_path}.{uuid.uuid4().hex}.lock"
+        try:
+            os.rename(lock_path, moved_path)
+        except FileNotFoundError:
+            return False
+        try:
+            stat_result = os.stat(moved_path)
+            if self._lock_identity(stat_result) == identity:
+                return True
+            # A newer lock was taken after we looked; put it back unless yet another writer got in
+            try:
+                os.link(moved_path, lock_path)
+            except FileExistsError:
+                logging.warning(f"Lock {lock_path} changed hands while being checked")
+            return False
+        finally:
+            os.remove(moved_path)
+
+    def _full_path(self, path):
+        return os.path.join(self.root, *path.split('/')) if path else self.root
+
+    def _properties(self, path, stat_result):
+        return FileProperties(
+            name=path,
+            size=stat_result.st_size,
+            last_modified=datetime.fromtimestamp(stat_result.st_mtime, tz=timezone.utc),
+            # Each write replaces the file, so the inode changes even within one mtime tick
+            etag=f'"0x{stat_result.st_mtime_ns:X}{stat_result.st_size:X}{stat_result.st_ino:X}"'
+        )
+
+    def _read(self, path):
+        full_path = self._full_path(path)
+        try:
+            with open(full_path, 'rb') as f:
+                data = f.read()
+                stat_result = os.fstat(f.fileno())
+        except (FileNotFoundError, IsADirectoryError):
+            raise ResourceNotFoundError(f"The specified path does not exist: {path}")
+        return data, self._properties(path, stat_result)
+
+    def _write(self, path, content):
+        full_path = self._full_path(path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        temp_path = f"{full_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(content)
+        os.replace(temp_path, full_path)
+        return self._properties(path, os.stat(full_path))
+
+    def _stage(self, path, data, chunk_size):
+        # Written to a private temp file next to the target, so the commit is a rename
+        full_path = self._full_path(path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        temp_path = f"{full_path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(temp_path, 'wb') as f:
+                if hasattr(data, 'read'):
+                    while True:
+                        chunk = data.read(chunk_size)
+                        if not chunk:
+                            break
+                        f.write(chunk.encode('utf-8') if isinstance(chunk, str) else chunk)
+                else:
+                    f.write(_to_bytes(data))
+        except BaseException:
+            self._discard(temp_path)
+            raise
+        return temp_path
+
+    def _commit(self, path, staged):
+        full_path = self._full_path(path)
+        os.replace(staged, full_path)
+        return self._properties(path, os.stat(full_path))
+
+    def _discard(self, staged):
+        try:
+            os.remove(staged)
+        except FileNotFoundError:
+            pass
+
+    def _open_download(self, path, offset=None, length=None):
+        try:
+            file_obj = open(self._full_path(path), 'rb')
+        except (FileNotFoundError, IsADirectoryError):
+            raise ResourceNotFoundError(f"The specified path does not exist: {path}")
+        properties = self._properties(path, os.fstat(file_obj.fileno()))
+        return FileStorageDownloader(file_obj, properties, offset, length)
+
+    def _delete(self, path):
+        try:
+            os.remove(self._full_path(path))
+        except FileNotFoundError:
+            raise ResourceNotFoundError(f"The specified path does not exist: {path}")
+
+    def _stat(self, path):
+        full_path = self._full_path(path)
+        if not os.path.isfile(full_path):
+            raise ResourceNotFoundError(f"The specified path does not exist: {path}")
+        return self._properties(path, os.stat(full_path))
+
+    def _exists(self, path):
+        return os.path.isfile(self._full_path(path))
+
+    def _list(self, prefix):
+        start = self._full_path(prefix)
+        if not os.path.isdir(start):
+            raise ResourceNotFoundError(f"The specified path does not exist: {prefix}")
+
+        entries = []
+        for dir_path, dir_names, file_names in os.walk(start):
+            relative_dir = os.path.relpath(dir_path, self.root).replace(os.sep, '/')
+            relative_dir = '' if relative_dir == '.' else relative_dir
+            for dir_name in dir_names:
+                entries.append(PathProperties(f"{relative_dir}/{dir_name}".lstrip('/'), True, None))
+            for file_name in file_names:
+                if file_name.endswith(('.tmp', '.lock')):
+                    continue
+                name = f"{relative_dir}/{file_name}".lstrip('/')
+                try:
+                    props = self._properties(name, os.stat(os.path.join(dir_path, file_name)))
+                except FileNotFoundError:
+                    continue
+                entries.append(PathProperties(name, False, props.last_modified, props.size, props.etag))
+        return sorted(entries, key=lambda entry: entry.name)
+
+    def _make_directory(self, path):
+        os.makedirs(self._full_path(path), exist_ok=True)
+
+
+_memory_backends = {}
+_memory_backends_lock = threading.Lock()
+
+
+def get_memory_backend(name='default', latency_ms=0.0, jitter_ms=0.0):
+    """Return a named in-memory backend shared by every caller in this process"""
+    with _memory_backends_lock:
+        if name not in _memory_backends:
+            _memory_backends[name] = InMemoryStorageBackend(latency_ms, jitter_ms)
+        return _memory_backends[name]
+
+
+def create_storage_backend(config):
+    """Create the local backend selected by STORAGE_BACKEND ('local' or 'memory')"""
+    backend_type = config.STORAGE_BACKEND
+    if backend_type == 'memory':
+        backend = get_memory_backend(config.ADLS_FILESYSTEM_NAME, config.STORAGE_LATENCY_MS, config.STORAGE_JITTER_MS)
+    elif backend_type == 'local':
+        backend = LocalFileSystemBackend(
+            os.path.join(config.LOCAL_STORAGE_PATH, config.ADLS_FILESYSTEM_NAME),
+            config.STORAGE_LATENCY_MS,
+            config.STORAGE_JITTER_MS
+        )
+    else:
+        raise ValueError(f"Unknown STORAGE_BACKEND '{backend_type}'. Use 'adls', 'local' or 'memory'.")
+
+    logging.info(f"Using {backend_type} storage backend for {config.ADLS_FILESYSTEM_NAME}")
+    return backend
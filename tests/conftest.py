@@ -0,0 +1,96 @@
+"""
+Shared fixtures: every test runs offline against the local storage stand-in
+and a SQLite database in its own temporary directory.
+"""
+import pytest
+
+import client_registry
+
+OFFLINE_ENV = {
+    'DOCUMENT_INTELLIGENCE_ENDPOINT': 'https://tests.invalid/',
+    'DOCUMENT_INTELLIGENCE_KEY': 'tests',
+    'ADLS_ACCOUNT_NAME': 'tests',
+    'ADLS_ACCOUNT_KEY': 'tests',
+    'ADLS_FILESYSTEM_NAME': 'tests',
+    'STORAGE_BACKEND': 'local',
+    'QUERY_BACKEND': 'adls',
+    'PERSISTENCE_MODE': 'adls',
+    'STORAGE_LATENCY_MS': '0',
+    'INDEX_RETRY_BACKOFF_MS': '1',
+}
+
+
+@pytest.fixture(autouse=True)
+def offline_env(tmp_path, monkeypatch):
+    """Point Config at files under tmp_path and rebuild the shared clients"""
+    for name, value in OFFLINE_ENV.items():
+        monkeypatch.setenv(name, value)
+    monkeypatch.setenv('LOCAL_STORAGE_PATH', str(tmp_path / 'storage'))
+    monkeypatch.setenv('INDEX_JOURNAL_DIR', str(tmp_path / 'journal'))
+    monkeypatch.setenv('PERSISTENCE_OUTBOX_PATH', str(tmp_path / 'outbox' / 'persistence.jsonl'))
+    monkeypatch.setenv('SQL_CONNECTION_STRING', f"sqlite:///{tmp_path / 'tests.db'}")
+    for name in ('OPENAI_API_KEY', 'OPENAI_BASE_URL', 'AZURE_OPENAI_API_KEY', 'AZURE_OPENAI_ENDPOINT'):
+        monkeypatch.delenv(name, raising=False)
+
+    client_registry.reset()
+    yield tmp_path
+    client_registry.reset()
+
+
+@pytest.fixture
+def adls_handler():
+    """ADLSHandler on the local file system backend"""
+    from adls_handler import ADLSHandler
+    return ADLSHandler()
+
+
+@pytest.fixture
+def database():
+    """DatabaseHandler on a fresh SQLite database with the schema applied"""
+    from database_handler import DatabaseHandler
+    database = DatabaseHandler()
+    assert database.initialize_schema()
+    yield database
+    database.close()
+
+
+class StubExtractor:
+    """Stands in for DocumentIntelligenceHandler: returns fixed fields per file, or fails on request"""
+
+    def __init__(self, fail=(), delay=0.0):
+        self.fail = set(fail)
+        self.delay = delay
+        self.calls = []
+
+    def extract_personal_info(self, pdf_stream):
+        import time
+        content = pdf_stream.read()
+        name = content.decode('latin-1').split('name=')[-1].strip()
+        self.calls.append(name)
+        if self.delay:
+            time.sleep(self.delay)
+        if name in self.fail:
+            return None
+        return {'first_name': name.title(), 'last_name': 'Tester', 'email': f"{name}@example.com",
+                'document_type': 'Resume', 'confidence_score': 0.9}
+
+
+@pytest.fixture
+def make_pipeline(adls_handler):
+    """Build an IngestionPipeline over the local handler with a StubExtractor"""
+    from ingestion import IngestionPipeline
+    from persistence import create_persistence_sink
+
+    def build(handler=None, **extractor_options):
+        handler = handler or adls_handler
+        extractor = StubExtractor(**extractor_options)
+        pipeline = IngestionPipeline(handler, extractor, create_persistence_sink(handler.config, handler))
+        return pipeline, extractor
+    return build
+
+
+def upload_pdfs(adls_handler, names):
+    """Upload tiny stand-in PDFs whose content names the person StubExtractor returns"""
+    for name in names:
+        assert adls_handler.upload_pdf(f"{name}.pdf", f"%PDF-1.4 name={name}".encode('latin-1'))
+    return [f"{name}.pdf" for name in names]
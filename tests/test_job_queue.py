@@ -0,0 +1,98 @@
+"""
+SQLite job queue: abandoned jobs resume after their finished files under the
+stored e_file_ids, a worker whose job was taken over stops, and batched index
+records land before a job reports DONE.
+"""
+import json
+import time
+
+import pytest
+
+from conftest import upload_pdfs
+from job_queue import DONE, RUNNING, JobLostError, JobQueue
+
+
+def wait_for(queue, job_id, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = queue.get(job_id)
+        if job['status'] not in ('queued', RUNNING):
+            return job
+        time.sleep(0.05)
+    pytest.fail(f"Job {job_id} did not finish")
+
+
+def index_records(adls_handler):
+    return {record['file_name']: record for record in adls_handler._load_search_index()[0]['records']}
+
+
+def test_abandoned_job_resumes_with_stored_e_file_ids(tmp_path, adls_handler, make_pipeline):
+    files = upload_pdfs(adls_handler, ['alice', 'bob', 'carol'])
+    pipeline, extractor = make_pipeline()
+    queue = JobQueue(str(tmp_path / 'jobs.db'), pipeline, workers=1, stale_seconds=1, poll_interval=0.05)
+    job_id = queue.submit(files)
+
+    # A worker that finished alice, started bob and then died
+    finished = [{'file_name': 'alice.pdf', 'status': 'processed', 'e_file_id': 'alice-id', 'error': None}]
+    queue._connection().execute(
+        "UPDATE ingestion_jobs SET status = ?, worker = 'dead', heartbeat_at = ?, results = ?, completed = 1, "
+        "current_file = 'bob.pdf', e_file_ids = ? WHERE id = ?",
+        (RUNNING, time.time() - 60, json.dumps(finished), json.dumps({'alice.pdf': 'alice-id', 'bob.pdf': 'bob-id'}), job_id)
+    )
+
+    queue.start()
+    try:
+        job = wait_for(queue, job_id)
+    finally:
+        queue.stop()
+
+    assert job['status'] == DONE and job['completed'] == 3 and job['failed'] == 0
+    assert extractor.calls == ['bob', 'carol']
+    results = {result['file_name']: result['e_file_id'] for result in job['results']}
+    assert results['bob.pdf'] == 'bob-id'
+    assert index_records(adls_handler)['bob.pdf']['e_file_id'] == 'bob-id'
+
+
+def test_worker_stops_when_job_is_taken_over(tmp_path, adls_handler, make_pipeline):
+    files = upload_pdfs(adls_handler, ['alice', 'bob'])
+    pipeline, extractor = make_pipeline()
+    path = str(tmp_path / 'jobs.db')
+    first = JobQueue(path, pipeline, stale_seconds=1)
+    second = JobQueue(path, pipeline, stale_seconds=1)
+    job_id = first.submit(files)
+
+    old = first._claim()
+    # Its heartbeats stopped, so the next claim requeues the job and hands it to another worker
+    first._connection().execute("UPDATE ingestion_jobs SET heartbeat_at = 0 WHERE id = ?", (job_id,))
+    new = second._claim()
+    assert new['id'] == job_id and new['worker'] != old['worker']
+
+    with pytest.raises(JobLostError):
+        first._run(old)
+    assert extractor.calls == []
+
+    second._run(new)
+    job = second.get(job_id)
+    assert job['status'] == DONE and job['completed'] == 2 and job['worker'] == new['worker']
+    assert sorted(index_records(adls_handler)) == files
+
+
+def test_batched_job_writes_index_once_before_done(tmp_path, adls_handler, make_pipeline, monkeypatch):
+    files = upload_pdfs(adls_handler, [f"person{index}" for index in range(6)])
+    adls_handler.enable_index_batching(max_records=100, max_delay=60)
+    writes = []
+    modify = adls_handler._modify_search_index
+    monkeypatch.setattr(adls_handler, '_modify_search_index', lambda mutator: writes.append(1) or modify(mutator))
+
+    pipeline, _ = make_pipeline()
+    queue = JobQueue(str(tmp_path / 'jobs.db'), pipeline, workers=1, poll_interval=0.05)
+    job_id = queue.submit(files)
+    queue.start()
+    try:
+        job = wait_for(queue, job_id)
+        assert job['status'] == DONE
+        assert len(writes) == 1
+        assert sorted(index_records(adls_handler)) == files
+    finally:
+        queue.stop()
+        adls_handler.close_index_batching()
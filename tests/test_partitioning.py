@@ -0,0 +1,103 @@
+"""
+Partition leases on the local storage stand-in: a live lease excludes other
+nodes, an expired one is taken over under the same e_file_id, and several
+processes draining one pdfs/ directory settle every file exactly once.
+"""
+import json
+import multiprocessing
+import time
+
+from conftest import upload_pdfs
+from partitioning import ClaimStore, HashRing, PartitionedWorker
+
+
+def test_hash_ring_moves_only_the_departed_share():
+    files = [f"file_{index}.pdf" for index in range(300)]
+    before = HashRing(['a', 'b', 'c'])
+    after = HashRing(['a', 'b'])
+    moved = [name for name in files if before.owner(name) != after.owner(name)]
+    assert moved and all(before.owner(name) == 'c' for name in moved)
+
+
+def test_live_lease_blocks_other_nodes(adls_handler):
+    node_a = ClaimStore(adls_handler, 'node-a', lease_seconds=30)
+    node_b = ClaimStore(adls_handler, 'node-b', lease_seconds=30)
+    claim = node_a.try_claim('x.pdf')
+    assert claim is not None
+    assert node_b.try_claim('x.pdf') is None
+    assert node_a.renew(claim) is not None
+
+
+def test_expired_lease_is_taken_over_with_same_e_file_id(adls_handler):
+    node_a = ClaimStore(adls_handler, 'node-a', lease_seconds=0.2)
+    node_b = ClaimStore(adls_handler, 'node-b', lease_seconds=30)
+    claim_a = node_a.try_claim('x.pdf')
+    time.sleep(0.3)
+
+    claim_b = node_b.try_claim('x.pdf')
+    assert claim_b['e_file_id'] == claim_a['e_file_id']
+    assert claim_b['attempts'] == claim_a['attempts'] + 1
+    # The old holder finds out at its next renewal and cannot release the new lease
+    assert node_a.renew(claim_a) is None
+    node_a._release(claim_a)
+    assert node_a.try_claim('x.pdf') is None
+
+    node_b.complete(claim_b)
+    assert node_b.settled() == {'x.pdf'}
+    assert node_a.try_claim('x.pdf') is None
+
+
+def test_failed_attempts_back_off_then_settle(adls_handler):
+    node = ClaimStore(adls_handler, 'node-a', lease_seconds=30, max_attempts=2, backoff_seconds=0.1)
+    claim = node.try_claim('x.pdf')
+    node.fail(claim, 'boom')
+    assert node.try_claim('x.pdf') is None
+    time.sleep(0.15)
+
+    claim = node.try_claim('x.pdf')
+    assert claim['attempts'] == 2
+    node.fail(claim, 'boom')
+    assert node.settled() == {'x.pdf'}
+
+
+def _run_node(node_id):
+    """One node process: drain the shared backlog once"""
+    from adls_handler import ADLSHandler
+    from conftest import StubExtractor
+    from ingestion import IngestionPipeline
+    from persistence import PersistenceSink
+
+    handler = ADLSHandler()
+    pipeline = IngestionPipeline(handler, StubExtractor(fail={'bad'}, delay=0.01), PersistenceSink(handler))
+    worker = PartitionedWorker(pipeline, handler, node_id=node_id, lease_seconds=30, poll_interval=0.1,
+                               max_attempts=2, backoff_seconds=0.05)
+    worker.run(once=True)
+
+
+def test_processes_settle_every_file_exactly_once(adls_handler):
+    names = [f"person{index:02d}" for index in range(24)] + ['bad']
+    upload_pdfs(adls_handler, names)
+
+    context = multiprocessing.get_context('spawn')
+    processes = [context.Process(target=_run_node, args=(f"node-{index}",)) for index in range(3)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(120)
+        assert process.exitcode == 0
+
+    claims = ClaimStore(adls_handler, 'checker')
+    assert claims.settled() == {f"{name}.pdf" for name in names}
+    assert claims._list(claims.nodes_directory) == []
+
+    records = adls_handler._load_search_index()[0]['records']
+    assert sorted(record['file_name'] for record in records) == sorted(f"{name}.pdf" for name in names if name != 'bad')
+    for record in records:
+        marker, _ = claims._read(claims._path(record['file_name'], '.done'))
+        assert marker['e_file_id'] == record['e_file_id']
+
+    failed, _ = claims._read(claims._path('bad.pdf', '.failed'))
+    assert failed['attempts'] == 2 and failed['error'] == 'Failed to extract information'
+    assert json.loads(claims.filesystem_client.get_file_client(
+        f"{adls_handler.config.EXTRACTED_DATA_DIRECTORY}/{records[0]['e_file_id']}.json"
+    ).download_file().readall())['source_file'] == records[0]['file_name']
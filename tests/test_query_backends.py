@@ -0,0 +1,97 @@
+"""
+ADLSQueryBackend and SQLQueryBackend must give the same answers for the same
+records, and SQL keyset paging must visit every row exactly once.
+"""
+import pytest
+
+from query_backends import ADLSQueryBackend, SQLQueryBackend
+
+PEOPLE = [
+    ('Ann', 'Lee', 'ann.lee@example.com', 'Passport', 0.91),
+    ('Anna', 'Smith', 'ANNA.SMITH@Example.com', 'Resume', 0.72),
+    ('John', 'Smith', 'john.smith@hospital.org', 'Id Card', 0.65),
+    ('Joanna', 'Ann', None, 'ID_Card', 0.88),
+    ('100%', 'Certain', 'certain@mail.test', None, 0.99),
+    ('Under_Score', 'Name', 'under_score@mail.test', 'Driver License', 0.5),
+    ('Grace', None, None, 'Resume', 0.8),
+]
+
+
+@pytest.fixture
+def backends(adls_handler, database, monkeypatch):
+    """Both backends over the same records, written through the dual persistence sink"""
+    from persistence import PersistenceSink
+
+    sink = PersistenceSink(adls_handler, database)
+    for index, (first_name, last_name, email, document_type, score) in enumerate(PEOPLE):
+        personal_info = {'first_name': first_name, 'last_name': last_name, 'email': email,
+                         'document_type': document_type, 'confidence_score': score}
+        assert sink.save(f"person_{index}.pdf", personal_info, f"id-{index}")
+    return ADLSQueryBackend(adls_handler), SQLQueryBackend(database, adls_handler)
+
+
+def ids(records):
+    return sorted(record['e_file_id'] for record in records)
+
+
+@pytest.mark.parametrize('email', ['smith', '@example.com', 'ANNA', 'under_', '%', 'nobody'])
+def test_search_by_email_parity(backends, email):
+    adls, sql = backends
+    assert ids(sql.search_by_email(email)) == ids(adls.search_by_email(email))
+
+
+@pytest.mark.parametrize('name', ['ann', 'ANN LEE', 'smith', '%', '_', 'under_score', 'grace'])
+def test_search_by_name_parity(backends, name):
+    adls, sql = backends
+    assert ids(sql.search_by_name(name)) == ids(adls.search_by_name(name))
+
+
+def test_wildcards_match_literally(backends):
+    _, sql = backends
+    assert ids(sql.search_by_name('%')) == ['id-4']
+    assert ids(sql.search_by_name('_')) == ['id-5']
+    assert ids(sql.records_by_type('_')) == ['id-3']
+
+
+@pytest.mark.parametrize('doc_type', ['resume', 'card', 'id_card', 'license', 'visa'])
+def test_records_by_type_parity(backends, doc_type):
+    adls, sql = backends
+    assert ids(sql.records_by_type(doc_type)) == ids(adls.records_by_type(doc_type))
+
+
+def test_aggregate_parity(backends):
+    adls, sql = backends
+    assert sql.count_records() == adls.count_records() == len(PEOPLE)
+    assert sql.count_people() == adls.count_people()
+    assert sql.document_type_counts() == adls.document_type_counts()
+
+    sql_stats, adls_stats = sql.confidence_stats(), adls.confidence_stats()
+    assert sql_stats['count'] == adls_stats['count']
+    for key in ('average', 'min', 'max'):
+        assert sql_stats[key] == pytest.approx(adls_stats[key])
+
+
+def test_keyset_paging_visits_every_row_once(database):
+    items = [(f"file_{index}.pdf", {'first_name': f"P{index}", 'confidence_score': 0.5}, f"page-{index:02d}")
+             for index in range(25)]
+    assert len(database.upsert_many(items)) == 25
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        records, cursor = database.get_records_page(page_size=7, after=cursor)
+        seen.extend(record['e_file_id'] for record in records)
+        pages += 1
+        if cursor is None:
+            break
+
+    assert pages == 4
+    assert len(seen) == len(set(seen)) == 25
+    # Same order as a full newest-first scan
+    assert seen == [row['e_file_id'] for row in database.iter_records(batch_size=4, columns=['e_file_id'])]
+
+
+def test_upsert_replaces_by_e_file_id(database):
+    database.upsert_many([('a.pdf', {'first_name': 'Old'}, 'same-id')])
+    database.upsert_many([('a.pdf', {'first_name': 'New'}, 'same-id')])
+    assert database.execute_scalar("SELECT COUNT(*) FROM PersonalInformation") == 1
+    assert database.get_personal_info_by_efile_id('same-id')['first_name'] == 'New'
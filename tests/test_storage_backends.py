@@ -0,0 +1,125 @@
+"""
+Conditional writes and locking on LocalFileSystemBackend, and the search
+index If-Match retry loop built on them, across threads and processes.
+"""
+import multiprocessing
+import os
+import threading
+import time
+
+import pytest
+
+from storage_backends import (LocalFileSystemBackend, MatchConditions, ResourceExistsError, ResourceModifiedError,
+                              ResourceNotFoundError, ResourceNotModifiedError)
+
+
+@pytest.fixture
+def backend(tmp_path):
+    return LocalFileSystemBackend(str(tmp_path / 'backend'), lock_timeout=4.0)
+
+
+def test_create_if_absent(backend):
+    file_client = backend.get_file_client('metadata/a.json')
+    file_client.upload_data(b'first', overwrite=False)
+    with pytest.raises(ResourceExistsError):
+        file_client.upload_data(b'second', overwrite=False)
+    assert file_client.download_file().readall() == b'first'
+
+
+def test_if_match_rejects_stale_etag(backend):
+    file_client = backend.get_file_client('metadata/a.json')
+    etag = file_client.upload_data(b'v1', overwrite=True)['etag']
+    newer = file_client.upload_data(b'v2', overwrite=True, etag=etag, match_condition=MatchConditions.IfNotModified)['etag']
+    assert newer != etag
+
+    with pytest.raises(ResourceModifiedError):
+        file_client.upload_data(b'v3', overwrite=True, etag=etag, match_condition=MatchConditions.IfNotModified)
+    with pytest.raises(ResourceModifiedError):
+        file_client.delete_file(etag=etag, match_condition=MatchConditions.IfNotModified)
+    assert file_client.download_file().readall() == b'v2'
+
+
+def test_conditional_get(backend):
+    file_client = backend.get_file_client('metadata/a.json')
+    etag = file_client.upload_data(b'v1', overwrite=True)['etag']
+    with pytest.raises(ResourceNotModifiedError):
+        file_client.download_file(etag=etag, match_condition=MatchConditions.IfModified)
+    file_client.upload_data(b'v2', overwrite=True)
+    assert file_client.download_file(etag=etag, match_condition=MatchConditions.IfModified).readall() == b'v2'
+
+
+def test_rejected_upload_leaves_no_staged_file(backend):
+    file_client = backend.get_file_client('metadata/a.json')
+    file_client.upload_data(b'v1', overwrite=True)
+    with pytest.raises(ResourceExistsError):
+        file_client.upload_data(b'v2', overwrite=False)
+    assert os.listdir(os.path.join(backend.root, 'metadata')) == ['a.json']
+    with pytest.raises(ResourceNotFoundError):
+        backend.get_file_client('metadata/missing.json').download_file()
+
+
+def test_stale_lock_is_broken(backend):
+    lock_path = f"{backend._full_path('metadata/a.json')}.lock"
+    os.makedirs(os.path.dirname(lock_path), exist_ok=True)
+    open(lock_path, 'w').close()
+    stale = time.time() - backend.stale_lock_seconds - 1
+    os.utime(lock_path, (stale, stale))
+
+    backend.get_file_client('metadata/a.json').upload_data(b'v1', overwrite=True)
+    assert not os.path.exists(lock_path)
+
+
+def test_held_lock_makes_writers_wait(backend, caplog):
+    acquired, released = threading.Event(), threading.Event()
+
+    def hold():
+        with backend._path_lock('metadata/a.json'):
+            acquired.set()
+            time.sleep(0.2)
+            released.set()
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    acquired.wait()
+    backend.get_file_client('metadata/a.json').upload_data(b'v1', overwrite=True)
+    assert released.is_set()
+    holder.join()
+    assert 'Broke stale lock' not in caplog.text
+
+
+def _add_records(prefix, count):
+    """Append records one update at a time through the If-Match retry loop"""
+    from adls_handler import ADLSHandler
+    handler = ADLSHandler()
+    for index in range(count):
+        record = {'e_file_id': f"{prefix}-{index}"}
+        handler._modify_search_index(lambda index_data, record=record: index_data['records'].append(record))
+
+
+def _index_ids(adls_handler):
+    index_data, _ = adls_handler._load_search_index()
+    return [record['e_file_id'] for record in index_data['records']]
+
+
+def test_concurrent_index_updates_from_threads(adls_handler):
+    threads = [threading.Thread(target=_add_records, args=(f"t{n}", 15)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    ids = _index_ids(adls_handler)
+    assert len(ids) == len(set(ids)) == 60
+
+
+def test_concurrent_index_updates_from_processes(adls_handler):
+    context = multiprocessing.get_context('spawn')
+    processes = [context.Process(target=_add_records, args=(f"p{n}", 10)) for n in range(3)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(60)
+        assert process.exitcode == 0
+
+    ids = _index_ids(adls_handler)
+    assert len(ids) == len(set(ids)) == 30
@@ -0,0 +1,173 @@
+"""
+Incremental ingestion of new and changed PDFs.
+
+IngestionWatcher polls PDF_DIRECTORY with a single listing per cycle (the
+listing carries each file's ETag and last-modified time, so no per-file
+requests are made) and compares it against state stored in
+metadata/watcher_state.json: the ETag and e_file_id of every file already
+processed plus a last-modified high-water mark. Only files that are new or
+whose ETag changed are processed; a changed file is re-processed under its
+existing e_file_id, replacing the old record. Failures are retried with
+backoff on later cycles, up to `max_attempts` per file version.
+"""
+import json
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from metrics import metrics
+from storage_backends import ResourceNotFoundError
+
+
+def _timestamp(value):
+    """Listing timestamps as sortable ISO strings"""
+    return value.isoformat() if hasattr(value, 'isoformat') else str(value)
+
+
+class IngestionWatcher:
+    """Processes only the PDFs that changed since the last poll"""
+
+    def __init__(self, adls_handler, pipeline, poll_interval=5.0, workers=4, max_attempts=3,
+                 backoff_seconds=5.0, on_progress=None):
+        self.adls_handler = adls_handler
+        self.pipeline = pipeline
+        self.poll_interval = poll_interval
+        self.workers = max(1, workers)
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.on_progress = on_progress
+        self.state_path = f"{adls_handler.config.METADATA_DIRECTORY}/watcher_state.json"
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._stop = threading.Event()
+        self.state = self._load_state()
+
+    def _load_state(self):
+        file_client = self.adls_handler.filesystem_client.get_file_client(self.state_path)
+        try:
+            state = json.loads(file_client.download_file().readall())
+        except ResourceNotFoundError:
+            state = {}
+        state.setdefault('files', {})
+        state.setdefault('failures', {})
+        state.setdefault('high_water_mark', None)
+        return state
+
+    def _save_state(self):
+        # Serialize whole saves so an older snapshot never lands after a newer one
+        with self._save_lock:
+            with self._lock:
+                payload = json.dumps(self.state, default=str)
+            with metrics.timer('watcher_seconds', stage='save_state'):
+                self.adls_handler.filesystem_client.get_file_client(self.state_path).upload_data(payload, overwrite=True)
+
+    def baseline(self):
+        """Mark every PDF currently listed as seen without processing it"""
+        files = self.adls_handler.list_pdf_files()
+        with self._lock:
+            for pdf in files:
+                entry = self.state['files'].get(pdf['name'], {})
+                self.state['files'][pdf['name']] = {'etag': pdf['etag'], 'e_file_id': entry.get('e_file_id')}
+                self._advance_high_water_mark(pdf['last_modified'])
+        self._save_state()
+        return len(files)
+
+    def changes(self, files):
+        """Files from a listing that are new or changed and not backing off after a failure"""
+        now = time.time()
+        high_water_mark = self.state['high_water_mark']
+        delta = []
+        with self._lock:
+            for pdf in files:
+                seen = self.state['files'].get(pdf['name'])
+                # Anything modified after the mark is new; older files only if their ETag changed
+                newer = high_water_mark is None or _timestamp(pdf['last_modified']) > high_water_mark
+                if seen and seen['etag'] == pdf['etag'] and not newer:
+                    continue
+                failure = self.state['failures'].get(pdf['name'])
+                if failure and failure['etag'] == pdf['etag']:
+                    if failure['attempts'] >= self.max_attempts or failure['retry_at'] > now:
+                        continue
+                delta.append(pdf)
+        return delta
+
+    def poll(self):
+        """One cycle: list, diff and process the delta; returns the number of files processed"""
+        with metrics.timer('watcher_seconds', stage='list'):
+            files = self.adls_handler.list_pdf_files()
+        delta = self.changes(files)
+
+        # Forget files that were deleted from the directory (an empty listing may be a failed one)
+        listed = {pdf['name'] for pdf in files}
+        with self._lock:
+            removed = [name for name in self.state['files'] if files and name not in listed]
+            for name in removed:
+                del self.state['files'][name]
+        if removed:
+            self._save_state()
+
+        metrics.set_gauge('watcher_pending_files', len(delta))
+        if not delta:
+            return 0
+
+        logging.info(f"Watcher found {len(delta)} new or changed PDF(s)")
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(delta)), thread_name_prefix='watcher') as executor:
+            return sum(executor.map(self._process, delta))
+
+    def _process(self, pdf):
+        name = pdf['name']
+        with self._lock:
+            previous = self.state['files'].get(name) or {}
+        # A changed file replaces its earlier record instead of adding a second one
+        e_file_id = previous.get('e_file_id') or str(uuid.uuid4())
+
+        outcome = self.pipeline.process(name, e_file_id=e_file_id)
+        processed = outcome['status'] == 'processed'
+        with self._lock:
+            if processed:
+                self.state['files'][name] = {'etag': pdf['etag'], 'e_file_id': e_file_id,
+                                             'processed_at': datetime.now().isoformat()}
+                self.state['failures'].pop(name, None)
+                self._advance_high_water_mark(pdf['last_modified'])
+            else:
+                failure = self.state['failures'].get(name)
+                attempts = failure['attempts'] + 1 if failure and failure['etag'] == pdf['etag'] else 1
+                self.state['failures'][name] = {
+                    'etag': pdf['etag'],
+                    'attempts': attempts,
+                    'retry_at': time.time() + self.backoff_seconds * (2 ** (attempts - 1)),
+                    'error': outcome['error'] or outcome['status']
+                }
+        # Persist per file so a restart does not redo finished work
+        self._save_state()
+
+        metrics.inc('watcher_files_total', status=outcome['status'])
+        if processed and pdf['last_modified'] is not None and hasattr(pdf['last_modified'], 'timestamp'):
+            metrics.observe('watcher_lag_seconds', max(0.0, time.time() - pdf['last_modified'].timestamp()))
+        if self.on_progress:
+            self.on_progress(name, outcome)
+        return 1 if processed else 0
+
+    def _advance_high_water_mark(self, last_modified):
+        if last_modified is None:
+            return
+        value = _timestamp(last_modified)
+        if self.state['high_water_mark'] is None or value > self.state['high_water_mark']:
+            self.state['high_water_mark'] = value
+
+    def run(self):
+        """Poll until stopped"""
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                self.poll()
+            except Exception as e:
+                metrics.inc('adls_errors_total', operation='watch')
+                logging.error(f"Watcher cycle failed: {str(e)}")
+            self._stop.wait(max(0.0, self.poll_interval - (time.monotonic() - started)))
+
+    def stop(self):
+        self._stop.set()